@@ -1001,7 +1001,7 @@ function MainPortal({ app }) {
                                           {entry.pool_size !== null && entry.pool_size !== undefined && (
                                             <div>Eligible pool: {entry.pool_size}</div>
                                           )}
-                                          {entry.created_by && <div>By: {entry.created_by}</div>}
+                                          {(entry.created_by_username || entry.created_by) && <div>By: {entry.created_by_username || entry.created_by}</div>}
                                           {entry.comment && <div className="text-gray-700">Comment: {entry.comment}</div>}
                                         </div>
                                       ))}
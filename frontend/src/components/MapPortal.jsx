@@ -184,6 +184,23 @@ function needsServerImageConversion(file) {
   return false
 }
 
+// Poll a background image job until it finishes (or we give up waiting).
+async function waitForImageJob(statusUrl, { intervalMs = 1500, timeoutMs = 180000 } = {}) {
+  const deadline = Date.now() + timeoutMs
+  while (Date.now() < deadline) {
+    try {
+      const result = await readApiResponse(await fetch(statusUrl))
+      const job = result.data?.job
+      if (!result.ok || !job) return null
+      if (job.status === 'done' || job.status === 'failed') return job
+    } catch {
+      return null
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+  return null
+}
+
 async function readApiResponse(response) {
   const raw = await response.text()
   let data = {}
@@ -293,6 +310,9 @@ function SubmissionImage({ submission, className = '' }) {
         >
           <img
             src={images[0].url}
+            srcSet={images[0].srcset || undefined}
+            sizes="(min-width: 1024px) 33vw, 100vw"
+            loading="lazy"
             alt={images[0].filename || 'Map submission'}
             className="w-full object-cover transition-transform group-hover:scale-[1.01]"
           />
@@ -312,7 +332,10 @@ function SubmissionImage({ submission, className = '' }) {
                 aria-label={`View image ${idx + 1} of ${images.length}`}
               >
                 <img
-                  src={img.url}
+                  src={img.thumbnail_url || img.url}
+                  srcSet={img.srcset || undefined}
+                  sizes="(min-width: 640px) 20vw, 50vw"
+                  loading="lazy"
                   alt={img.filename || `Image ${idx + 1}`}
                   className="h-full w-full object-cover transition-transform group-hover:scale-105"
                 />
@@ -1941,9 +1964,8 @@ function MapPortal({ app }) {
       const response = await fetch(`${API_BASE}/map/background/info`)
       const result = await readApiResponse(response)
       if (result.ok && result.data.has_background) {
-        // cache-bust on uploaded_at
-        const bust = result.data.uploaded_at ? `?t=${encodeURIComponent(result.data.uploaded_at)}` : ''
-        setBackgroundUrl(`${API_BASE}/map/background${bust}`)
+        // image_url carries the content hash, so a new upload gets a new URL
+        setBackgroundUrl(result.data.image_url || `${API_BASE}/map/background`)
       } else {
         setBackgroundUrl(null)
         setImageAspect(null)
@@ -2456,6 +2478,14 @@ function MapPortal({ app }) {
       })
       const result = await readApiResponse(response)
       const data = result.data
+      if (result.ok && result.status === 202 && data.status_url) {
+        showMessage('Submission received — converting images…', 'success')
+        const job = await waitForImageJob(data.status_url)
+        if (job?.status === 'failed') {
+          showMessage(`[MAP_IMAGE_DECODE_FAILED] ${job.error || 'Could not decode image'}`, 'error')
+          return
+        }
+      }
       if (result.ok) {
         showMessage(
           data.password_created
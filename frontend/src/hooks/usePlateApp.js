@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import { makeStudentKey, normalizeName, sanitizeSelection } from '@/lib/names.js'
 
 const API_BASE = '/api'
@@ -43,6 +43,12 @@ export function usePlateApp() {
   const [csvData, setCsvData] = useState(null)
   const [inputValue, setInputValue] = useState('')
   const [scanHistory, setScanHistory] = useState([])
+  // Keyset cursor of the newest scan we hold; the server resets it on session change
+  const scanHistoryCursorRef = useRef(null)
+  const resetScanHistory = () => {
+    scanHistoryCursorRef.current = null
+    setScanHistory([])
+  }
   const [sessionStats, setSessionStats] = useState({
     clean_count: 0,
     dirty_count: 0,
@@ -251,7 +257,12 @@ export function usePlateApp() {
 
   const buildDrawActionPayload = () => {
     const trimmed = drawActionComment.trim()
-    return trimmed ? { comment: trimmed } : {}
+    const payload = trimmed ? { comment: trimmed } : {}
+    // Lets the server reject the action if another admin changed the draw meanwhile
+    if (Number.isInteger(currentDrawInfo?.draw_version)) {
+      payload.expected_version = currentDrawInfo.draw_version
+    }
+    return payload
   }
 
   // Check authentication status on load
@@ -443,7 +454,7 @@ export function usePlateApp() {
     setSessions([])
     setCsvData(null)
     setInputValue('')
-    setScanHistory([])
+    resetScanHistory()
     setSessionStats({
       clean_count: 0,
       dirty_count: 0,
@@ -763,7 +774,7 @@ export function usePlateApp() {
       setSessions([])
       setCsvData(null)
       setInputValue('')
-      setScanHistory([])
+      resetScanHistory()
       setSessionStats({
         clean_count: 0,
         dirty_count: 0,
@@ -848,7 +859,7 @@ export function usePlateApp() {
             draw_info: null
           })
           setFacultyPick(null)
-          setScanHistory([])
+          resetScanHistory()
           setDrawSummary(null)
           setOverrideInput('')
           setOverrideCandidate(null)
@@ -872,7 +883,7 @@ export function usePlateApp() {
         dirty_percentage: 0
       })
       setFacultyPick(null)
-      setScanHistory([])
+      resetScanHistory()
       setDrawSummary(null)
       setOverrideInput('')
       setOverrideCandidate(null)
@@ -1273,10 +1284,28 @@ export function usePlateApp() {
 
   const loadScanHistory = async () => {
     try {
-      const response = await fetch(`${API_BASE}/session/scan-history`)
+      const cursor = scanHistoryCursorRef.current
+      const query = cursor ? `?since=${encodeURIComponent(cursor)}` : ''
+      const response = await fetch(`${API_BASE}/session/scan-history${query}`)
       if (response.ok) {
         const data = await response.json()
-        setScanHistory(data.scan_history || [])
+        // Another poll or a session switch moved the cursor while this one was in flight
+        if (scanHistoryCursorRef.current !== cursor) {
+          return
+        }
+        const rows = data.scan_history || []
+        if (data.reset || !cursor) {
+          setScanHistory(rows)
+        } else if (rows.length > 0) {
+          setScanHistory((prev) => {
+            const known = new Set(prev.map((row) => row.id))
+            const fresh = rows.filter((row) => !known.has(row.id))
+            return fresh.length > 0 ? [...fresh, ...prev] : prev
+          })
+        }
+        scanHistoryCursorRef.current = data.cursor ?? null
+      } else {
+        scanHistoryCursorRef.current = null
       }
     } catch (error) {
       console.error('Failed to load scan history:', error)
@@ -1586,6 +1615,9 @@ export function usePlateApp() {
         await refreshSessionStatus()
       } else {
         showMessage(data.error || 'Failed to start draw', 'error')
+        if (response.status === 409) {
+          await loadDrawSummary({ silent: true })
+        }
       }
     } catch (error) {
       console.error('Failed to start draw:', error)
@@ -1620,6 +1652,9 @@ export function usePlateApp() {
         await refreshSessionStatus()
       } else {
         showMessage(data.error || 'Failed to finalize draw', 'error')
+        if (response.status === 409) {
+          await loadDrawSummary({ silent: true })
+        }
       }
     } catch (error) {
       console.error('Failed to finalize draw:', error)
@@ -1658,6 +1693,9 @@ export function usePlateApp() {
         await refreshSessionStatus()
       } else {
         showMessage(data.error || 'Failed to reset draw', 'error')
+        if (response.status === 409) {
+          await loadDrawSummary({ silent: true })
+        }
       }
     } catch (error) {
       console.error('Failed to reset draw:', error)
@@ -1728,10 +1766,13 @@ export function usePlateApp() {
       }
     }
 
-    const { comment } = buildDrawActionPayload()
+    const { comment, expected_version: expectedVersion } = buildDrawActionPayload()
     if (comment) {
       payload.comment = comment
     }
+    if (expectedVersion !== undefined) {
+      payload.expected_version = expectedVersion
+    }
 
     setDrawActionLoading(true)
     try {
@@ -1749,6 +1790,9 @@ export function usePlateApp() {
         await refreshSessionStatus()
       } else {
         showMessage(data.error || 'Failed to override draw', 'error')
+        if (response.status === 409) {
+          await loadDrawSummary({ silent: true })
+        }
       }
     } catch (error) {
       console.error('Failed to override draw:', error)
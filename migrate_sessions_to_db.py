@@ -268,6 +268,7 @@ def migrate_sessions():
                     house='',
                     recorded_by='unknown',
                     is_manual_entry=0,
+                    dirty_ordinal=i + 1,
                     dedupe_key=dedupe_key
                 )
                 db_session.add(db_record)
@@ -0,0 +1,93 @@
+"""Measure `/record/<category>` throughput against a throwaway SQLite database.
+
+Uploads a synthetic roster, opens a session and replays one scan per student
+through the Flask test client, reporting scans per second. Every run uses a
+fresh temporary database so numbers are comparable between checkouts.
+
+Usage:
+    python scripts/benchmark_record_scan.py [--students 2000] [--red-every 10]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+DEFAULT_USERNAME = "antineutrino"
+DEFAULT_PASSWORD = "b-decay"
+
+
+def _build_roster(count: int) -> bytes:
+    lines = ["Student ID,Last,Preferred,Grade,Advisor,House,Clan"]
+    for index in range(count):
+        identifier = 100000 + index
+        lines.append(f"{identifier},Last{index},First{index},{9 + index % 4},Advisor{index % 20},House{index % 6},Clan{index % 8}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=2000, help="roster size and number of scans")
+    parser.add_argument("--red-every", type=int, default=10, help="record every Nth scan as red (0 disables)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="goldenplate-bench-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{(workdir / 'bench.db').as_posix()}"
+    os.environ["MAP_DATABASE_URL"] = f"sqlite:///{(workdir / 'bench_map.db').as_posix()}"
+    os.environ.pop("PYTEST_CURRENT_TEST", None)
+
+    from sqlalchemy import event
+
+    from src.main import app
+    from src.routes.golden_plate_recorder_db.db import engine
+
+    statement_count = 0
+
+    def _count_statement(*_args, **_kwargs):
+        nonlocal statement_count
+        statement_count += 1
+
+    client = app.test_client()
+    login = client.post("/api/auth/login", json={"username": DEFAULT_USERNAME, "password": DEFAULT_PASSWORD})
+    if login.status_code != 200:
+        print(f"Login failed: {login.status_code} {login.get_json()}")
+        return 1
+
+    upload = client.post(
+        "/api/csv/upload",
+        data={"file": (io.BytesIO(_build_roster(args.students)), "students.csv")},
+        content_type="multipart/form-data",
+    )
+    if upload.status_code != 200:
+        print(f"Roster upload failed: {upload.status_code} {upload.get_json()}")
+        return 1
+
+    client.post("/api/session/create", json={"session_name": "benchmark"})
+
+    failures = 0
+    event.listen(engine, "before_cursor_execute", _count_statement)
+    started = time.perf_counter()
+    for index in range(args.students):
+        category = "red" if args.red_every and index % args.red_every == 0 else "clean"
+        response = client.post(f"/api/record/{category}", json={"input_value": str(100000 + index)})
+        if response.status_code != 200:
+            failures += 1
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", _count_statement)
+
+    print(f"scans: {args.students}  failures: {failures}")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {args.students / elapsed:.1f} scans/sec")
+    print(f"SQL statements per scan (including auth): {statement_count / args.students:.1f}")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
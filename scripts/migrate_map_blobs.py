@@ -0,0 +1,69 @@
+"""Move inline map images out of `golden_plate_map.db` into the blob store.
+
+Each image is read back from SQLite in chunks and written to the
+content-addressed store (``MAP_BLOB_DIR``, by default ``map_blobs`` next to
+the map database); the row then keeps only its hash, size and mime. Rows are
+migrated one per transaction, so the command can be interrupted and re-run.
+
+Usage:
+    python scripts/migrate_map_blobs.py [--chunk-mb N] [--limit N] [--collect] [--vacuum]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import text
+
+from src.routes.golden_plate_recorder_db.map_blobs import collect_map_blobs, migrate_inline_images
+from src.routes.golden_plate_recorder_db.map_db import map_db_session, map_engine
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-mb", type=int, default=1, help="read size per chunk in MB (default: 1)")
+    parser.add_argument("--limit", type=int, help="stop after migrating this many rows")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    parser.add_argument("--collect", action="store_true",
+                        help="afterwards, garbage-collect unreferenced blobs and stray files")
+    parser.add_argument("--grace-minutes", type=int, default=60,
+                        help="how long a blob must be unreferenced before --collect removes it")
+    parser.add_argument("--vacuum", action="store_true", help="afterwards, VACUUM the map database")
+    args = parser.parse_args()
+
+    def _progress(table: str, row_id: str, size: int) -> None:
+        if not args.quiet:
+            print(f"  {table} {row_id}: {size} bytes")
+
+    started = time.perf_counter()
+    try:
+        moved = migrate_inline_images(
+            chunk_size=max(1, args.chunk_mb) * 1024 * 1024,
+            limit=args.limit,
+            progress=_progress,
+        )
+        summary = ", ".join(f"{table}={count}" for table, count in moved.items())
+        print(f"Migrated {sum(moved.values())} images ({summary}) in {time.perf_counter() - started:.2f}s")
+
+        if args.collect:
+            stats = collect_map_blobs(grace=timedelta(minutes=args.grace_minutes), sweep_files=True)
+            print("Collected: " + ", ".join(f"{key}={value}" for key, value in stats.items()))
+    finally:
+        map_db_session.remove()
+
+    if args.vacuum and map_engine.dialect.name == "sqlite":
+        with map_engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("Vacuumed map database")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+"""Rebuild `draft_pool` ticket balances from `session_ticket_events`.
+
+Balances drift from the event log when sessions are deleted or discarded.
+This recomputes each school's balances with set-based SQL and prints a diff;
+nothing is written unless ``--apply`` is given.
+
+Usage:
+    python scripts/rebuild_draft_pool.py [--school SCHOOL_ID] [--apply] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.routes.golden_plate_recorder_db.db import School, db_session
+from src.routes.golden_plate_recorder_db.draw_db import rebuild_draft_pool
+
+
+def _print_report(report: dict, elapsed: float) -> None:
+    mode = "dry run" if report["dry_run"] else "applied"
+    print(
+        f"School {report['school_id']}: {report['changed_count']} of {report['students_checked']} "
+        f"balances differ ({report['tickets_delta']:+d} tickets, {mode}, {elapsed:.2f}s)"
+    )
+    for change in report["changes"]:
+        name = change.get("display_name") or change["student_id"]
+        print(f"  {name}: {change['current']} -> {change['rebuilt']} ({change['delta']:+d})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--school", help="only rebuild this school id (default: every school)")
+    parser.add_argument("--apply", action="store_true", help="write the rebuilt balances")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+
+    school_ids = [args.school] if args.school else [row[0] for row in db_session.query(School.id).order_by(School.id)]
+    reports = []
+    try:
+        for school_id in school_ids:
+            started = time.perf_counter()
+            report = rebuild_draft_pool(school_id, dry_run=not args.apply)
+            reports.append(report)
+            if not args.json:
+                _print_report(report, time.perf_counter() - started)
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.remove()
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
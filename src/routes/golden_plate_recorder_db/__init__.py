@@ -17,4 +17,18 @@ from . import superadmin_routes  # noqa: F401
 from . import interschool_routes  # noqa: F401
 from . import map_routes  # noqa: F401
 
+from .map_db import map_db_session
+from .map_jobs import resume_image_jobs
+from .ticket_ledger import is_write_behind_enabled, start_ticket_ledger_worker
+
+
+@recorder_bp.record_once
+def _start_background_workers(state):
+    # Pick up work left queued by a previous process right away
+    if is_write_behind_enabled():
+        start_ticket_ledger_worker()
+    resume_image_jobs()
+    map_db_session.remove()
+
+
 __all__ = ["recorder_bp"]
@@ -2,11 +2,11 @@ from flask import jsonify, request, session
 
 from . import recorder_bp
 from .db import Session as SessionModel, SessionDeleteRequest, db_session as db, _now_utc
-from .domain import serialize_draw_info
+from .domain import load_draw_winners, session_draw_info
+from .draw_db import rebuild_draft_pool
 from .security import get_current_user, require_admin, require_auth
 from .storage import (
     delete_requests,
-    ensure_session_structure,
     get_dirty_count,
     get_session_entry,
     save_delete_requests,
@@ -137,14 +137,12 @@ def admin_get_all_sessions():
 
     all_sessions = []
     for db_sess in db_sessions:
-        json_data = session_data.get(db_sess.id, {})
-        ensure_session_structure(json_data)
         total_records = db_sess.total_records or 0
         all_sessions.append({
             'session_id': db_sess.id,
             'session_name': db_sess.session_name,
-            'owner': json_data.get('owner', db_sess.created_by),
-            'created_at': db_sess.created_at.isoformat() if db_sess.created_at else json_data.get('created_at', 'unknown'),
+            'owner': db_sess.created_by,
+            'created_at': db_sess.created_at.isoformat() if db_sess.created_at else 'unknown',
             'total_records': total_records,
             'clean_count': db_sess.clean_number or 0,
             'dirty_count': (db_sess.dirty_number or 0) + (db_sess.red_number or 0),
@@ -309,14 +307,11 @@ def admin_overview():
         .all()
     )
     
+    winners = load_draw_winners(db_sessions)
     sessions_overview = []
     for db_sess in db_sessions:
-        # Get draw_info from JSON storage for backward compatibility
-        json_data = session_data.get(db_sess.id, {})
-        if json_data.get('school_id') and json_data.get('school_id') != current_school_id:
-            json_data = {}
-        draw_info = serialize_draw_info(json_data.get('draw_info', {}))
-        
+        draw_info = session_draw_info(db_sess, winners)
+
         sessions_overview.append({
             'session_id': db_sess.id,
             'session_name': db_sess.session_name,
@@ -328,10 +323,30 @@ def admin_overview():
             'draw_info': draw_info
         })
 
-    return jsonify({
+    payload = {
         'users': users,
         'sessions': sessions_overview
-    }), 200
+    }
+    if current_user['role'] == 'superadmin':
+        payload['session_cache'] = session_data.stats()
+    return jsonify(payload), 200
+
+
+@recorder_bp.route('/admin/draft-pool/rebuild', methods=['POST'])
+def admin_rebuild_draft_pool():
+    """Recompute ticket balances from the event log; dry run unless ``apply`` is true."""
+    if not require_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    data = request.get_json(silent=True) or {}
+    dry_run = not bool(data.get('apply'))
+    try:
+        report = rebuild_draft_pool(get_current_user()['school_id'], dry_run=dry_run)
+    except Exception as exc:
+        db.rollback()
+        print(f"Error rebuilding draft pool: {exc}")
+        return jsonify({'error': 'Failed to rebuild draft pool'}), 500
+    return jsonify({'status': 'success', **report}), 200
 
 
 __all__ = []
@@ -0,0 +1,174 @@
+"""Content-addressed file storage for large binary payloads.
+
+Blobs are named by the SHA-256 of their bytes and sharded two levels deep
+(``root/ab/cd/abcd...``), so writing the same image twice stores it once.
+Writes stream into a temporary file in the same directory tree and are moved
+into place with ``os.replace``; readers never see a partial blob.
+
+:class:`LocalBlobStore` is the only backend today. Anything with the same
+methods can be installed with :func:`configure_blob_store` (tests, or an
+object-store backend later).
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _default_blob_root() -> str:
+    configured = os.environ.get('MAP_BLOB_DIR')
+    if configured:
+        return configured
+    map_url = os.environ.get('MAP_DATABASE_URL', 'sqlite:///data/golden_plate_map.db')
+    if map_url.startswith('sqlite:///'):
+        map_dir = os.path.dirname(map_url.replace('sqlite:///', '', 1))
+        return os.path.join(map_dir or '.', 'map_blobs')
+    return os.path.join('data', 'map_blobs')
+
+
+def validate_sha256(sha256: str) -> str:
+    """Return ``sha256`` if it is a lowercase hex digest, else raise ``ValueError``."""
+    if not isinstance(sha256, str) or not _SHA256_RE.match(sha256):
+        raise ValueError(f'Invalid blob hash: {sha256!r}')
+    return sha256
+
+
+class LocalBlobStore:
+    """SHA-256 addressed blobs in a local directory."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._tmp_dir = os.path.join(self.root, 'tmp')
+
+    def path(self, sha256: str) -> str:
+        validate_sha256(sha256)
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.isfile(self.path(sha256))
+
+    def size(self, sha256: str) -> int:
+        return os.path.getsize(self.path(sha256))
+
+    def mtime(self, sha256: str) -> float:
+        return os.path.getmtime(self.path(sha256))
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """Store ``data`` and return ``(sha256, size)``."""
+        view = memoryview(data)
+        return self.write_chunks(
+            view[offset:offset + DEFAULT_CHUNK_SIZE] for offset in range(0, len(view), DEFAULT_CHUNK_SIZE)
+        )
+
+    def write_chunks(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """Stream ``chunks`` into the store and return ``(sha256, size)``.
+
+        An existing blob with the same hash is kept (and its mtime refreshed
+        so a concurrent garbage collection pass treats it as recently used).
+        """
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir, prefix='blob-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    size += len(chunk)
+                    handle.write(chunk)
+                handle.flush()
+                os.fsync(handle.fileno())
+            sha256 = digest.hexdigest()
+            final_path = self.path(sha256)
+            if os.path.isfile(final_path):
+                os.utime(final_path)
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open(self, sha256: str) -> BinaryIO:
+        return open(self.path(sha256), 'rb')
+
+    def read(self, sha256: str) -> bytes:
+        with self.open(sha256) as handle:
+            return handle.read()
+
+    def delete(self, sha256: str, *, older_than: Optional[float] = None) -> bool:
+        """Remove a blob; with ``older_than`` only if it was not written since."""
+        path = self.path(sha256)
+        try:
+            if older_than is not None and os.path.getmtime(path) >= older_than:
+                return False
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_hashes(self) -> Iterator[str]:
+        """Yield the hash of every stored blob."""
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                # Temp files and derived artifacts are not blobs
+                dirnames[:] = [name for name in dirnames if len(name) == 2]
+            for filename in filenames:
+                if _SHA256_RE.match(filename):
+                    yield filename
+
+    def purge_temp_files(self, max_age_seconds: float) -> int:
+        """Remove temp files left behind by interrupted writes."""
+        if not os.path.isdir(self._tmp_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for entry in os.scandir(self._tmp_dir):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+_store: Optional[LocalBlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> LocalBlobStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalBlobStore(_default_blob_root())
+        return _store
+
+
+def configure_blob_store(store: Optional[LocalBlobStore]) -> None:
+    """Install ``store`` as the process-wide blob store (``None`` restores the default)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+__all__ = [
+    'DEFAULT_CHUNK_SIZE',
+    'LocalBlobStore',
+    'configure_blob_store',
+    'get_blob_store',
+    'validate_sha256',
+]
@@ -9,6 +9,7 @@ from . import recorder_bp, storage
 from .db import Student, db_session
 from .security import get_current_user, require_admin, require_auth
 from .storage import save_global_csv_data, sync_students_table_from_csv_rows
+from .student_cache import get_student_resolver
 from .utils import make_student_key
 
 
@@ -140,7 +141,7 @@ def preview_csv():
 
 @recorder_bp.route('/csv/student-names', methods=['GET'])
 def get_student_names():
-    """Get student names for dropdown suggestions."""
+    """Get student names for dropdown suggestions, optionally filtered by ``?q=`` prefix."""
     if not require_auth():
         return jsonify({'error': 'Authentication required'}), 401
 
@@ -149,14 +150,18 @@ def get_student_names():
         return jsonify({'error': 'Authentication required'}), 401
     school_id = current_user['school_id']
 
-    students = (
-        db_session.query(Student)
-        .filter(Student.school_id == school_id)
-        .order_by(func.lower(Student.preferred_name), func.lower(Student.last_name))
-        .all()
-    )
-
-    if not students:
+    resolver = get_student_resolver(school_id)
+    query = (request.args.get('q') or '').strip()
+    if query:
+        try:
+            limit = max(1, min(int(request.args.get('limit', 20)), 200))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'limit must be an integer'}), 400
+        students = resolver.search(query, limit)
+    else:
+        students = resolver.students()
+
+    if not students and not query:
         return jsonify({
             'status': 'no_data',
             'names': []
@@ -1,5 +1,7 @@
 import os
 import uuid
+import warnings
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Iterable, List, Optional
 
@@ -14,9 +16,12 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     create_engine,
+    func,
     inspect,
+    literal_column,
     text,
 )
+from sqlalchemy.exc import SAWarning
 from sqlalchemy.orm import declarative_base, relationship, scoped_session, sessionmaker
 
 DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///data/golden_plate_recorder.db')
@@ -62,6 +67,7 @@ class School(Base):
     __tablename__ = 'schools'
     __table_args__ = (
         CheckConstraint("status IN ('active','disabled')", name='ck_school_status'),
+        Index('idx_schools_slug_lower', func.lower(literal_column('slug'))),
     )
 
     id = Column(String, primary_key=True)
@@ -143,6 +149,12 @@ class Student(Base):
     __table_args__ = (
         UniqueConstraint('school_id', 'student_identifier', name='uq_students_school_identifier'),
         Index('idx_students_school', 'school_id'),
+        Index(
+            'idx_students_school_name_lower',
+            'school_id',
+            func.lower(literal_column('preferred_name')),
+            func.lower(literal_column('last_name')),
+        ),
     )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -202,6 +214,10 @@ class Session(Base):
     total_dirty = Column(Integer)
 
     draw_number = Column(Integer, nullable=False, default=1)
+    # Bumped by every draw transition; start/override/finalize/reset compare-and-set on it
+    draw_version = Column(Integer, nullable=False, default=0)
+    # Bumped whenever the session's records change; ticket replay checkpoints compare it
+    ledger_version = Column(Integer, nullable=False, default=0)
     winner_student_id = Column(String, ForeignKey('students.id'))
     method = Column(String)
     finalized = Column(Integer, nullable=False, default=0)
@@ -224,6 +240,7 @@ class SessionRecord(Base):
         CheckConstraint("category IN ('clean','dirty','red','faculty')", name='ck_session_records_category'),
         UniqueConstraint('school_id', 'session_id', 'dedupe_key', name='uq_session_records_dedupe'),
         Index('idx_records_school_session_category', 'school_id', 'session_id', 'category'),
+        Index('idx_records_session_recorded', 'session_id', 'recorded_at', 'id'),
     )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -236,6 +253,10 @@ class SessionRecord(Base):
     is_manual_entry = Column(Integer, nullable=False, default=0)
     recorded_by = Column(String, ForeignKey('users.id'), nullable=False)
     recorded_at = Column(DateTime(timezone=True), default=_now_utc)
+    # When an offline scanner says the scan happened; recorded_at stays server time
+    client_recorded_at = Column(DateTime(timezone=True))
+    # "Dirty Plate #N", assigned once at insert so history numbering never shifts
+    dirty_ordinal = Column(Integer)
     dedupe_key = Column(String, nullable=False)
     preferred_name = Column(String)
     last_name = Column(String)
@@ -283,11 +304,56 @@ class SessionTicketEvent(Base):
     event_metadata = Column(Text)
 
 
+class TicketLedgerQueueItem(Base):
+    """Ticket update waiting to be applied by the write-behind ledger worker."""
+
+    __tablename__ = 'ticket_ledger_queue'
+    __table_args__ = (
+        UniqueConstraint('session_record_id', name='uq_ticket_ledger_queue_record'),
+        Index('idx_ticket_ledger_queue_pending', 'applied_at', 'id'),
+        Index('idx_ticket_ledger_queue_school', 'school_id', 'applied_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    school_id = Column(String, ForeignKey('schools.id', ondelete='CASCADE'), nullable=False)
+    session_id = Column(String, ForeignKey('sessions.id', ondelete='CASCADE'), nullable=False)
+    session_record_id = Column(String, ForeignKey('session_records.id', ondelete='CASCADE'), nullable=False)
+    student_id = Column(String, ForeignKey('students.id'), nullable=False)
+    category = Column(String, nullable=False)
+    recorded_by = Column(String, ForeignKey('users.id'))
+    enqueued_at = Column(DateTime(timezone=True), default=_now_utc)
+    applied_at = Column(DateTime(timezone=True))
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+
+
+class EligibilityVersion(Base):
+    """Shared counter bumped by every commit that can change a school's draw eligibility.
+
+    ``school_id`` is ``'*'`` for the row bumped when every school changes at once.
+    """
+
+    __tablename__ = 'eligibility_versions'
+
+    school_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class StudentVersion(Base):
+    """Shared counter bumped by every commit that changes a school's students."""
+
+    __tablename__ = 'student_versions'
+
+    school_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class DraftPool(Base):
     __tablename__ = 'draft_pool'
     __table_args__ = (
         UniqueConstraint('school_id', 'student_id', name='uq_draft_pool_student'),
         Index('idx_draft_pool_school_session', 'school_id', 'session_id'),
+        Index('idx_draft_pool_student', 'student_id'),
     )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -363,6 +429,7 @@ class EmailVerification(Base):
     __tablename__ = 'email_verifications'
     __table_args__ = (
         Index('idx_email_verifications_email', 'email'),
+        Index('idx_email_verifications_email_lower', func.lower(literal_column('email'))),
         Index('idx_email_verifications_expires', 'expires_at'),
     )
 
@@ -376,6 +443,15 @@ class EmailVerification(Base):
     attempts = Column(Integer, nullable=False, default=0)
 
 
+def dialect_insert(table):
+    """Return an INSERT construct that supports ``on_conflict_do_update``."""
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as _insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as _insert
+    return _insert(table)
+
+
 def _ensure_column(
     inspector, table_name: str, column_name: str, ddl: str, *, update_nulls_sql: Optional[str] = None
 ) -> None:
@@ -395,13 +471,32 @@ def _format_identifier(name: str) -> str:
     return f'{quote_char}{escaped}{quote_char}'
 
 
+@contextmanager
+def _reflecting_expression_indexes():
+    """Silence the warning for lower(...) indexes while reflecting indexes.
+
+    SQLAlchemy cannot reflect expression indexes; _migrate_schema manages
+    them by name instead.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            'ignore',
+            message='Skipped unsupported reflection of expression-based index',
+            category=SAWarning,
+        )
+        yield
+
+
 def _has_unique_combination(inspector, table_name: str, expected_columns: Iterable[str]) -> bool:
     target = tuple(sorted(expected_columns))
-    for constraint in inspector.get_unique_constraints(table_name):
+    with _reflecting_expression_indexes():
+        unique_constraints = inspector.get_unique_constraints(table_name)
+        indexes = inspector.get_indexes(table_name)
+    for constraint in unique_constraints:
         columns = tuple(sorted(constraint.get('column_names') or []))
         if columns == target:
             return True
-    for index in inspector.get_indexes(table_name):
+    for index in indexes:
         if not index.get('unique'):
             continue
         columns = tuple(sorted(index.get('column_names') or []))
@@ -475,8 +570,9 @@ def _ensure_session_name_scope(inspector):
 
     dialect_name = engine.dialect.name
     existing_columns = [col['name'] for col in inspector.get_columns(table_name)]
-    unique_constraints = inspector.get_unique_constraints(table_name)
-    indexes = inspector.get_indexes(table_name)
+    with _reflecting_expression_indexes():
+        unique_constraints = inspector.get_unique_constraints(table_name)
+        indexes = inspector.get_indexes(table_name)
 
     drop_constraint_names: List[str] = []
     drop_index_names: List[str] = []
@@ -594,8 +690,9 @@ def _ensure_student_identifier_scope(inspector):
 
     dialect_name = engine.dialect.name
     existing_columns = [col['name'] for col in inspector.get_columns(table_name)]
-    unique_constraints = inspector.get_unique_constraints(table_name)
-    indexes = inspector.get_indexes(table_name)
+    with _reflecting_expression_indexes():
+        unique_constraints = inspector.get_unique_constraints(table_name)
+        indexes = inspector.get_indexes(table_name)
 
     drop_constraint_names: List[str] = []
     drop_index_names: List[str] = []
@@ -659,6 +756,27 @@ def _ensure_student_identifier_scope(inspector):
     return inspector
 
 
+def _ensure_draft_pool_student_scope(inspector):
+    """Guarantee one draft_pool row per student so ticket upserts have a conflict target."""
+    if _has_unique_combination(inspector, 'draft_pool', ('school_id', 'student_id')):
+        return inspector
+
+    with engine.begin() as connection:
+        if engine.dialect.name == 'sqlite':
+            connection.execute(text(
+                '''
+                DELETE FROM draft_pool
+                WHERE rowid NOT IN (
+                    SELECT MIN(rowid) FROM draft_pool GROUP BY school_id, student_id
+                )
+                '''
+            ))
+        connection.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS uq_draft_pool_student ON draft_pool (school_id, student_id)'
+        ))
+    return inspect(engine)
+
+
 def _migrate_schema() -> None:
     inspector = inspect(engine)
     tables = set(inspector.get_table_names())
@@ -667,6 +785,8 @@ def _migrate_schema() -> None:
         session_columns = {col['name'] for col in inspector.get_columns('sessions')}
         for column_name, ddl in [
             ('draw_number', 'INTEGER DEFAULT 1'),
+            ('draw_version', 'INTEGER NOT NULL DEFAULT 0'),
+            ('ledger_version', 'INTEGER NOT NULL DEFAULT 0'),
             ('winner_student_id', 'TEXT'),
             ('method', 'TEXT'),
             ('finalized', 'INTEGER DEFAULT 0'),
@@ -750,6 +870,26 @@ def _migrate_schema() -> None:
         inspector = inspect(engine)
         tables = set(inspector.get_table_names())
 
+    if 'session_records' in tables:
+        _ensure_column(inspector, 'session_records', 'client_recorded_at', 'DATETIME')
+        _ensure_column(
+            inspector,
+            'session_records',
+            'dirty_ordinal',
+            'INTEGER',
+            update_nulls_sql='''
+                UPDATE session_records SET dirty_ordinal = (
+                    SELECT COUNT(*) FROM session_records AS prior
+                    WHERE prior.session_id = session_records.session_id
+                      AND prior.category = 'dirty'
+                      AND (prior.recorded_at < session_records.recorded_at
+                           OR (prior.recorded_at = session_records.recorded_at AND prior.id <= session_records.id))
+                )
+                WHERE category = 'dirty' AND dirty_ordinal IS NULL
+            ''',
+        )
+        inspector = inspect(engine)
+
     # Handle legacy session_draws table
     if 'session_draws' in tables:
         with engine.begin() as connection:
@@ -802,6 +942,7 @@ def _migrate_schema() -> None:
         draft_columns = {col['name'] for col in inspector.get_columns('draft_pool')}
         if 'session_id' not in draft_columns:
             _ensure_column(inspector, 'draft_pool', 'session_id', 'TEXT')
+        inspector = _ensure_draft_pool_student_scope(inspect(engine))
 
     if 'user_invite_codes' in tables:
         invite_columns = {col['name'] for col in inspector.get_columns('user_invite_codes')}
@@ -854,6 +995,11 @@ def _migrate_schema() -> None:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_records_school_session_category ON session_records (school_id, session_id, category)'
             ))
+            # uq_session_records_dedupe already enforces this; one unique index per scan insert is enough
+            connection.execute(text('DROP INDEX IF EXISTS uq_session_records_session_dedupe'))
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS idx_records_session_recorded ON session_records (session_id, recorded_at, id)'
+            ))
         if 'session_draw_events' in tables:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_draw_events_school_session ON session_draw_events (school_id, session_id, created_at)'
@@ -862,6 +1008,10 @@ def _migrate_schema() -> None:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_ticket_events_school_session ON session_ticket_events (school_id, session_id, occurred_at)'
             ))
+        if 'draft_pool' in tables:
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS idx_draft_pool_student ON draft_pool (student_id)'
+            ))
         if 'session_delete_requests' in tables:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_delete_requests_school_session ON session_delete_requests (school_id, session_id)'
@@ -870,6 +1020,18 @@ def _migrate_schema() -> None:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_students_school ON students (school_id)'
             ))
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS idx_students_school_name_lower '
+                'ON students (school_id, lower(preferred_name), lower(last_name))'
+            ))
+        if 'schools' in tables:
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS idx_schools_slug_lower ON schools (lower(slug))'
+            ))
+        if 'email_verifications' in tables:
+            connection.execute(text(
+                'CREATE INDEX IF NOT EXISTS idx_email_verifications_email_lower ON email_verifications (lower(email))'
+            ))
         if 'teachers' in tables:
             connection.execute(text(
                 'CREATE INDEX IF NOT EXISTS idx_teachers_school ON teachers (school_id)'
@@ -947,6 +1109,7 @@ __all__ = [
     'DEFAULT_SCHOOL_NAME',
     'DEFAULT_SCHOOL_SLUG',
     'DraftPool',
+    'EligibilityVersion',
     'EmailVerification',
     'INTERSCHOOL_SCHOOL_ID',
     'INTERSCHOOL_SCHOOL_NAME',
@@ -960,10 +1123,13 @@ __all__ = [
     'SessionRecord',
     'SessionTicketEvent',
     'Student',
+    'StudentVersion',
     'Teacher',
+    'TicketLedgerQueueItem',
     'User',
     'UserInviteCode',
     'db_session',
+    'dialect_insert',
     'engine',
     '_now_utc',
 ]
@@ -0,0 +1,151 @@
+"""Per-session duplicate detection for recorded scans.
+
+Indexes are rebuilt from ``session_records`` on a miss, so they live in a
+:class:`SessionCache` with the same entry, byte and idle-time limits as the
+hydrated session JSON.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .db import SessionRecord, Student, db_session
+from .session_cache import ENTRY_OVERHEAD_BYTES, SessionCache
+from .utils import extract_student_id_from_key, normalize_name
+
+DedupeEntry = Tuple[str, object]
+# Rough in-memory cost of one dedupe entry
+DEDUPE_ENTRY_BYTES = 256
+
+
+def _normalize_field(value):
+    return normalize_name(value).lower()
+
+
+def normalize_profile(preferred_name, last_name, grade='', advisor='', house='', clan='') -> Tuple[str, ...]:
+    """Return the lowercased profile tuple used when a scan has no key."""
+    return tuple(
+        _normalize_field(value)
+        for value in (preferred_name, last_name, grade, advisor, house, clan)
+    )
+
+
+class SessionDedupeIndex:
+    """Hash index of everything recorded in one session.
+
+    Entries are keyed by student identifier, student key and (for scans with
+    neither) the normalized profile tuple, alongside the raw ``dedupe_key``
+    stored on ``session_records``. Each entry maps to the recorded category so
+    a single lookup answers both "is this a duplicate" and "recorded as what".
+    """
+
+    def __init__(self):
+        self._entries: Dict[DedupeEntry, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def entries_for(
+        *,
+        dedupe_key: Optional[str] = None,
+        student_id: Optional[str] = None,
+        student_key: Optional[str] = None,
+        profile: Optional[Iterable[str]] = None,
+    ) -> List[DedupeEntry]:
+        entries: List[DedupeEntry] = []
+        identifier = _normalize_field(student_id)
+        key = _normalize_field(student_key)
+        if identifier:
+            entries.append(('id', identifier))
+        elif key:
+            entries.append(('key', key))
+        elif profile is not None:
+            entries.append(('profile', tuple(profile)))
+        if dedupe_key:
+            entries.append(('dedupe', dedupe_key))
+        return entries
+
+    def lookup(self, **kwargs) -> Optional[str]:
+        """Return the category a matching scan was recorded under, if any."""
+        for entry in self.entries_for(**kwargs):
+            category = self._entries.get(entry)
+            if category:
+                return category
+        return None
+
+    def add(self, category: str, **kwargs) -> None:
+        with self._lock:
+            for entry in self.entries_for(**kwargs):
+                self._entries.setdefault(entry, category)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _estimate_index_bytes(index) -> int:
+    return ENTRY_OVERHEAD_BYTES + len(index) * DEDUPE_ENTRY_BYTES
+
+
+# Session id -> SessionDedupeIndex, hydrated lazily from session_records
+session_dedupe_indexes = SessionCache.from_env(sizer=_estimate_index_bytes)
+_registry_lock = threading.Lock()
+
+
+def _build_session_dedupe_index(session_id: str) -> SessionDedupeIndex:
+    index = SessionDedupeIndex()
+    try:
+        rows = (
+            db_session.query(SessionRecord.dedupe_key, SessionRecord.category, Student.student_identifier)
+            .outerjoin(Student, SessionRecord.student_id == Student.id)
+            .filter(
+                SessionRecord.session_id == session_id,
+                SessionRecord.category != 'dirty',
+            )
+            .all()
+        )
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error building dedupe index for session {session_id}: {exc}")
+        rows = []
+
+    for dedupe_key, category, student_identifier in rows:
+        if category == 'faculty':
+            index.add(category, dedupe_key=dedupe_key)
+            continue
+        identifier = student_identifier or extract_student_id_from_key(dedupe_key or '')
+        index.add(
+            category,
+            dedupe_key=dedupe_key,
+            student_id=identifier,
+            student_key=None if identifier else dedupe_key,
+        )
+    return index
+
+
+def get_session_dedupe_index(session_id: str) -> SessionDedupeIndex:
+    """Return the dedupe index for a session, building it on first use."""
+    index = session_dedupe_indexes.get(session_id)
+    if index is not None:
+        return index
+    with _registry_lock:
+        index = session_dedupe_indexes.get(session_id)
+        if index is None:
+            index = _build_session_dedupe_index(session_id)
+            session_dedupe_indexes[session_id] = index
+    return index
+
+
+def discard_session_dedupe_index(session_id: str) -> None:
+    """Drop a session's index so the next lookup rebuilds it from the database."""
+    session_dedupe_indexes.pop(session_id, None)
+
+
+def reset_dedupe_indexes() -> None:
+    session_dedupe_indexes.clear()
+
+
+__all__ = [
+    'SessionDedupeIndex',
+    'discard_session_dedupe_index',
+    'get_session_dedupe_index',
+    'normalize_profile',
+    'reset_dedupe_indexes',
+    'session_dedupe_indexes',
+]
@@ -1,13 +1,15 @@
+import threading
 from datetime import datetime
 
-from .storage import ensure_session_structure, get_student_lookup_for_school, session_data
+from .db import Session as SessionModel, Student, db_session
+from .storage import get_student_lookup_for_school, load_ledger_records
+from .student_cache import get_school_student_version
 from .storage import get_dirty_count  # noqa: F401 - used externally
 from .utils import (
     extract_student_id_from_key,
     format_display_name,
     make_student_key,
     normalize_name,
-    safe_parse_datetime,
 )
 
 
@@ -48,110 +50,330 @@ def is_student_profile_eligible(profile, lookup_map=None):
     return True
 
 
-def compute_ticket_rollups():
-    generated_at = datetime.now().isoformat()
-    ordered = sorted(
-        session_data.items(),
-        key=lambda item: (safe_parse_datetime(item[1].get('created_at')), item[0])
-    )
-    summaries = {}
-    current_tickets = {}
-    student_profiles = {}
-    for session_id, info in ordered:
-        ensure_session_structure(info)
-        school_id = info.get('school_id')
-        lookup_map = get_student_lookup_for_school(school_id)
-        if info.get('is_discarded'):
-            summaries[session_id] = {
-                'session_id': session_id,
-                'session_name': info.get('session_name', ''),
-                'created_at': info.get('created_at'),
-                'is_discarded': True,
-                'tickets_snapshot': {},
-                'profiles': {},
-                'total_tickets': 0.0,
-                'candidates': [],
-                'top_candidates': [],
-                'eligible_count': 0,
-                'excluded_records': 0,
-                'generated_at': generated_at
-            }
+# Also checkpoint every this many sessions between finalized draws
+CHECKPOINT_INTERVAL = 10
+
+
+def _discarded_summary(session_id, info, generated_at):
+    return {
+        'session_id': session_id,
+        'session_name': info.get('session_name', ''),
+        'created_at': info.get('created_at'),
+        'is_discarded': True,
+        'tickets_snapshot': {},
+        'profiles': {},
+        'total_tickets': 0.0,
+        'candidates': [],
+        'top_candidates': [],
+        'eligible_count': 0,
+        'excluded_records': 0,
+        'generated_at': generated_at
+    }
+
+
+def _apply_session(info, current_tickets, student_profiles):
+    """Apply one session's earn, red-reset and half-decay rules in place.
+
+    Returns the number of records that could not be matched to a student.
+    """
+    lookup_map = get_student_lookup_for_school(info.get('school_id'))
+    pre_session_keys = set(current_tickets.keys())
+    present_keys = set()
+    excluded_records = 0
+    for record in info.get('clean_records', []):
+        profile = build_profile_from_record(record, lookup_map)
+        key = profile.get('key')
+        if not key or not is_student_profile_eligible(profile, lookup_map):
+            excluded_records += 1
             continue
-        pre_session_keys = set(current_tickets.keys())
-        present_keys = set()
-        excluded_records = 0
-        for record in info.get('clean_records', []):
-            profile = build_profile_from_record(record, lookup_map)
-            key = profile.get('key')
-            if not key or not is_student_profile_eligible(profile, lookup_map):
-                excluded_records += 1
-                continue
-            present_keys.add(key)
-            student_profiles[key] = profile
-            current_tickets[key] = current_tickets.get(key, 0.0) + 1.0
-        for record in info.get('red_records', []):
-            profile = build_profile_from_record(record, lookup_map)
-            key = profile.get('key')
-            if not key or not is_student_profile_eligible(profile, lookup_map):
-                excluded_records += 1
-                continue
-            present_keys.add(key)
-            student_profiles[key] = profile
-            current_tickets[key] = 0.0
-        for key in pre_session_keys:
-            if key not in present_keys:
-                value = current_tickets.get(key, 0.0)
-                if value > 0:
-                    current_tickets[key] = value / 2.0
-        snapshot = {k: float(v) for k, v in current_tickets.items() if v > 0}
-        total_tickets = sum(snapshot.values())
-        profiles_snapshot = {k: student_profiles.get(k, {}).copy() for k in snapshot}
-        candidates = []
-        for key, value in sorted(snapshot.items(), key=lambda item: (-item[1], item[0])):
-            profile = profiles_snapshot.get(key, {})
-            display_name = profile.get('display_name') or format_display_name(profile)
-            candidate = {
-                'key': key,
-                'tickets': value,
-                'preferred_name': profile.get('preferred_name', ''),
-                'last_name': profile.get('last_name', ''),
-                'display_name': display_name,
-                'grade': profile.get('grade', ''),
-                'advisor': profile.get('advisor', ''),
-                'house': profile.get('house', ''),
-                'clan': profile.get('clan', ''),
-                'student_id': profile.get('student_id', ''),
-                'probability': (value / total_tickets * 100.0) if total_tickets > 0 else 0.0
-            }
-            candidates.append(candidate)
-        summaries[session_id] = {
-            'session_id': session_id,
-            'session_name': info.get('session_name', ''),
-            'created_at': info.get('created_at'),
-            'is_discarded': False,
-            'tickets_snapshot': snapshot,
-            'profiles': profiles_snapshot,
-            'total_tickets': total_tickets,
-            'candidates': candidates,
-            'top_candidates': candidates[:3],
-            'eligible_count': len(candidates),
-            'excluded_records': excluded_records,
-            'generated_at': generated_at
+        present_keys.add(key)
+        student_profiles[key] = profile
+        current_tickets[key] = current_tickets.get(key, 0.0) + 1.0
+    for record in info.get('red_records', []):
+        profile = build_profile_from_record(record, lookup_map)
+        key = profile.get('key')
+        if not key or not is_student_profile_eligible(profile, lookup_map):
+            excluded_records += 1
+            continue
+        present_keys.add(key)
+        student_profiles[key] = profile
+        current_tickets[key] = 0.0
+    for key in pre_session_keys:
+        if key not in present_keys:
+            value = current_tickets.get(key, 0.0)
+            if value > 0:
+                current_tickets[key] = value / 2.0
+    return excluded_records
+
+
+def _session_summary(session_id, info, current_tickets, student_profiles, excluded_records, generated_at):
+    snapshot = {k: float(v) for k, v in current_tickets.items() if v > 0}
+    total_tickets = sum(snapshot.values())
+    profiles_snapshot = {k: student_profiles.get(k, {}).copy() for k in snapshot}
+    candidates = []
+    for key, value in sorted(snapshot.items(), key=lambda item: (-item[1], item[0])):
+        profile = profiles_snapshot.get(key, {})
+        display_name = profile.get('display_name') or format_display_name(profile)
+        candidate = {
+            'key': key,
+            'tickets': value,
+            'preferred_name': profile.get('preferred_name', ''),
+            'last_name': profile.get('last_name', ''),
+            'display_name': display_name,
+            'grade': profile.get('grade', ''),
+            'advisor': profile.get('advisor', ''),
+            'house': profile.get('house', ''),
+            'clan': profile.get('clan', ''),
+            'student_id': profile.get('student_id', ''),
+            'probability': (value / total_tickets * 100.0) if total_tickets > 0 else 0.0
         }
-        draw_info = info.get('draw_info', {})
-        winner = draw_info.get('winner')
-        if winner and draw_info.get('finalized'):
-            winner_key = winner.get('key')
+        candidates.append(candidate)
+    return {
+        'session_id': session_id,
+        'session_name': info.get('session_name', ''),
+        'created_at': info.get('created_at'),
+        'is_discarded': False,
+        'tickets_snapshot': snapshot,
+        'profiles': profiles_snapshot,
+        'total_tickets': total_tickets,
+        'candidates': candidates,
+        'top_candidates': candidates[:3],
+        'eligible_count': len(candidates),
+        'excluded_records': excluded_records,
+        'generated_at': generated_at
+    }
+
+
+def _session_fingerprint(row):
+    """Everything on a session row (and its school roster) that the replay depends on.
+
+    Scans bump ``ledger_version``, draw changes bump ``draw_version``, and
+    discards and merges change ``status``/``main_session_id``, so no record
+    has to be read to tell whether a checkpoint is still valid.
+    """
+    return (
+        row.created_at,
+        row.school_id,
+        get_school_student_version(row.school_id),
+        row.status,
+        row.main_session_id,
+        row.ledger_version or 0,
+        row.draw_version or 0,
+        row.winner_student_id,
+        bool(row.finalized),
+    )
+
+
+def _session_rows(school_id):
+    return (
+        db_session.query(
+            SessionModel.id,
+            SessionModel.session_name,
+            SessionModel.created_at,
+            SessionModel.school_id,
+            SessionModel.status,
+            SessionModel.main_session_id,
+            SessionModel.ledger_version,
+            SessionModel.draw_version,
+            SessionModel.winner_student_id,
+            SessionModel.finalized,
+        )
+        .filter(SessionModel.school_id == school_id)
+        .order_by(SessionModel.created_at.asc(), SessionModel.id.asc())
+        .all()
+    )
+
+
+def _replay_infos(rows):
+    """Build replay inputs for ``rows`` from the database, not the session cache."""
+    loaded = load_ledger_records([row.id for row in rows if row.status != 'discarded'])
+    winners = load_draw_winners([row for row in rows if row.finalized])
+    infos = []
+    for row in rows:
+        winner = winners.get(row.winner_student_id) if row.finalized else None
+        winner_key = make_student_key(winner.preferred_name, winner.last_name, winner.student_identifier) if winner else None
+        records = loaded.get(row.id, {})
+        infos.append({
+            'session_name': row.session_name,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'school_id': row.school_id,
+            'is_discarded': row.status == 'discarded',
+            'clean_records': records.get('clean_records', []),
+            'red_records': records.get('red_records', []),
+            'winner_key': winner_key.lower() if winner_key else None,
+        })
+    return infos
+
+
+class LedgerCheckpoint:
+    """Balances after replaying sessions up to and including ``position``."""
+
+    __slots__ = ('session_id', 'position', 'chain', 'tickets', 'profiles')
+
+    def __init__(self, session_id, position, chain, tickets, profiles):
+        self.session_id = session_id
+        self.position = position
+        self.chain = chain
+        self.tickets = tickets
+        self.profiles = profiles
+
+
+class TicketLedgerReplay:
+    """Replays a school's ticket rules across sessions, resuming from checkpoints.
+
+    A checkpoint is saved after each finalized session (and every
+    ``CHECKPOINT_INTERVAL`` sessions). Each one stores a hash chain over the
+    ordered session fingerprints before it, so editing, merging or discarding
+    an earlier session changes the chain and the checkpoint is ignored.
+    Fingerprints come from the ``sessions`` rows alone; records are only read
+    for the sessions actually replayed.
+    """
+
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._checkpoints.clear()
+
+    def __len__(self):
+        return sum(len(checkpoints) for checkpoints in self._checkpoints.values())
+
+    def _latest_checkpoint(self, school_id, positions, chain, target):
+        """Return the newest checkpoint at or before ``target``, dropping stale ones."""
+        best = None
+        with self._lock:
+            checkpoints = self._checkpoints.get(school_id, {})
+            for session_id, checkpoint in list(checkpoints.items()):
+                position = positions.get(session_id)
+                if position is None or chain[position] != checkpoint.chain:
+                    del checkpoints[session_id]
+                    continue
+                checkpoint.position = position
+                if position <= target and (best is None or position > best.position):
+                    best = checkpoint
+        return best
+
+    def replay(self, until_session_id=None, school_id=None):
+        """Return ``{session_id: summary}`` for sessions replayed up to the target.
+
+        Without a target every session of ``school_id`` (or of every school)
+        is replayed. With one, replay covers that session's school and starts
+        from the newest valid checkpoint before it.
+        """
+        if until_session_id:
+            school_id = db_session.query(SessionModel.school_id).filter_by(id=until_session_id).scalar()
+            if school_id is None:
+                return {}
+        if school_id is None:
+            summaries = {}
+            for (each_school_id,) in db_session.query(SessionModel.school_id).distinct():
+                summaries.update(self.replay(school_id=each_school_id))
+            return summaries
+
+        generated_at = datetime.now().isoformat()
+        rows = _session_rows(school_id)
+        chain = []
+        previous = None
+        for row in rows:
+            previous = hash((previous, row.id, _session_fingerprint(row)))
+            chain.append(previous)
+        positions = {row.id: index for index, row in enumerate(rows)}
+        target = positions.get(until_session_id, len(rows) - 1) if until_session_id else len(rows) - 1
+
+        current_tickets = {}
+        student_profiles = {}
+        start = 0
+        checkpoint = self._latest_checkpoint(school_id, positions, chain, target) if until_session_id else None
+        if checkpoint is not None:
+            current_tickets = dict(checkpoint.tickets)
+            student_profiles = dict(checkpoint.profiles)
+            start = checkpoint.position + 1
+
+        summaries = {}
+        infos = _replay_infos(rows[start:target + 1])
+        for position, info in enumerate(infos, start):
+            session_id = rows[position].id
+            if info['is_discarded']:
+                summaries[session_id] = _discarded_summary(session_id, info, generated_at)
+                continue
+            excluded_records = _apply_session(info, current_tickets, student_profiles)
+            summaries[session_id] = _session_summary(
+                session_id, info, current_tickets, student_profiles, excluded_records, generated_at
+            )
+            winner_key = info['winner_key']
             if winner_key:
                 current_tickets[winner_key] = 0.0
-    return summaries
+            if winner_key or (position + 1) % self.checkpoint_interval == 0:
+                with self._lock:
+                    self._checkpoints.setdefault(school_id, {})[session_id] = LedgerCheckpoint(
+                        session_id, position, chain[position], dict(current_tickets), dict(student_profiles)
+                    )
+        return summaries
+
+
+ticket_ledger_replay = TicketLedgerReplay()
+
+
+def compute_ticket_rollups():
+    """Replay every session from scratch and return all summaries."""
+    return ticket_ledger_replay.replay()
 
 
 def get_ticket_summary_for_session(session_id):
-    summaries = compute_ticket_rollups()
+    """Return ``(summary, summaries)``; ``summaries`` covers only the sessions replayed."""
+    summaries = ticket_ledger_replay.replay(session_id)
     return summaries.get(session_id), summaries
 
 
+def invalidate_ticket_checkpoints():
+    ticket_ledger_replay.invalidate()
+
+
+def load_draw_winners(db_sessions):
+    """Fetch the winning students of ``db_sessions`` in one query, keyed by id."""
+    winner_ids = {db_sess.winner_student_id for db_sess in db_sessions if db_sess.winner_student_id}
+    if not winner_ids:
+        return {}
+    return {student.id: student for student in db_session.query(Student).filter(Student.id.in_(winner_ids))}
+
+
+def session_draw_info(db_sess, winners=None):
+    """Serialize a session's draw state from its ``sessions`` row.
+
+    ``winners`` is the mapping from :func:`load_draw_winners`, so list views
+    resolve every winner with one query.
+    """
+    if winners is None:
+        winners = load_draw_winners([db_sess])
+    winner = winners.get(db_sess.winner_student_id)
+    probability = db_sess.probability_at_selection
+    return serialize_draw_info({
+        'winner': {
+            'key': make_student_key(winner.preferred_name, winner.last_name, winner.student_identifier),
+            'preferred_name': winner.preferred_name,
+            'last_name': winner.last_name,
+            'grade': winner.grade,
+            'advisor': winner.advisor,
+            'house': winner.house,
+            'clan': winner.clan,
+            'student_id': winner.student_identifier,
+            'tickets': db_sess.tickets_at_selection,
+            'probability': probability / 100.0 if probability is not None else None,
+        } if winner else None,
+        'method': db_sess.method,
+        'finalized': bool(db_sess.finalized),
+        'finalized_at': db_sess.finalized_at.isoformat() if db_sess.finalized_at else None,
+        'finalized_by': db_sess.finalized_by,
+        'override': bool(db_sess.override_applied),
+        'tickets_at_selection': db_sess.tickets_at_selection,
+        'probability_at_selection': probability / 100.0 if probability is not None else None,
+        'eligible_pool_size': db_sess.eligible_pool_size,
+    })
+
+
 def serialize_draw_info(draw_info):
     if not isinstance(draw_info, dict):
         return {
@@ -202,9 +424,15 @@ def serialize_draw_info(draw_info):
 
 
 __all__ = [
+    'LedgerCheckpoint',
+    'TicketLedgerReplay',
     'build_profile_from_record',
     'compute_ticket_rollups',
     'get_ticket_summary_for_session',
+    'invalidate_ticket_checkpoints',
     'is_student_profile_eligible',
+    'load_draw_winners',
     'serialize_draw_info',
+    'session_draw_info',
+    'ticket_ledger_replay',
 ]
@@ -1,9 +1,9 @@
 """Database operations for draw system."""
-import random
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import func
+from sqlalchemy import DateTime, String, and_, bindparam, case, func, literal, or_, select, update
 
 from .db import (
     DraftPool,
@@ -12,11 +12,24 @@ from .db import (
     SessionRecord,
     SessionTicketEvent,
     Student,
+    User,
     _now_utc,
     db_session,
+    dialect_insert,
 )
-
-secure_random = random.SystemRandom()
+from .eligibility_cache import (
+    CandidateProfiles,
+    EligibilitySnapshot,
+    get_cached_candidate_profiles,
+    get_cached_snapshot,
+    get_eligibility_version,
+    stage_eligibility_change,
+    store_candidate_profiles,
+    store_snapshot,
+)
+from .sampler import WeightedSampler, secure_random
+from .student_cache import get_school_student_version
+from .utils import extract_student_id_from_key, format_display_name, make_student_key, normalize_name
 
 
 def get_or_create_session_draw(session_id: str) -> SessionModel:
@@ -30,6 +43,9 @@ def get_or_create_session_draw(session_id: str) -> SessionModel:
     if session.draw_number is None:
         session.draw_number = 1
         updated = True
+    if session.draw_version is None:
+        session.draw_version = 0
+        updated = True
     if session.finalized is None:
         session.finalized = 0
         updated = True
@@ -44,17 +60,31 @@ def get_or_create_session_draw(session_id: str) -> SessionModel:
     return session
 
 
-def calculate_ticket_balances() -> Dict[str, float]:
-    """Return current ticket balances for all students with positive tickets."""
-    pool_entries = (
+def _get_session_school_id(session_id: str) -> Optional[str]:
+    row = db_session.query(SessionModel.school_id).filter_by(id=session_id).first()
+    return row[0] if row else None
+
+
+def calculate_ticket_balances(
+    school_id: Optional[str] = None,
+    student_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, float]:
+    """Return positive ticket balances, optionally limited to a school and students."""
+    query = (
         db_session.query(DraftPool.student_id, DraftPool.ticket_number)
         .filter(DraftPool.ticket_number > 0)
-        .all()
     )
+    if school_id is not None:
+        query = query.filter(DraftPool.school_id == school_id)
+    if student_ids is not None:
+        student_ids = [student_id for student_id in set(student_ids) if student_id]
+        if not student_ids:
+            return {}
+        query = query.filter(DraftPool.student_id.in_(student_ids))
 
     return {
         student_id: float(ticket_number)
-        for student_id, ticket_number in pool_entries
+        for student_id, ticket_number in query.all()
         if student_id
     }
 
@@ -101,73 +131,357 @@ def get_eligible_students_with_tickets(
 ) -> List[Tuple[Student, float]]:
     """
     Get list of (student, ticket_count) for students eligible for draw.
+
+    One join of the school's positive ``draft_pool`` rows against the distinct
+    students with a clean record in the session (or its extras), so the cost
+    follows the session rather than every school's pool.
     """
-    ticket_balances = calculate_ticket_balances()
-    
-    if not ticket_balances:
+    school_id = _get_session_school_id(session_id)
+    if school_id is None:
         return []
+    session_ids = get_session_ids_for_draw(session_id)
 
-    clean_student_ids = get_clean_student_ids_for_session(session_id)
-    if not clean_student_ids:
-        return []
+    clean_students = (
+        select(SessionRecord.student_id)
+        .where(
+            SessionRecord.school_id == school_id,
+            SessionRecord.session_id.in_(session_ids),
+            SessionRecord.category == 'clean',
+            SessionRecord.student_id.isnot(None),
+        )
+        .distinct()
+        .subquery()
+    )
+    rows = (
+        db_session.query(Student, DraftPool.ticket_number)
+        .join(clean_students, clean_students.c.student_id == Student.id)
+        .join(DraftPool, and_(DraftPool.school_id == school_id, DraftPool.student_id == Student.id))
+        .filter(DraftPool.ticket_number > 0)
+        .order_by(DraftPool.ticket_number.desc(), Student.preferred_name, Student.id)
+        .all()
+    )
+    return [(student, float(tickets)) for student, tickets in rows]
 
-    eligible_student_ids = [
-        student_id for student_id in ticket_balances.keys() if student_id in clean_student_ids
-    ]
 
-    if not eligible_student_ids:
-        return []
-    
-    # Get student records
-    students = (
-        db_session.query(Student)
-        .filter(Student.id.in_(eligible_student_ids))
+def get_eligibility_snapshot(session_id: str, school_id: Optional[str] = None) -> EligibilitySnapshot:
+    """Return the cached eligible pool for a session, rebuilding it if stale."""
+    school_id = school_id or _get_session_school_id(session_id)
+    version = get_eligibility_version(school_id)
+    snapshot = get_cached_snapshot(session_id, version)
+    if snapshot is None:
+        eligible = get_eligible_students_with_tickets(session_id)
+        snapshot = EligibilitySnapshot.from_eligible(session_id, school_id, version, eligible)
+        store_snapshot(snapshot)
+    return snapshot
+
+
+_MERGED_PROFILE_FIELDS = ('student_id', 'student_identifier', 'preferred_name', 'last_name', 'grade', 'advisor', 'house', 'clan')
+
+
+def _build_candidate_profiles(session_ids: List[str], school_id: str) -> Dict[str, Dict]:
+    """Merge every clean/red record in ``session_ids`` into one profile per student key."""
+    rows = (
+        db_session.query(SessionRecord, Student, DraftPool.ticket_number)
+        .outerjoin(Student, SessionRecord.student_id == Student.id)
+        .outerjoin(DraftPool, and_(DraftPool.school_id == school_id, DraftPool.student_id == SessionRecord.student_id))
+        .filter(
+            SessionRecord.session_id.in_(session_ids),
+            SessionRecord.category.in_(['clean', 'red'])
+        )
         .all()
     )
-    
-    result = []
-    for student in students:
-        tickets = ticket_balances.get(student.id, 0.0)
-        if tickets > 0:
-            result.append((student, tickets))
-    
-    return sorted(result, key=lambda x: (-x[1], x[0].preferred_name))
+
+    profiles: Dict[str, Dict] = {}
+    for session_record, student, ticket_number in rows:
+        preferred = normalize_name(session_record.preferred_name or (student.preferred_name if student else ''))
+        last = normalize_name(session_record.last_name or (student.last_name if student else ''))
+        student_identifier = normalize_name(student.student_identifier if student else '')
+        if not student_identifier:
+            student_identifier = extract_student_id_from_key(session_record.dedupe_key)
+        key = make_student_key(preferred, last, student_identifier)
+        if not key:
+            continue
+        profile = {
+            'key': key,
+            'preferred_name': preferred,
+            'last_name': last,
+            'grade': normalize_name(student.grade if student else ''),
+            'advisor': normalize_name(student.advisor if student else ''),
+            'house': normalize_name(student.house if student else ''),
+            'clan': normalize_name(student.clan if student else ''),
+            'student_id': student.id if student else None,
+            'student_identifier': student_identifier,
+        }
+        profile['display_name'] = format_display_name(profile)
+        if profile['student_id']:
+            profile['tickets'] = float(ticket_number) if ticket_number and ticket_number > 0 else 0.0
+
+        existing = profiles.get(key)
+        if existing:
+            for field in _MERGED_PROFILE_FIELDS:
+                if not profile.get(field) and existing.get(field):
+                    profile[field] = existing[field]
+            profile['tickets'] = profile.get('tickets') or existing.get('tickets', 0.0)
+            profile['display_name'] = profile.get('display_name') or existing.get('display_name')
+        profiles[key] = profile
+    return profiles
+
+
+def get_candidate_profiles(session_id: str, school_id: Optional[str] = None) -> CandidateProfiles:
+    """Return everyone recorded clean or red in a draw session, cached per session version.
+
+    The cache stamp combines the school's eligibility and roster versions
+    with the record counters of the session and its extras, so new scans,
+    merges, roster edits and ticket changes all force a rebuild.
+    """
+    school_id = school_id or _get_session_school_id(session_id)
+    session_ids = get_session_ids_for_draw(session_id)
+    counters = (
+        db_session.query(SessionModel.id, SessionModel.clean_number, SessionModel.red_number)
+        .filter(SessionModel.id.in_(session_ids))
+        .order_by(SessionModel.id)
+        .all()
+    )
+    version = get_eligibility_version(school_id)
+    stamp = (version, get_school_student_version(school_id), tuple(tuple(row) for row in counters))
+    candidates = get_cached_candidate_profiles(session_id, stamp)
+    if candidates is None:
+        profiles = _build_candidate_profiles(session_ids, school_id)
+        candidates = CandidateProfiles(session_id, school_id, stamp, profiles)
+        store_candidate_profiles(candidates, version)
+    return candidates
+
+
+def get_draw_overview_stamp(school_id: str) -> Tuple:
+    """Cheap fingerprint that changes whenever :func:`get_draw_overview` could.
+
+    Combines the school's eligibility and roster versions with one aggregate
+    over its sessions (scans and draw transitions both touch ``updated_at``).
+    """
+    count, last_updated, versions = (
+        db_session.query(
+            func.count(SessionModel.id),
+            func.max(SessionModel.updated_at),
+            func.coalesce(func.sum(SessionModel.draw_version), 0),
+        )
+        .filter(SessionModel.school_id == school_id)
+        .one()
+    )
+    return (
+        get_eligibility_version(school_id),
+        get_school_student_version(school_id),
+        count,
+        last_updated.isoformat() if last_updated else None,
+        int(versions),
+    )
+
+
+def get_draw_overview(school_id: str, top_n: int = 3) -> List[Dict]:
+    """Summarize the draw of every non-discarded main session in a school.
+
+    Three queries regardless of the number of sessions: the sessions with
+    their winners, pool size and total tickets grouped by draw session, and
+    the top ``top_n`` candidates of each draw picked with ``ROW_NUMBER``.
+    Records from extra sessions count towards their main session's draw.
+    """
+    sessions = SessionModel.__table__
+    records = SessionRecord.__table__
+    pool = DraftPool.__table__
+    students = Student.__table__
+
+    main_sessions = (
+        db_session.query(SessionModel, Student)
+        .outerjoin(Student, Student.id == SessionModel.winner_student_id)
+        .filter(
+            SessionModel.school_id == school_id,
+            SessionModel.main_session_id.is_(None),
+            SessionModel.status != 'discarded',
+        )
+        .order_by(SessionModel.created_at.desc(), SessionModel.id)
+        .all()
+    )
+
+    draw_session_id = func.coalesce(sessions.c.main_session_id, sessions.c.id).label('draw_session_id')
+    clean_students = (
+        select(draw_session_id, records.c.student_id)
+        .select_from(records.join(sessions, sessions.c.id == records.c.session_id))
+        .where(
+            records.c.school_id == school_id,
+            records.c.category == 'clean',
+            records.c.student_id.isnot(None),
+        )
+        .distinct()
+        .subquery()
+    )
+    eligible = (
+        select(
+            clean_students.c.draw_session_id,
+            students.c.id.label('student_id'),
+            students.c.student_identifier,
+            students.c.preferred_name,
+            students.c.last_name,
+            students.c.house,
+            pool.c.ticket_number.label('tickets'),
+        )
+        .select_from(
+            clean_students
+            .join(students, students.c.id == clean_students.c.student_id)
+            .join(pool, and_(pool.c.school_id == school_id, pool.c.student_id == students.c.id))
+        )
+        .where(pool.c.ticket_number > 0)
+        .subquery()
+    )
+
+    totals = {
+        row.draw_session_id: (int(row.pool_size), float(row.total_tickets or 0))
+        for row in db_session.execute(
+            select(
+                eligible.c.draw_session_id,
+                func.count().label('pool_size'),
+                func.sum(eligible.c.tickets).label('total_tickets'),
+            ).group_by(eligible.c.draw_session_id)
+        )
+    }
+
+    top_candidates: Dict[str, List[Dict]] = {}
+    if top_n > 0:
+        ranked = select(
+            eligible,
+            func.row_number().over(
+                partition_by=eligible.c.draw_session_id,
+                order_by=(eligible.c.tickets.desc(), eligible.c.preferred_name, eligible.c.student_id),
+            ).label('rank'),
+        ).subquery()
+        for row in db_session.execute(
+            select(ranked).where(ranked.c.rank <= top_n).order_by(ranked.c.draw_session_id, ranked.c.rank)
+        ):
+            pool_total = totals.get(row.draw_session_id, (0, 0.0))[1]
+            top_candidates.setdefault(row.draw_session_id, []).append({
+                'student_id': row.student_id,
+                'student_identifier': row.student_identifier,
+                'display_name': f"{row.preferred_name} {row.last_name}",
+                'house': row.house,
+                'tickets': float(row.tickets),
+                'probability': (row.tickets / pool_total * 100.0) if pool_total > 0 else 0.0,
+            })
+
+    overview = []
+    for sess, winner in main_sessions:
+        pool_size, total_tickets = totals.get(sess.id, (0, 0.0))
+        overview.append({
+            'session_id': sess.id,
+            'session_name': sess.session_name,
+            'created_at': sess.created_at.isoformat() if sess.created_at else None,
+            'status': sess.status,
+            'draw_version': sess.draw_version or 0,
+            'finalized': bool(sess.finalized),
+            'winner': {
+                'student_id': winner.id,
+                'student_identifier': winner.student_identifier,
+                'display_name': f"{winner.preferred_name} {winner.last_name}",
+                'house': winner.house,
+                'tickets': sess.tickets_at_selection,
+                'probability': (
+                    sess.probability_at_selection / 100.0 if sess.probability_at_selection is not None else None
+                ),
+            } if winner else None,
+            'pool_size': pool_size,
+            'total_tickets': total_tickets,
+            'top_candidates': top_candidates.get(sess.id, []),
+        })
+    return overview
+
+
+def build_draw_sampler(session_id: str) -> WeightedSampler[Student]:
+    """Snapshot a session's eligible students into a reusable sampler."""
+    return WeightedSampler.from_pairs(get_eligible_students_with_tickets(session_id))
 
 
 def perform_weighted_draw(
-    session_id: str, user_id: str
+    session_id: str,
+    user_id: str,
+    sampler: Optional[WeightedSampler[Student]] = None,
 ) -> Tuple[Optional[Student], float, float, int]:
     """
     Perform weighted random draw based on tickets.
     Returns (winner_student, winner_tickets, probability, pool_size)
+
+    Pass a ``sampler`` from :func:`build_draw_sampler` to reuse an
+    eligibility snapshot instead of querying it again.
     """
-    eligible = get_eligible_students_with_tickets(session_id)
-    
-    if not eligible:
+    if sampler is None:
+        sampler = build_draw_sampler(session_id)
+
+    if not len(sampler):
         return None, 0.0, 0.0, 0
-    
-    total_tickets = sum(tickets for _, tickets in eligible)
-    
-    # Perform weighted random selection
-    target = secure_random.random() * total_tickets
-    cumulative = 0.0
-    winner = None
-    winner_tickets = 0.0
-    
-    for student, tickets in eligible:
-        cumulative += tickets
-        if target <= cumulative:
-            winner = student
-            winner_tickets = tickets
-            break
-    
-    # Fallback to first student if something went wrong
-    if winner is None and eligible:
-        winner, winner_tickets = eligible[0]
-    
-    probability = (winner_tickets / total_tickets * 100.0) if total_tickets > 0 else 0.0
-    
-    return winner, winner_tickets, probability, len(eligible)
+
+    index = sampler.draw_index(secure_random)
+    winner = sampler.items[index]
+    winner_tickets = sampler.weights[index]
+    probability = sampler.probability(index) * 100.0
+
+    return winner, winner_tickets, probability, len(sampler)
+
+
+def compare_and_set_draw(draw: SessionModel, expected_version: int, **values) -> bool:
+    """Apply ``values`` to the draw only if its ``draw_version`` is still ``expected_version``.
+
+    One conditional UPDATE that also bumps the version, so of two concurrent
+    transitions from the same version exactly one wins.
+    """
+    result = db_session.execute(
+        update(SessionModel)
+        .where(SessionModel.id == draw.id, SessionModel.draw_version == expected_version)
+        .values(draw_version=expected_version + 1, updated_at=_now_utc(), **values)
+        .execution_options(synchronize_session='evaluate')
+    )
+    if result.rowcount != 1:
+        return False
+    stage_eligibility_change(db_session, draw.school_id)
+    return True
+
+
+def record_draw_winner(
+    draw: SessionModel,
+    expected_version: int,
+    winner_student_id: str,
+    tickets: float,
+    probability: float,
+    pool_size: int,
+    user_id: str,
+    comment: Optional[str] = None,
+) -> bool:
+    """Store a newly drawn winner and its event; returns False if another transition won."""
+    claimed = compare_and_set_draw(
+        draw,
+        expected_version,
+        winner_student_id=winner_student_id,
+        method='random',
+        tickets_at_selection=int(tickets),
+        # Store probability as basis points (multiply by 100) to preserve 2 decimal places
+        probability_at_selection=int(round(probability * 100)),
+        eligible_pool_size=pool_size,
+        override_applied=0,
+        finalized=0,
+        finalized_by=None,
+        finalized_at=None,
+    )
+    if not claimed:
+        db_session.rollback()
+        return False
+
+    record_draw_event(
+        draw=draw,
+        event_type='draw',
+        user_id=user_id,
+        selected_student_id=winner_student_id,
+        tickets_at_event=tickets,
+        probability_at_event=probability,
+        eligible_pool_size=pool_size,
+        comment=comment,
+    )
+    db_session.commit()
+    return True
 
 
 def record_draw_event(
@@ -182,6 +496,7 @@ def record_draw_event(
 ) -> SessionDrawEvent:
     """Record a draw event in the database."""
     event = SessionDrawEvent(
+        school_id=draw.school_id,
         session_id=draw.id,
         draw_number=draw.draw_number,
         event_type=event_type,
@@ -206,9 +521,11 @@ def record_ticket_event(
     user_id: Optional[str] = None,
     session_record_id: Optional[str] = None,
     event_metadata: Optional[str] = None,
+    school_id: Optional[str] = None,
 ) -> SessionTicketEvent:
     """Record a ticket event in the database."""
     event = SessionTicketEvent(
+        school_id=school_id or _get_session_school_id(session_id),
         session_id=session_id,
         session_record_id=session_record_id,
         student_id=student_id,
@@ -227,12 +544,14 @@ def reset_student_tickets(
     student_id: str,
     user_id: Optional[str],
     reason: str,
+    school_id: Optional[str] = None,
 ) -> bool:
     """Reset a student's tickets to zero, recording the event.
 
     Returns True if a reset occurred, False if balance already zero.
     """
-    current_tickets = get_student_ticket_balance(student_id)
+    school_id = school_id or _get_session_school_id(session_id)
+    current_tickets = get_student_ticket_balance(student_id, school_id)
     if current_tickets <= 0:
         return False
 
@@ -244,127 +563,201 @@ def reset_student_tickets(
         ticket_balance_after=0.0,
         user_id=user_id,
         event_metadata=reason,
+        school_id=school_id,
     )
 
-    update_draft_pool(student_id, 0.0)
+    update_draft_pool(student_id, 0.0, school_id=school_id)
     return True
 
 
-def finalize_draw(draw: SessionModel, user_id: str, comment: Optional[str] = None) -> None:
-    """Finalize a draw and reset winner's tickets."""
+def finalize_draw(
+    draw: SessionModel,
+    user_id: str,
+    comment: Optional[str] = None,
+    expected_version: Optional[int] = None,
+) -> bool:
+    """Finalize a draw and reset winner's tickets.
+
+    Returns False, leaving the draw untouched, if it was already finalized or
+    changed since ``expected_version`` (default: the version on ``draw``).
+    """
     if draw.finalized:
-        return
-    
-    draw.finalized = 1
-    draw.finalized_by = user_id
-    draw.finalized_at = _now_utc()
-    draw.updated_at = _now_utc()
-    
+        return False
+    expected_version = draw.draw_version if expected_version is None else expected_version
+    winner_student_id = draw.winner_student_id
+
+    if not compare_and_set_draw(
+        draw,
+        expected_version,
+        finalized=1,
+        finalized_by=user_id,
+        finalized_at=_now_utc(),
+    ):
+        db_session.rollback()
+        return False
+
     # Record finalize event
     record_draw_event(
         draw=draw,
         event_type='finalize',
         user_id=user_id,
-        selected_student_id=draw.winner_student_id,
+        selected_student_id=winner_student_id,
         comment=comment,
     )
     
     # Reset winner's tickets to 0
-    if draw.winner_student_id:
+    if winner_student_id:
         reset_student_tickets(
             session_id=draw.id,
-            student_id=draw.winner_student_id,
+            student_id=winner_student_id,
             user_id=user_id,
             reason='Winner finalized - tickets reset',
+            school_id=draw.school_id,
         )
     
     db_session.commit()
+    return True
+
 
+def reset_draw(
+    draw: SessionModel,
+    user_id: str,
+    comment: Optional[str] = None,
+    expected_version: Optional[int] = None,
+) -> bool:
+    """Reset a draw, clearing the winner; returns False if another transition won."""
+    expected_version = draw.draw_version if expected_version is None else expected_version
+    winner_student_id = draw.winner_student_id
+
+    if not compare_and_set_draw(
+        draw,
+        expected_version,
+        winner_student_id=None,
+        method=None,
+        finalized=0,
+        finalized_by=None,
+        finalized_at=None,
+        tickets_at_selection=None,
+        probability_at_selection=None,
+        eligible_pool_size=None,
+        override_applied=0,
+    ):
+        db_session.rollback()
+        return False
 
-def reset_draw(draw: SessionModel, user_id: str, comment: Optional[str] = None) -> None:
-    """Reset a draw, clearing the winner."""
-    # Record restore event before resetting
     record_draw_event(
         draw=draw,
         event_type='restore',
         user_id=user_id,
-        selected_student_id=draw.winner_student_id,
+        selected_student_id=winner_student_id,
         comment=comment,
     )
-    
-    draw.winner_student_id = None
-    draw.method = None
-    draw.finalized = 0
-    draw.finalized_by = None
-    draw.finalized_at = None
-    draw.tickets_at_selection = None
-    draw.probability_at_selection = None
-    draw.eligible_pool_size = None
-    draw.override_applied = 0
-    draw.updated_at = _now_utc()
-    
     db_session.commit()
+    return True
 
 
-def get_draw_history(session_id: str) -> List[Dict]:
-    """Get all draw events for a session."""
-    events = (
-        db_session.query(SessionDrawEvent)
-        .filter_by(session_id=session_id)
-        .order_by(SessionDrawEvent.created_at)
-        .all()
+def _serialize_draw_event(event: SessionDrawEvent, student: Optional[Student], username: Optional[str]) -> Dict:
+    # Convert probability from basis points (stored as * 100) back to percentage
+    probability = (
+        event.probability_at_event / 100.0
+        if event.probability_at_event is not None
+        else None
     )
+    return {
+        'id': event.id,
+        'event_type': event.event_type,
+        'timestamp': event.created_at.isoformat() if event.created_at else None,
+        'created_by': event.created_by,
+        # Older events stored the username itself in created_by
+        'created_by_username': username or event.created_by,
+        'student_name': f"{student.preferred_name} {student.last_name}" if student else None,
+        'student_id': event.selected_student_id,
+        'tickets': event.tickets_at_event,
+        'probability': probability,
+        'pool_size': event.eligible_pool_size,
+        'comment': event.comment,
+    }
+
 
-    result = []
-    for event in events:
-        student = None
-        if event.selected_student_id:
-            student = db_session.query(Student).filter_by(id=event.selected_student_id).first()
-
-        # Convert probability from basis points (stored as * 100) back to percentage
-        probability = (
-            event.probability_at_event / 100.0
-            if event.probability_at_event is not None
-            else None
+def _draw_history_query(session_id: str, school_id: Optional[str]):
+    """Draw events joined to their student and creator, served by ``idx_draw_events_school_session``."""
+    school_id = school_id or _get_session_school_id(session_id)
+    return (
+        db_session.query(SessionDrawEvent, Student, User.username)
+        .outerjoin(Student, Student.id == SessionDrawEvent.selected_student_id)
+        .outerjoin(User, User.id == SessionDrawEvent.created_by)
+        .filter(
+            SessionDrawEvent.school_id == school_id,
+            SessionDrawEvent.session_id == session_id,
         )
+    )
+
+
+def get_draw_history(session_id: str, school_id: Optional[str] = None) -> List[Dict]:
+    """Get all draw events for a session, oldest first, in one joined query."""
+    rows = (
+        _draw_history_query(session_id, school_id)
+        .order_by(SessionDrawEvent.created_at, SessionDrawEvent.id)
+        .all()
+    )
+    return [_serialize_draw_event(event, student, username) for event, student, username in rows]
 
-        result.append({
-            'event_type': event.event_type,
-            'timestamp': event.created_at.isoformat() if event.created_at else None,
-            'created_by': event.created_by,
-            'student_name': f"{student.preferred_name} {student.last_name}" if student else None,
-            'student_id': event.selected_student_id,
-            'tickets': event.tickets_at_event,
-            'probability': probability,
-            'pool_size': event.eligible_pool_size,
-            'comment': event.comment,
-        })
 
-    return result
+def get_draw_history_page(
+    session_id: str,
+    school_id: Optional[str] = None,
+    *,
+    before: Optional[Tuple[datetime, str]] = None,
+    limit: int = 50,
+) -> Tuple[List[Dict], Optional[Tuple[datetime, str]]]:
+    """Return up to ``limit`` draw events newest first, older than ``before``.
+
+    ``before`` is the ``(created_at, id)`` of the last event already seen.
+    Returns ``(events, next_before)``; ``next_before`` is ``None`` on the
+    last page.
+    """
+    query = _draw_history_query(session_id, school_id)
+    if before is not None:
+        created_at, event_id = before
+        query = query.filter(or_(
+            SessionDrawEvent.created_at < created_at,
+            and_(SessionDrawEvent.created_at == created_at, SessionDrawEvent.id < event_id),
+        ))
+    rows = (
+        query.order_by(SessionDrawEvent.created_at.desc(), SessionDrawEvent.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    page = rows[:limit]
+    events = [_serialize_draw_event(event, student, username) for event, student, username in page]
+    next_before = (page[-1][0].created_at, page[-1][0].id) if len(rows) > limit else None
+    return events, next_before
 
 
-def get_student_ticket_balance(student_id: str) -> float:
+def get_student_ticket_balance(student_id: str, school_id: Optional[str] = None) -> float:
     """Return the current ticket balance for a student across sessions."""
-    pool_entry = (
-        db_session.query(DraftPool)
-        .filter_by(student_id=student_id)
-        .first()
-    )
-    return float(pool_entry.ticket_number) if pool_entry else 0.0
+    query = db_session.query(DraftPool.ticket_number).filter(DraftPool.student_id == student_id)
+    if school_id is not None:
+        query = query.filter(DraftPool.school_id == school_id)
+    row = query.first()
+    return float(row[0]) if row else 0.0
 
 
-def update_draft_pool(student_id: str, new_balance: float) -> None:
+def update_draft_pool(student_id: str, new_balance: float, school_id: Optional[str] = None) -> None:
     """Update or create the draft_pool entry for a student."""
-    pool_entry = (
-        db_session.query(DraftPool)
-        .filter_by(student_id=student_id)
-        .first()
-    )
+    query = db_session.query(DraftPool).filter(DraftPool.student_id == student_id)
+    if school_id is not None:
+        query = query.filter(DraftPool.school_id == school_id)
+    pool_entry = query.first()
     
     if pool_entry:
         pool_entry.ticket_number = int(new_balance)
     else:
+        if school_id is None:
+            row = db_session.query(Student.school_id).filter_by(id=student_id).first()
+            school_id = row[0] if row else None
         pool_entry = DraftPool(
+            school_id=school_id,
             student_id=student_id,
             ticket_number=int(new_balance),
         )
@@ -377,69 +770,218 @@ def update_tickets_for_record(
     category: str,
     session_record_id: str,
     user_id: str,
-) -> None:
+    school_id: Optional[str] = None,
+) -> Optional[float]:
     """
     Update tickets when a record is created.
     - clean: +1 ticket
     - red: reset to 0 tickets
+
+    Runs as two set-based statements (a ``draft_pool`` upsert or reset plus
+    the ``session_ticket_events`` insert) without reading the balance first.
+    Returns the balance after the update, or None for other categories.
     """
-    current_balance = get_student_ticket_balance(student_id)
-    
+    if category not in ('clean', 'red'):
+        return None
+
+    school_id = school_id or _get_session_school_id(session_id)
+    pool = DraftPool.__table__
+    ticket_events = SessionTicketEvent.__table__
+    occurred_at = _now_utc()
+    stage_eligibility_change(db_session, school_id)
+
     if category == 'clean':
         # Award 1 ticket for clean plate
-        new_balance = current_balance + 1.0
-        tickets_delta = 1.0
-        event_type = 'earn'
-        
-        # Record ticket event
-        record_ticket_event(
-            session_id=session_id,
+        upsert = dialect_insert(pool).values(
+            id=str(uuid.uuid4()),
+            school_id=school_id,
             student_id=student_id,
-            event_type=event_type,
-            tickets_delta=tickets_delta,
-            ticket_balance_after=new_balance,
-            user_id=user_id,
+            ticket_number=1,
+        )
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[pool.c.school_id, pool.c.student_id],
+            set_={'ticket_number': pool.c.ticket_number + 1},
+        ).returning(pool.c.ticket_number)
+        new_balance = float(db_session.execute(upsert).scalar_one())
+
+        db_session.execute(ticket_events.insert().values(
+            id=str(uuid.uuid4()),
+            school_id=school_id,
+            session_id=session_id,
             session_record_id=session_record_id,
-            event_metadata=f'Earned ticket for clean plate',
+            student_id=student_id,
+            event_type='earn',
+            tickets_delta=1,
+            ticket_balance_after=int(new_balance),
+            occurred_at=occurred_at,
+            occurred_by=user_id,
+            event_metadata='Earned ticket for clean plate',
+        ))
+        return new_balance
+
+    # Reset tickets for red plate; the event captures the balance being cleared.
+    positive_balance = (
+        (pool.c.school_id == school_id)
+        & (pool.c.student_id == student_id)
+        & (pool.c.ticket_number > 0)
+    )
+    reset_event = select(
+        literal(str(uuid.uuid4())),
+        literal(school_id),
+        literal(session_id),
+        literal(session_record_id),
+        pool.c.student_id,
+        literal('reset'),
+        -pool.c.ticket_number,
+        literal(0),
+        literal(occurred_at, DateTime(timezone=True)),
+        literal(user_id, String),
+        literal('Tickets reset due to red plate'),
+    ).where(positive_balance)
+    db_session.execute(ticket_events.insert().from_select(
+        [
+            'id', 'school_id', 'session_id', 'session_record_id', 'student_id', 'event_type',
+            'tickets_delta', 'ticket_balance_after', 'occurred_at', 'occurred_by', 'event_metadata',
+        ],
+        reset_event,
+    ))
+    db_session.execute(pool.update().where(positive_balance).values(ticket_number=0))
+    return 0.0
+
+
+def rebuild_ticket_balances(school_id: str) -> Dict[str, int]:
+    """Recompute every student's balance in a school from ``session_ticket_events``.
+
+    Events from discarded sessions are ignored and deleted sessions take their
+    events with them. A balance is the sum of earn/adjust deltas after the
+    student's last remaining reset, found with window functions in one query.
+    """
+    events = SessionTicketEvent.__table__
+    sessions = SessionModel.__table__
+    ordered = (
+        select(
+            events.c.student_id,
+            events.c.event_type,
+            events.c.tickets_delta,
+            func.row_number().over(
+                partition_by=events.c.student_id,
+                order_by=(events.c.occurred_at, events.c.id),
+            ).label('seq'),
+        )
+        .select_from(events.join(sessions, sessions.c.id == events.c.session_id))
+        .where(
+            events.c.school_id == school_id,
+            events.c.student_id.is_not(None),
+            sessions.c.status != 'discarded',
+        )
+        .subquery()
+    )
+    with_last_reset = select(
+        ordered.c.student_id,
+        ordered.c.event_type,
+        ordered.c.tickets_delta,
+        ordered.c.seq,
+        func.max(case((ordered.c.event_type == 'reset', ordered.c.seq), else_=0))
+        .over(partition_by=ordered.c.student_id)
+        .label('last_reset'),
+    ).subquery()
+    balances = select(
+        with_last_reset.c.student_id,
+        func.sum(case(
+            (
+                and_(with_last_reset.c.seq > with_last_reset.c.last_reset, with_last_reset.c.event_type != 'reset'),
+                with_last_reset.c.tickets_delta,
+            ),
+            else_=0,
+        )),
+    ).group_by(with_last_reset.c.student_id)
+    return {student_id: max(0, int(total or 0)) for student_id, total in db_session.execute(balances)}
+
+
+def rebuild_draft_pool(school_id: str, *, dry_run: bool = True) -> Dict:
+    """Bring ``draft_pool`` for a school back in line with its ticket events.
+
+    Returns a diff report; with ``dry_run`` nothing is written. Otherwise the
+    changed rows are written with one batched update and one batched insert
+    and the caller's transaction is committed.
+    """
+    pool = DraftPool.__table__
+    rebuilt = rebuild_ticket_balances(school_id)
+    current = {
+        row.student_id: row
+        for row in db_session.execute(
+            select(pool.c.id, pool.c.student_id, pool.c.ticket_number).where(pool.c.school_id == school_id)
         )
-        
-        # Update draft pool
-        update_draft_pool(student_id, new_balance)
-        
-    elif category == 'red':
-        # Reset tickets for red plate
-        if current_balance > 0:
-            new_balance = 0.0
-            tickets_delta = -current_balance
-            event_type = 'reset'
-            
-            # Record ticket event
-            record_ticket_event(
-                session_id=session_id,
-                student_id=student_id,
-                event_type=event_type,
-                tickets_delta=tickets_delta,
-                ticket_balance_after=new_balance,
-                user_id=user_id,
-                session_record_id=session_record_id,
-                event_metadata=f'Tickets reset due to red plate',
+        if row.student_id
+    }
+
+    changes = []
+    updates = []
+    inserts = []
+    for student_id in sorted(set(current) | set(rebuilt)):
+        row = current.get(student_id)
+        before = int(row.ticket_number) if row is not None else 0
+        after = rebuilt.get(student_id, 0)
+        if before == after:
+            continue
+        changes.append({'student_id': student_id, 'current': before, 'rebuilt': after, 'delta': after - before})
+        if row is not None:
+            updates.append({'row_id': row.id, 'tickets': after})
+        else:
+            inserts.append({'id': str(uuid.uuid4()), 'school_id': school_id, 'student_id': student_id, 'ticket_number': after})
+
+    if changes:
+        names = {
+            student.id: student
+            for student in db_session.query(Student).filter(Student.id.in_([c['student_id'] for c in changes]))
+        }
+        for change in changes:
+            student = names.get(change['student_id'])
+            change['student_identifier'] = student.student_identifier if student else None
+            change['display_name'] = f"{student.preferred_name} {student.last_name}" if student else None
+
+    if not dry_run and changes:
+        if updates:
+            db_session.execute(
+                pool.update().where(pool.c.id == bindparam('row_id')).values(ticket_number=bindparam('tickets')),
+                updates,
             )
-            
-            # Update draft pool
-            update_draft_pool(student_id, new_balance)
+        if inserts:
+            db_session.execute(pool.insert(), inserts)
+        stage_eligibility_change(db_session, school_id)
+        db_session.commit()
+
+    return {
+        'school_id': school_id,
+        'dry_run': dry_run,
+        'students_checked': len(set(current) | set(rebuilt)),
+        'changed_count': len(changes),
+        'tickets_delta': sum(change['delta'] for change in changes),
+        'changes': changes,
+    }
 
 
 __all__ = [
+    'build_draw_sampler',
     'calculate_ticket_balances',
+    'compare_and_set_draw',
     'finalize_draw',
+    'get_candidate_profiles',
     'get_clean_student_ids_for_session',
     'get_draw_history',
+    'get_draw_history_page',
+    'get_draw_overview',
+    'get_draw_overview_stamp',
+    'get_eligibility_snapshot',
     'get_eligible_students_with_tickets',
     'get_or_create_session_draw',
     'get_session_ids_for_draw',
     'get_student_ticket_balance',
     'perform_weighted_draw',
+    'rebuild_draft_pool',
+    'rebuild_ticket_balances',
     'record_draw_event',
+    'record_draw_winner',
     'record_ticket_event',
     'reset_draw',
     'reset_student_tickets',
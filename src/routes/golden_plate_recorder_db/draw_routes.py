@@ -1,22 +1,107 @@
 """Draw routes for database-backed system."""
+import hashlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-from flask import jsonify, request, session
+from flask import Response, jsonify, request, session
 
 from . import recorder_bp
-from .db import Session as SessionModel, SessionRecord, Student, _now_utc, db_session
+from .db import DEFAULT_SCHOOL_ID, Session as SessionModel, SessionRecord, Student, db_session
 from .draw_db import (
-    calculate_ticket_balances,
     finalize_draw as finalize_draw_db,
+    get_candidate_profiles,
     get_draw_history,
-    get_eligible_students_with_tickets,
+    get_draw_history_page,
+    get_draw_overview,
+    get_draw_overview_stamp,
+    get_eligibility_snapshot,
     get_or_create_session_draw,
     get_session_ids_for_draw,
     perform_weighted_draw,
-    record_draw_event,
+    record_draw_winner,
     reset_draw as reset_draw_db,
 )
-from .utils import extract_student_id_from_key, format_display_name, make_student_key, normalize_name
-from .security import require_admin, require_auth_or_guest, require_superadmin
+from .utils import (
+    decode_keyset_cursor,
+    encode_keyset_cursor,
+    make_student_key,
+    normalize_name,
+)
+from .security import get_current_user, require_admin, require_auth_or_guest, require_superadmin
+from .simulation import DEFAULT_SIMULATIONS, MAX_SIMULATIONS, simulate_draws
+from .student_cache import get_student_resolver
+from .ticket_ledger import flush_ticket_ledger, pending_ticket_update_count
+
+
+def _current_user_id():
+    """``users.id`` of the signed-in user, for ``created_by``/``occurred_by`` columns."""
+    return session.get('user_uuid') or session.get('user_id')
+
+
+def _expected_draw_version(data, draw):
+    """Draw version the client last saw (``expected_version``), else the one just read.
+
+    Returns None if the client sent something that is not an integer.
+    """
+    raw = data.get('expected_version')
+    if raw is None:
+        return draw.draw_version or 0
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _serialize_draw_winner(draw_record):
+    if not draw_record.winner_student_id:
+        return None
+    winner = db_session.query(Student).filter_by(id=draw_record.winner_student_id).first()
+    if not winner:
+        return None
+    # Convert probability from basis points (stored as * 100) back to percentage
+    probability = (
+        draw_record.probability_at_selection / 100.0
+        if draw_record.probability_at_selection is not None
+        else None
+    )
+    return {
+        'student_id': winner.id,
+        'student_identifier': winner.student_identifier,
+        'preferred_name': winner.preferred_name,
+        'last_name': winner.last_name,
+        'display_name': f"{winner.preferred_name} {winner.last_name}",
+        'grade': winner.grade,
+        'advisor': winner.advisor,
+        'house': winner.house,
+        'clan': winner.clan,
+        'tickets': draw_record.tickets_at_selection,
+        'probability': probability,
+    }
+
+
+def _get_school_session(session_id):
+    """Return the session only if it belongs to the caller's school."""
+    user = get_current_user()
+    school_id = user['school_id'] if user else session.get('school_id', DEFAULT_SCHOOL_ID)
+    return db_session.query(SessionModel).filter_by(id=session_id, school_id=school_id).first()
+
+
+def _flush_ledger_for_read(school_id):
+    """Apply queued ticket updates before balances are read; returns how many are still pending."""
+    if flush_ticket_ledger(school_id):
+        return 0
+    return pending_ticket_update_count(school_id)
+
+
+def _draw_conflict_response(session_id):
+    """409 for a draw transition that lost its compare-and-set, with the current state."""
+    db_session.rollback()
+    draw = get_or_create_session_draw(session_id)
+    return jsonify({
+        'error': 'The draw was changed by another request',
+        'draw_version': draw.draw_version,
+        'finalized': bool(draw.finalized),
+        'winner': _serialize_draw_winner(draw),
+    }), 409
 
 
 @recorder_bp.route('/session/<session_id>/draw/summary', methods=['GET'])
@@ -34,29 +119,32 @@ def get_draw_summary(session_id):
         if session.get('guest_access') and not sess.is_public:
             return jsonify({'error': 'Access denied'}), 403
 
-    # Get eligible students with tickets
-    eligible = get_eligible_students_with_tickets(session_id)
-    total_tickets = sum(tickets for _, tickets in eligible)
-    
+    # Guests only read; draining the ticket queue is left to staff and the worker
+    if require_admin():
+        pending_updates = _flush_ledger_for_read(sess.school_id)
+    else:
+        pending_updates = pending_ticket_update_count(sess.school_id)
+    # Eligible students with tickets, cached until the school's ledger changes
+    snapshot = get_eligibility_snapshot(session_id, sess.school_id)
+    total_tickets = snapshot.total_tickets
+
     candidates = []
-    for student, tickets in eligible:
-        probability = (tickets / total_tickets * 100.0) if total_tickets > 0 else 0.0
+    for candidate in snapshot.candidates:
         candidates.append({
-            'student_id': student.id,
-            'student_identifier': student.student_identifier,
-            'preferred_name': student.preferred_name,
-            'last_name': student.last_name,
-            'display_name': f"{student.preferred_name} {student.last_name}",
-            'grade': student.grade,
-            'advisor': student.advisor,
-            'house': student.house,
-            'clan': student.clan,
-            'tickets': tickets,
-            'probability': probability,
+            'student_id': candidate.student_id,
+            'student_identifier': candidate.student_identifier,
+            'preferred_name': candidate.preferred_name,
+            'last_name': candidate.last_name,
+            'display_name': candidate.display_name,
+            'grade': candidate.grade,
+            'advisor': candidate.advisor,
+            'house': candidate.house,
+            'clan': candidate.clan,
+            'tickets': candidate.tickets,
+            'probability': snapshot.probability(candidate.tickets),
         })
     
     # Get draw info
-    draw = db_session.query(SessionModel.__table__.c.id).filter_by(id=session_id).first()
     draw_record = get_or_create_session_draw(session_id)
     
     # Convert probability from basis points (stored as * 100) back to percentage
@@ -75,28 +163,12 @@ def get_draw_summary(session_id):
         'probability_at_selection': probability_at_selection,
         'eligible_pool_size': draw_record.eligible_pool_size,
         'finalized_at': draw_record.finalized_at.isoformat() if draw_record.finalized_at else None,
-        'winner': None,
+        'draw_version': draw_record.draw_version,
+        'winner': _serialize_draw_winner(draw_record),
     }
     
-    if draw_record.winner_student_id:
-        winner = db_session.query(Student).filter_by(id=draw_record.winner_student_id).first()
-        if winner:
-            draw_info['winner'] = {
-                'student_id': winner.id,
-                'student_identifier': winner.student_identifier,
-                'preferred_name': winner.preferred_name,
-                'last_name': winner.last_name,
-                'display_name': f"{winner.preferred_name} {winner.last_name}",
-                'grade': winner.grade,
-                'advisor': winner.advisor,
-                'house': winner.house,
-                'clan': winner.clan,
-                'tickets': draw_record.tickets_at_selection,
-                'probability': probability_at_selection,
-            }
-    
     # Get history
-    history = get_draw_history(session_id)
+    history = get_draw_history(session_id, sess.school_id)
     
     # Count how many extra sessions are merged in, for UI context
     extra_session_ids = [
@@ -110,6 +182,8 @@ def get_draw_summary(session_id):
         'status': sess.status,
         'total_tickets': total_tickets,
         'eligible_count': len(candidates),
+        'eligibility_version': snapshot.version,
+        'pending_ticket_updates': pending_updates,
         'top_candidates': candidates[:3],
         'candidates': candidates,
         'draw_info': draw_info,
@@ -122,6 +196,146 @@ def get_draw_summary(session_id):
     return jsonify(response), 200
 
 
+DRAW_OVERVIEW_TOP_N = 3
+MAX_DRAW_OVERVIEW_TOP_N = 20
+
+
+@recorder_bp.route('/draw/overview', methods=['GET'])
+def get_draw_overview_route():
+    """Winner, pool size and top candidates for every main session of the school.
+
+    Tagged with an ETag derived from the school's cache versions, so a
+    matching ``If-None-Match`` is answered with 304 without building it.
+    """
+    if not require_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    try:
+        top_n = int(request.args.get('top', DRAW_OVERVIEW_TOP_N))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top must be an integer'}), 400
+    top_n = max(0, min(top_n, MAX_DRAW_OVERVIEW_TOP_N))
+
+    school_id = get_current_user()['school_id']
+    pending_updates = _flush_ledger_for_read(school_id)
+    stamp = get_draw_overview_stamp(school_id)
+    etag = hashlib.sha1(
+        repr((school_id, top_n, stamp, pending_updates)).encode('utf-8')
+    ).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            'status': 'success',
+            'top_n': top_n,
+            'pending_ticket_updates': pending_updates,
+            'sessions': get_draw_overview(school_id, top_n),
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+DRAW_HISTORY_PAGE_SIZE = 50
+MAX_DRAW_HISTORY_PAGE_SIZE = 200
+
+
+@recorder_bp.route('/session/<session_id>/draw/history', methods=['GET'])
+def get_draw_history_route(session_id):
+    """Page through draw events newest first with ``?before=<cursor>&limit=``."""
+    if not require_auth_or_guest():
+        return jsonify({'error': 'Authentication or guest access required'}), 401
+
+    sess = _get_school_session(session_id)
+    if not sess:
+        return jsonify({'error': 'Session not found'}), 404
+
+    if require_superadmin() is False and require_admin() is False:
+        if session.get('guest_access') and not sess.is_public:
+            return jsonify({'error': 'Access denied'}), 403
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', DRAW_HISTORY_PAGE_SIZE)), MAX_DRAW_HISTORY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    before = None
+    cursor = (request.args.get('before') or '').strip()
+    if cursor:
+        try:
+            cursor_session_id, created_at, event_id = decode_keyset_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if cursor_session_id != session_id:
+            return jsonify({'error': 'Cursor does not belong to this session'}), 400
+        before = (created_at, event_id)
+
+    events, next_before = get_draw_history_page(session_id, sess.school_id, before=before, limit=limit)
+
+    return jsonify({
+        'session_id': session_id,
+        'history': events,
+        'has_more': next_before is not None,
+        'next_cursor': encode_keyset_cursor(session_id, *next_before) if next_before else None,
+    }), 200
+
+
+def _simulation_profile(candidate):
+    return {
+        'student_id': candidate.student_id,
+        'student_identifier': candidate.student_identifier,
+        'display_name': candidate.display_name,
+        'grade': candidate.grade,
+        'house': candidate.house,
+        'clan': candidate.clan,
+    }
+
+
+@recorder_bp.route('/session/<session_id>/draw/simulate', methods=['GET'])
+def simulate_draw(session_id):
+    """Run Monte Carlo draws against the current pool and report fairness.
+
+    Answered synchronously: ``n`` is capped at ``MAX_SIMULATIONS`` and the
+    whole run shares one deadline, after which it returns 504.
+    """
+    if not require_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    sess = _get_school_session(session_id)
+    if not sess:
+        return jsonify({'error': 'Session not found'}), 404
+
+    if sess.main_session_id:
+        return jsonify({'error': 'Draws are disabled for extra sessions merged into a main session'}), 400
+
+    try:
+        simulations = int(request.args.get('n', DEFAULT_SIMULATIONS))
+        seed = request.args.get('seed')
+        seed = int(seed) if seed not in (None, '') else None
+    except ValueError:
+        return jsonify({'error': 'n and seed must be integers'}), 400
+    if simulations < 1 or simulations > MAX_SIMULATIONS:
+        return jsonify({'error': f'n must be between 1 and {MAX_SIMULATIONS}'}), 400
+
+    pending_updates = _flush_ledger_for_read(sess.school_id)
+    snapshot = get_eligibility_snapshot(session_id, sess.school_id)
+    # Release the connection before waiting on the simulation pool
+    db_session.remove()
+
+    try:
+        report = simulate_draws(snapshot.sampler(), simulations, profile=_simulation_profile, seed=seed)
+    except FutureTimeoutError:
+        return jsonify({'error': 'Simulation timed out; try a smaller n'}), 504
+
+    return jsonify({
+        'status': 'success',
+        'session_id': session_id,
+        'pending_ticket_updates': pending_updates,
+        **report,
+    }), 200
+
+
 @recorder_bp.route('/session/<session_id>/draw/start', methods=['POST'])
 def start_draw(session_id):
     """Start a weighted random draw for a session."""
@@ -141,6 +355,14 @@ def start_draw(session_id):
     if sess.status == 'discarded':
         return jsonify({'error': 'Session is discarded from draw calculations'}), 400
 
+    expected_version = _expected_draw_version(data, get_or_create_session_draw(session_id))
+    if expected_version is None:
+        return jsonify({'error': 'expected_version must be an integer'}), 400
+
+    # Queued ticket updates must land before balances are read
+    if not flush_ticket_ledger(sess.school_id):
+        return jsonify({'error': 'Ticket ledger is still catching up; try again shortly'}), 503
+
     # Check if there are any student records across the main session + extras
     draw_session_ids = get_session_ids_for_draw(session_id)
     record_count = (
@@ -157,41 +379,24 @@ def start_draw(session_id):
 
     # Perform the draw
     winner, winner_tickets, probability, pool_size = perform_weighted_draw(
-        session_id, session.get('user_id')
+        session_id, _current_user_id()
     )
     
     if not winner:
         return jsonify({'error': 'No eligible tickets available for drawing'}), 400
 
-    # Get or create draw record
     draw = get_or_create_session_draw(session_id)
-    
-    # Update draw with winner
-    draw.winner_student_id = winner.id
-    draw.method = 'random'
-    draw.tickets_at_selection = int(winner_tickets)
-    # Store probability as basis points (multiply by 100) to preserve 2 decimal places
-    draw.probability_at_selection = int(round(probability * 100))
-    draw.eligible_pool_size = pool_size
-    draw.override_applied = 0
-    draw.finalized = 0
-    draw.finalized_by = None
-    draw.finalized_at = None
-    draw.updated_at = _now_utc()
-    
-    # Record the event
-    record_draw_event(
-        draw=draw,
-        event_type='draw',
-        user_id=session.get('user_id'),
-        selected_student_id=winner.id,
-        tickets_at_event=winner_tickets,
-        probability_at_event=probability,
-        eligible_pool_size=pool_size,
+    if not record_draw_winner(
+        draw,
+        expected_version,
+        winner_student_id=winner.id,
+        tickets=winner_tickets,
+        probability=probability,
+        pool_size=pool_size,
+        user_id=_current_user_id(),
         comment=comment,
-    )
-
-    db_session.commit()
+    ):
+        return _draw_conflict_response(session_id)
 
     winner_data = {
         'student_id': winner.id,
@@ -211,6 +416,7 @@ def start_draw(session_id):
         'status': 'success',
         'winner': winner_data,
         'pool_size': pool_size,
+        'draw_version': draw.draw_version,
     }), 200
 
 
@@ -235,17 +441,25 @@ def finalize_draw_route(session_id):
     if not draw.winner_student_id:
         return jsonify({'error': 'No winner to finalize'}), 400
 
+    expected_version = _expected_draw_version(data, draw)
+    if expected_version is None:
+        return jsonify({'error': 'expected_version must be an integer'}), 400
+
     if draw.finalized:
+        if expected_version != draw.draw_version:
+            return _draw_conflict_response(session_id)
         return jsonify({'error': 'Draw already finalized'}), 400
 
     # Finalize the draw
-    finalize_draw_db(draw, session.get('user_id'), comment)
+    if not finalize_draw_db(draw, _current_user_id(), comment, expected_version=expected_version):
+        return _draw_conflict_response(session_id)
     
     winner = db_session.query(Student).filter_by(id=draw.winner_student_id).first()
 
     return jsonify({
         'status': 'success',
         'finalized': True,
+        'draw_version': draw.draw_version,
         'winner': {
             'student_id': winner.id,
             'student_identifier': winner.student_identifier,
@@ -280,12 +494,18 @@ def reset_draw_route(session_id):
     if draw.finalized and not require_superadmin():
         return jsonify({'error': 'Only super admins can reset a finalized draw'}), 403
 
+    expected_version = _expected_draw_version(data, draw)
+    if expected_version is None:
+        return jsonify({'error': 'expected_version must be an integer'}), 400
+
     # Reset the draw
-    reset_draw_db(draw, session.get('user_id'), comment)
+    if not reset_draw_db(draw, _current_user_id(), comment, expected_version=expected_version):
+        return _draw_conflict_response(session_id)
 
     return jsonify({
         'status': 'success',
         'reset': True,
+        'draw_version': draw.draw_version,
     }), 200
 
 
@@ -307,6 +527,9 @@ def override_draw(session_id):
 
     data = request.get_json(silent=True) or {}
     comment = (data.get('comment') or '').strip() or None
+    expected_version = _expected_draw_version(data, get_or_create_session_draw(session_id))
+    if expected_version is None:
+        return jsonify({'error': 'expected_version must be an integer'}), 400
 
     provided_key_raw = data.get('student_key')
     provided_key = normalize_name(provided_key_raw).lower()
@@ -319,101 +542,40 @@ def override_draw(session_id):
     if not any([provided_key, provided_identifier, provided_student_id, input_value, provided_preferred and provided_last]):
         return jsonify({'error': 'A student key, name, or identifier is required to override the draw winner'}), 400
 
-    draw_session_ids = get_session_ids_for_draw(session_id)
-    record_rows = (
-        db_session.query(SessionRecord, Student)
-        .outerjoin(Student, SessionRecord.student_id == Student.id)
-        .filter(
-            SessionRecord.session_id.in_(draw_session_ids),
-            SessionRecord.category.in_(['clean', 'red'])
-        )
-        .all()
-    )
+    if not flush_ticket_ledger(sess.school_id):
+        return jsonify({'error': 'Ticket ledger is still catching up; try again shortly'}), 503
 
-    if not record_rows:
+    candidates = get_candidate_profiles(session_id, sess.school_id)
+    if not len(candidates):
         return jsonify({'error': 'No student records available for this session'}), 400
 
-    ticket_balances = calculate_ticket_balances()
-    eligible = get_eligible_students_with_tickets(session_id)
-    total_tickets = sum(tickets for _, tickets in eligible)
-
-    profiles = {}
-
-    def merge_profile(profile):
-        key = profile.get('key')
-        if not key:
-            return
-        existing = profiles.get(key) or {}
-        merged = {**profile}
-        if existing:
-            for field in ['student_id', 'student_identifier', 'preferred_name', 'last_name', 'grade', 'advisor', 'house', 'clan']:
-                if not merged.get(field) and existing.get(field):
-                    merged[field] = existing[field]
-            merged['tickets'] = merged.get('tickets') or existing.get('tickets', 0.0)
-            merged['display_name'] = merged.get('display_name') or existing.get('display_name')
-        profiles[key] = merged
-
-    for session_record, student in record_rows:
-        preferred = normalize_name(session_record.preferred_name or (student.preferred_name if student else ''))
-        last = normalize_name(session_record.last_name or (student.last_name if student else ''))
-        student_identifier = normalize_name(student.student_identifier if student else '')
-        if not student_identifier:
-            student_identifier = extract_student_id_from_key(session_record.dedupe_key)
-        key = make_student_key(preferred, last, student_identifier)
-        profile = {
-            'key': key,
-            'preferred_name': preferred,
-            'last_name': last,
-            'grade': normalize_name(student.grade if student else ''),
-            'advisor': normalize_name(student.advisor if student else ''),
-            'house': normalize_name(student.house if student else ''),
-            'clan': normalize_name(student.clan if student else ''),
-            'student_id': student.id if student else None,
-            'student_identifier': student_identifier,
-        }
-        profile['display_name'] = format_display_name(profile)
-        if profile.get('student_id'):
-            profile['tickets'] = ticket_balances.get(profile['student_id'], 0.0)
-        merge_profile(profile)
+    snapshot = get_eligibility_snapshot(session_id, sess.school_id)
+    total_tickets = snapshot.total_tickets
 
     override_key = provided_key
 
     if not override_key and provided_identifier:
-        match = next(
-            (p for p in profiles.values() if normalize_name(p.get('student_identifier')).lower() == provided_identifier.lower()),
-            None
-        )
-        if match:
-            override_key = match.get('key')
+        override_key = candidates.by_identifier.get(provided_identifier.lower())
 
     if not override_key and provided_student_id:
-        match = next(
-            (p for p in profiles.values() if normalize_name(p.get('student_id')) == provided_student_id),
-            None
-        )
-        if match:
-            override_key = match.get('key')
+        override_key = candidates.by_student_id.get(provided_student_id)
 
     if not override_key and input_value:
         normalized_input = input_value.lower()
-        match = next(
-            (p for p in profiles.values() if (p.get('display_name') or '').lower() == normalized_input),
-            None
-        )
-        if not match and input_value.isdigit():
-            match = next(
-                (
-                    p
-                    for p in profiles.values()
-                    if normalize_name(p.get('student_identifier')).lower() == normalized_input
-                ),
-                None
-            )
-        if match:
-            override_key = match.get('key')
+        override_key = candidates.by_display_name.get(normalized_input)
+        if not override_key and input_value.isdigit():
+            override_key = candidates.by_identifier.get(normalized_input)
+
+    resolver = get_student_resolver(sess.school_id)
 
     if not override_key and provided_preferred and provided_last:
         override_key = make_student_key(provided_preferred, provided_last, provided_identifier)
+        # Roster students are keyed by identifier, so map the name to one first
+        match = resolver.find_by_name(provided_preferred, provided_last)
+        if match:
+            roster_key = make_student_key(match.preferred_name, match.last_name, match.student_identifier)
+            if roster_key in candidates:
+                override_key = roster_key
 
     if not override_key:
         return jsonify({
@@ -421,13 +583,13 @@ def override_draw(session_id):
             'details': 'Provide a student name, identifier, or override key for someone recorded in this session.'
         }), 400
 
-    if override_key not in profiles:
+    if override_key not in candidates:
         return jsonify({
             'error': 'Specified student is not part of this session',
             'details': 'Only students recorded in this session can be selected for an override.'
         }), 404
 
-    profile = profiles[override_key]
+    profile = candidates.profile(override_key)
 
     if not profile.get('student_id'):
         student_identifier = profile.get('student_identifier')
@@ -436,11 +598,7 @@ def override_draw(session_id):
                 'error': 'Student record is missing an identifier',
                 'details': 'Add a student identifier to this entry or select another recorded student.'
             }), 400
-        student = (
-            db_session.query(Student)
-            .filter_by(student_identifier=student_identifier, school_id=sess.school_id)
-            .first()
-        )
+        student = resolver.find_by_identifier([student_identifier])
         if not student:
             student = Student(
                 school_id=sess.school_id,
@@ -456,35 +614,21 @@ def override_draw(session_id):
             db_session.flush()
         profile['student_id'] = student.id
 
-    winner_tickets = ticket_balances.get(profile['student_id'], 0.0)
+    winner_tickets = profile.get('tickets') or 0.0
     probability = (winner_tickets / total_tickets * 100.0) if total_tickets > 0 else 0.0
 
     draw = get_or_create_session_draw(session_id)
-
-    draw.winner_student_id = profile['student_id']
-    draw.method = 'random'
-    draw.tickets_at_selection = int(winner_tickets)
-    # Store probability as basis points (multiply by 100) to preserve 2 decimal places
-    draw.probability_at_selection = int(round(probability * 100))
-    draw.eligible_pool_size = len(eligible)
-    draw.override_applied = 0
-    draw.finalized = 0
-    draw.finalized_by = None
-    draw.finalized_at = None
-    draw.updated_at = _now_utc()
-
-    record_draw_event(
-        draw=draw,
-        event_type='draw',
-        user_id=session.get('user_id'),
-        selected_student_id=profile['student_id'],
-        tickets_at_event=winner_tickets,
-        probability_at_event=probability,
-        eligible_pool_size=len(eligible),
+    if not record_draw_winner(
+        draw,
+        expected_version,
+        winner_student_id=profile['student_id'],
+        tickets=winner_tickets,
+        probability=probability,
+        pool_size=snapshot.pool_size,
+        user_id=_current_user_id(),
         comment=comment,
-    )
-
-    db_session.commit()
+    ):
+        return _draw_conflict_response(session_id)
 
     winner_data = {
         'student_id': profile.get('student_id'),
@@ -503,5 +647,6 @@ def override_draw(session_id):
     return jsonify({
         'status': 'success',
         'winner': winner_data,
-        'pool_size': len(eligible),
+        'pool_size': snapshot.pool_size,
+        'draw_version': draw.draw_version,
     }), 200
@@ -0,0 +1,270 @@
+"""Per-session draw eligibility snapshots with change-driven invalidation.
+
+Building the eligible pool joins ``session_records``, ``draft_pool`` and
+``students``; ``draw/summary`` is polled and used to redo that on every call.
+Snapshots are cached per session and stamped with their school's eligibility
+version. The version only moves when a commit touches what eligibility is
+built from: a ticket event or ``draft_pool`` change (which covers earning,
+red-plate resets and finalize/reset), a change to a session's status,
+merge target or draw state, or a removed session or session record. Scan
+counters on the ``sessions`` row do not count, so dirty and faculty scans
+leave the snapshots alone. A stale stamp makes the
+next caller rebuild; otherwise a poll is one primary-key read plus a
+dictionary lookup.
+
+Versions live in the ``eligibility_versions`` table and are bumped inside
+the committing transaction, so every worker process sees a change made by
+any other. Ticket balances are per school rather than per session, so one
+version covers every session in the school. Core statements that bypass
+the ORM register themselves with :func:`stage_eligibility_change`.
+
+The override candidate set (everyone recorded clean or red in the session
+and its extras) is cached the same way, stamped with the eligibility
+version, the school's roster version and the sessions' record counters.
+"""
+import threading
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select
+
+from .db import (
+    DraftPool,
+    EligibilityVersion,
+    Session as SessionModel,
+    SessionRecord,
+    SessionTicketEvent,
+    db_session,
+    dialect_insert,
+)
+from .sampler import WeightedSampler
+from .utils import normalize_name
+
+# Key used to park uncommitted changes on ``Session.info``
+_PENDING_CHANGES_KEY = 'eligibility_changes'
+# ``eligibility_versions`` row bumped when every school is invalidated at once
+ALL_SCHOOLS = '*'
+
+
+class EligibleCandidate(NamedTuple):
+    """Detached copy of an eligible student and their ticket balance."""
+
+    student_id: str
+    student_identifier: str
+    preferred_name: str
+    last_name: str
+    grade: str
+    advisor: str
+    house: str
+    clan: str
+    tickets: float
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.preferred_name} {self.last_name}"
+
+
+class EligibilitySnapshot:
+    """Eligible candidates for one draw session at one eligibility version."""
+
+    def __init__(self, session_id: str, school_id: str, version: int, candidates: Tuple[EligibleCandidate, ...]):
+        self.session_id = session_id
+        self.school_id = school_id
+        self.version = version
+        self.candidates = candidates
+        self.total_tickets = sum(candidate.tickets for candidate in candidates)
+        self.pool_size = len(candidates)
+        self._sampler: Optional[WeightedSampler[EligibleCandidate]] = None
+
+    @classmethod
+    def from_eligible(cls, session_id: str, school_id: str, version: int, eligible) -> 'EligibilitySnapshot':
+        """Build a snapshot from ``(Student, tickets)`` pairs."""
+        candidates = tuple(
+            EligibleCandidate(
+                student_id=student.id,
+                student_identifier=student.student_identifier,
+                preferred_name=student.preferred_name,
+                last_name=student.last_name,
+                grade=student.grade,
+                advisor=student.advisor,
+                house=student.house,
+                clan=student.clan,
+                tickets=float(tickets),
+            )
+            for student, tickets in eligible
+        )
+        return cls(session_id, school_id, version, candidates)
+
+    def probability(self, tickets: float) -> float:
+        """Return the win chance in percent for a ticket count."""
+        return (tickets / self.total_tickets * 100.0) if self.total_tickets > 0 else 0.0
+
+    def sampler(self) -> WeightedSampler[EligibleCandidate]:
+        if self._sampler is None:
+            self._sampler = WeightedSampler(list(self.candidates), [c.tickets for c in self.candidates])
+        return self._sampler
+
+
+class CandidateProfiles:
+    """Students recorded in a draw session, indexed for override lookups."""
+
+    def __init__(self, session_id: str, school_id: str, stamp: Hashable, profiles: Dict[str, Dict[str, Any]]):
+        self.session_id = session_id
+        self.school_id = school_id
+        self.stamp = stamp
+        self.by_key = profiles
+        self.by_identifier: Dict[str, str] = {}
+        self.by_student_id: Dict[str, str] = {}
+        self.by_display_name: Dict[str, str] = {}
+        # First profile wins on collisions, matching a scan in record order
+        for key, profile in profiles.items():
+            identifier = normalize_name(profile.get('student_identifier')).lower()
+            if identifier:
+                self.by_identifier.setdefault(identifier, key)
+            student_id = normalize_name(profile.get('student_id'))
+            if student_id:
+                self.by_student_id.setdefault(student_id, key)
+            display_name = (profile.get('display_name') or '').lower()
+            if display_name:
+                self.by_display_name.setdefault(display_name, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.by_key
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def profile(self, key: str) -> Dict[str, Any]:
+        """Return a copy of the profile for ``key`` that callers may modify."""
+        return dict(self.by_key[key])
+
+
+# Draw session id -> latest snapshot built for it
+_snapshots: Dict[str, EligibilitySnapshot] = {}
+# Draw session id -> latest override candidate set built for it
+_candidate_profiles: Dict[str, CandidateProfiles] = {}
+_lock = threading.RLock()
+
+
+def get_eligibility_version(school_id: str) -> int:
+    """Return a counter that changes whenever a school's draw eligibility may have."""
+    versions = EligibilityVersion.__table__
+    return int(db_session.execute(
+        select(func.coalesce(func.sum(versions.c.version), 0))
+        .where(versions.c.school_id.in_((school_id, ALL_SCHOOLS)))
+    ).scalar())
+
+
+def get_cached_snapshot(session_id: str, version: int) -> Optional[EligibilitySnapshot]:
+    snapshot = _snapshots.get(session_id)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    return None
+
+
+def store_snapshot(snapshot: EligibilitySnapshot) -> None:
+    """Cache ``snapshot`` unless its school changed while it was being built."""
+    with _lock:
+        if get_eligibility_version(snapshot.school_id) == snapshot.version:
+            _snapshots[snapshot.session_id] = snapshot
+
+
+def get_cached_candidate_profiles(session_id: str, stamp: Hashable) -> Optional[CandidateProfiles]:
+    candidates = _candidate_profiles.get(session_id)
+    if candidates is not None and candidates.stamp == stamp:
+        return candidates
+    return None
+
+
+def store_candidate_profiles(candidates: CandidateProfiles, version: int) -> None:
+    """Cache ``candidates`` unless the school's eligibility ``version`` moved while building."""
+    with _lock:
+        if get_eligibility_version(candidates.school_id) == version:
+            _candidate_profiles[candidates.session_id] = candidates
+
+
+def invalidate_eligibility(school_id: Optional[str] = None) -> None:
+    """Mark one school's snapshots (or all of them) stale once the current transaction commits."""
+    stage_eligibility_change(db_session, school_id)
+
+
+def reset_eligibility_cache() -> None:
+    """Drop this process's cached snapshots; versions are left alone."""
+    with _lock:
+        _snapshots.clear()
+        _candidate_profiles.clear()
+
+
+def stage_eligibility_change(session, school_id: Optional[str]) -> None:
+    """Queue a version bump for ``school_id`` (``None`` for every school) for ``session``'s commit."""
+    changes: List[Optional[str]] = session.info.setdefault(_PENDING_CHANGES_KEY, [])
+    changes.append(school_id)
+
+
+def _bump_versions(session, school_ids) -> None:
+    versions = EligibilityVersion.__table__
+    for school_id in sorted(school_ids):
+        session.execute(
+            dialect_insert(versions)
+            .values(school_id=school_id, version=1)
+            .on_conflict_do_update(
+                index_elements=[versions.c.school_id],
+                set_={'version': versions.c.version + 1},
+            )
+        )
+
+
+_WATCHED_MODELS = (SessionTicketEvent, DraftPool)
+# Sessions columns that decide which records and balances a draw sees; scan
+# counters and ``ledger_version`` move on every scan and are left out
+_WATCHED_SESSION_COLUMNS = ('status', 'main_session_id', 'winner_student_id', 'finalized', 'draw_version')
+
+
+def _session_draw_state_changed(obj) -> bool:
+    attrs = inspect(obj).attrs
+    return any(attrs[column].history.has_changes() for column in _WATCHED_SESSION_COLUMNS)
+
+
+@event.listens_for(db_session, 'after_flush')
+def _collect_eligibility_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, _WATCHED_MODELS):
+            stage_eligibility_change(session, obj.school_id)
+    for obj in session.dirty:
+        if isinstance(obj, _WATCHED_MODELS) and session.is_modified(obj, include_collections=False):
+            stage_eligibility_change(session, obj.school_id)
+        elif isinstance(obj, SessionModel) and _session_draw_state_changed(obj):
+            stage_eligibility_change(session, obj.school_id)
+    for obj in session.deleted:
+        if isinstance(obj, _WATCHED_MODELS + (SessionModel, SessionRecord)):
+            stage_eligibility_change(session, obj.school_id)
+
+
+@event.listens_for(db_session, 'before_commit')
+def _publish_eligibility_changes(session):
+    # Flush first so changes staged by the final flush land in this commit
+    session.flush()
+    changes = session.info.pop(_PENDING_CHANGES_KEY, None)
+    if not changes:
+        return
+    _bump_versions(session, {ALL_SCHOOLS} if None in changes else set(changes))
+
+
+@event.listens_for(db_session, 'after_rollback')
+def _discard_eligibility_changes(session):
+    session.info.pop(_PENDING_CHANGES_KEY, None)
+
+
+__all__ = [
+    'ALL_SCHOOLS',
+    'CandidateProfiles',
+    'EligibilitySnapshot',
+    'EligibleCandidate',
+    'get_cached_candidate_profiles',
+    'get_cached_snapshot',
+    'get_eligibility_version',
+    'invalidate_eligibility',
+    'reset_eligibility_cache',
+    'stage_eligibility_change',
+    'store_candidate_profiles',
+    'store_snapshot',
+]
@@ -2,6 +2,7 @@ import os
 
 from . import recorder_bp
 from .db import db_session
+from .domain import invalidate_ticket_checkpoints
 from .storage import reset_storage_for_testing
 
 _last_pytest_identifier = None
@@ -19,6 +20,7 @@ def _ensure_isolated_state_for_tests():
     current_identifier = pytest_identifier.split(' (')[0]
     if current_identifier != _last_pytest_identifier:
         reset_storage_for_testing()
+        invalidate_ticket_checkpoints()
         _last_pytest_identifier = current_identifier
 
 
@@ -0,0 +1,304 @@
+"""Reference-counted map images backed by the content-addressed blob store.
+
+Image rows (``map_submissions``, ``map_submission_images``,
+``map_backgrounds``) keep only ``image_sha256``, size and mime; the bytes
+live in :mod:`.blob_store`. Raw uploads waiting for conversion are held by
+``map_image_job_items``. Each stored hash has a ``map_blobs`` row whose
+``refcount`` is bumped by :func:`store_map_blob` and dropped by
+:func:`release_map_blob` in the same transaction as the row change.
+
+:func:`collect_map_blobs` replaces the old inline-bytes purge: it detaches
+images from orphaned and rejected rows, recounts every reference with one
+grouped query (repairing any drift), and deletes blobs that have had no
+references for longer than a grace period. Rows written before the blob
+store keep their inline ``image_data`` until :func:`migrate_inline_images`
+streams them out.
+"""
+import logging
+import time
+from datetime import timedelta
+from io import BytesIO
+from typing import BinaryIO, Callable, Dict, Iterator, Optional
+
+from sqlalchemy import select, text
+
+from .blob_store import DEFAULT_CHUNK_SIZE, get_blob_store
+from .map_db import (
+    MapBackground,
+    MapBlob,
+    MapSubmission,
+    MapSubmissionImage,
+    _map_now_utc,
+    map_db_session,
+    map_dialect_insert,
+)
+from .map_thumbnails import delete_derivatives
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GC_GRACE = timedelta(hours=1)
+_IMAGE_MODELS = (MapSubmission, MapSubmissionImage, MapBackground)
+
+_REFERENCE_COUNTS_SQL = '''
+    SELECT sha256, COUNT(*) AS refs FROM (
+        SELECT image_sha256 AS sha256 FROM map_submissions WHERE image_sha256 IS NOT NULL
+        UNION ALL
+        SELECT image_sha256 FROM map_submission_images WHERE image_sha256 IS NOT NULL
+        UNION ALL
+        SELECT image_sha256 FROM map_backgrounds WHERE image_sha256 IS NOT NULL
+        UNION ALL
+        SELECT source_sha256 FROM map_image_job_items WHERE source_sha256 IS NOT NULL
+    ) AS refs
+    GROUP BY sha256
+'''
+
+
+def acquire_map_blob(session, sha256: str, size: int, mime: Optional[str]) -> None:
+    """Take a reference on a blob that is already in the store.
+
+    One upsert, so concurrent uploads of the same bytes both count.
+    """
+    blobs = MapBlob.__table__
+    session.execute(
+        map_dialect_insert(blobs)
+        .values(sha256=sha256, size=size, mime=mime, refcount=1, created_at=_map_now_utc())
+        .on_conflict_do_update(
+            index_elements=[blobs.c.sha256],
+            set_={'refcount': blobs.c.refcount + 1, 'released_at': None},
+        )
+    )
+
+
+def store_map_blob(session, data: bytes, mime: Optional[str]) -> str:
+    """Write ``data`` to the blob store and take a reference on it; returns the hash."""
+    sha256, size = get_blob_store().put(data)
+    acquire_map_blob(session, sha256, size, mime)
+    return sha256
+
+
+def release_map_blob(session, sha256: Optional[str]) -> None:
+    """Drop one reference to ``sha256``; the file goes at the next collection."""
+    if not sha256:
+        return
+    session.query(MapBlob).filter(MapBlob.sha256 == sha256).update(
+        {MapBlob.refcount: MapBlob.refcount - 1},
+        synchronize_session=False,
+    )
+    session.query(MapBlob).filter(
+        MapBlob.sha256 == sha256,
+        MapBlob.refcount <= 0,
+        MapBlob.released_at.is_(None),
+    ).update({MapBlob.released_at: _map_now_utc()}, synchronize_session=False)
+
+
+def release_submission_images(session, submission) -> None:
+    """Drop the blob references held by a submission and its gallery rows."""
+    release_map_blob(session, submission.image_sha256)
+    extra_hashes = (
+        session.query(MapSubmissionImage.image_sha256)
+        .filter(
+            MapSubmissionImage.submission_id == submission.id,
+            MapSubmissionImage.image_sha256.isnot(None),
+        )
+        .all()
+    )
+    for (sha256,) in extra_hashes:
+        release_map_blob(session, sha256)
+
+
+def has_map_image(row) -> bool:
+    """Return whether an image row still has bytes, in the store or inline."""
+    return bool(row.image_sha256) or bool(row.has_inline_image)
+
+
+def open_map_image(row) -> Optional[BinaryIO]:
+    """Open an image row's bytes for reading, or return ``None`` if it has none."""
+    if row.image_sha256:
+        try:
+            return get_blob_store().open(row.image_sha256)
+        except FileNotFoundError:
+            logger.error('Map blob %s is missing from the store', row.image_sha256)
+            return None
+    if row.has_inline_image:
+        return BytesIO(row.image_data)
+    return None
+
+
+def read_map_image(row) -> Optional[bytes]:
+    handle = open_map_image(row)
+    if handle is None:
+        return None
+    with handle:
+        return handle.read()
+
+
+def _detach_unused_images(session) -> Dict[str, int]:
+    live_ids = select(MapSubmission.id)
+    rejected_ids = select(MapSubmission.id).where(MapSubmission.status == 'rejected')
+    orphan_extras = (
+        session.query(MapSubmissionImage)
+        .filter(~MapSubmissionImage.submission_id.in_(live_ids))
+        .delete(synchronize_session=False)
+    )
+    rejected_extras = (
+        session.query(MapSubmissionImage)
+        .filter(MapSubmissionImage.submission_id.in_(rejected_ids))
+        .delete(synchronize_session=False)
+    )
+    rejected_primaries = (
+        session.query(MapSubmission)
+        .filter(
+            MapSubmission.status == 'rejected',
+            (MapSubmission.image_sha256.isnot(None)) | (MapSubmission.image_data.isnot(None)),
+        )
+        .update(
+            {MapSubmission.image_data: None, MapSubmission.image_sha256: None, MapSubmission.image_size: 0},
+            synchronize_session=False,
+        )
+    )
+    return {
+        'orphan_extras': orphan_extras,
+        'rejected_extras': rejected_extras,
+        'rejected_primaries': rejected_primaries,
+    }
+
+
+def _recount_references(session) -> None:
+    now = _map_now_utc()
+    session.execute(text(
+        f'''
+        UPDATE map_blobs SET refcount = COALESCE(
+            (SELECT refs.refs FROM ({_REFERENCE_COUNTS_SQL}) AS refs WHERE refs.sha256 = map_blobs.sha256),
+            0
+        )
+        '''
+    ))
+    session.query(MapBlob).filter(MapBlob.refcount <= 0, MapBlob.released_at.is_(None)).update(
+        {MapBlob.released_at: now}, synchronize_session=False,
+    )
+    session.query(MapBlob).filter(MapBlob.refcount > 0, MapBlob.released_at.isnot(None)).update(
+        {MapBlob.released_at: None}, synchronize_session=False,
+    )
+
+
+def collect_map_blobs(*, grace: timedelta = DEFAULT_GC_GRACE, sweep_files: bool = False) -> Dict[str, int]:
+    """Detach unused images, recount references and delete unreferenced blobs.
+
+    Blobs are only deleted once they have been unreferenced for ``grace``, and
+    their files only if nothing rewrote them since, so an upload that dedups
+    against a blob being collected keeps its bytes. ``sweep_files`` also
+    removes files with no ``map_blobs`` row (left by failed transactions);
+    it walks the whole store, so read endpoints leave it off.
+    """
+    session = map_db_session
+    store = get_blob_store()
+    cutoff_ts = time.time() - grace.total_seconds()
+    try:
+        stats = _detach_unused_images(session)
+        _recount_references(session)
+        cutoff = _map_now_utc() - grace
+        expired = [
+            sha256 for (sha256,) in session.query(MapBlob.sha256).filter(
+                MapBlob.refcount <= 0,
+                MapBlob.released_at <= cutoff,
+            )
+        ]
+        if expired:
+            session.query(MapBlob).filter(
+                MapBlob.sha256.in_(expired),
+                MapBlob.refcount <= 0,
+            ).delete(synchronize_session=False)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    stats['blobs_deleted'] = 0
+    for sha256 in expired:
+        if store.delete(sha256, older_than=cutoff_ts):
+            delete_derivatives(sha256)
+            stats['blobs_deleted'] += 1
+    stats['files_swept'] = 0
+    if sweep_files:
+        known = {sha256 for (sha256,) in session.query(MapBlob.sha256)}
+        session.rollback()
+        for sha256 in list(store.iter_hashes()):
+            if sha256 not in known and store.delete(sha256, older_than=cutoff_ts):
+                delete_derivatives(sha256)
+                stats['files_swept'] += 1
+        stats['files_swept'] += store.purge_temp_files(grace.total_seconds())
+    return stats
+
+
+def _inline_chunks(session, model, row_id: str, length: int, chunk_size: int) -> Iterator[bytes]:
+    table = model.__tablename__
+    statement = text(f'SELECT substr(image_data, :start, :count) FROM {table} WHERE id = :id')
+    for offset in range(0, length, chunk_size):
+        chunk = session.execute(statement, {'start': offset + 1, 'count': chunk_size, 'id': row_id}).scalar()
+        if chunk:
+            yield bytes(chunk)
+
+
+def migrate_inline_images(
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    limit: Optional[int] = None,
+    progress: Optional[Callable[[str, str, int], None]] = None,
+) -> Dict[str, int]:
+    """Move inline ``image_data`` into the blob store, one row per transaction.
+
+    Bytes are read back from SQLite ``chunk_size`` at a time with ``substr``,
+    so a 50 MB image never has to be held in memory. Returns the number of
+    rows moved per table; ``progress(table, row_id, size)`` is called after
+    each row.
+    """
+    session = map_db_session
+    store = get_blob_store()
+    moved: Dict[str, int] = {}
+    remaining = limit
+    for model in _IMAGE_MODELS:
+        table = model.__tablename__
+        moved[table] = 0
+        length_column = text('length(image_data)')
+        while remaining is None or remaining > 0:
+            row = (
+                session.query(model.id, model.image_mime, length_column)
+                .filter(model.image_data.isnot(None), model.image_sha256.is_(None))
+                .first()
+            )
+            if row is None:
+                break
+            row_id, mime, length = row
+            try:
+                sha256, size = store.write_chunks(
+                    _inline_chunks(session, model, row_id, int(length or 0), chunk_size)
+                )
+                acquire_map_blob(session, sha256, size, mime)
+                session.query(model).filter(model.id == row_id).update(
+                    {model.image_sha256: sha256, model.image_size: size, model.image_data: None},
+                    synchronize_session=False,
+                )
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            moved[table] += 1
+            if remaining is not None:
+                remaining -= 1
+            if progress:
+                progress(table, row_id, size)
+    return moved
+
+
+__all__ = [
+    'DEFAULT_GC_GRACE',
+    'acquire_map_blob',
+    'collect_map_blobs',
+    'has_map_image',
+    'migrate_inline_images',
+    'open_map_image',
+    'read_map_image',
+    'release_map_blob',
+    'release_submission_images',
+    'store_map_blob',
+]
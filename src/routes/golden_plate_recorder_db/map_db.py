@@ -15,10 +15,12 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     create_engine,
+    func,
     inspect,
+    literal_column,
     text,
 )
-from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
+from sqlalchemy.orm import column_property, declarative_base, deferred, scoped_session, sessionmaker
 
 MAP_DATABASE_URL = os.environ.get('MAP_DATABASE_URL', 'sqlite:///data/golden_plate_map.db')
 if MAP_DATABASE_URL.startswith('sqlite:///'):
@@ -49,10 +51,20 @@ def _map_now_utc():
     return datetime.now(timezone.utc)
 
 
+def map_dialect_insert(table):
+    """Return an INSERT construct for the map database that supports ``on_conflict_do_update``."""
+    if map_engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as _insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as _insert
+    return _insert(table)
+
+
 class MapEmailVerification(MapBase):
     __tablename__ = 'map_email_verifications'
     __table_args__ = (
         Index('idx_map_email_verifications_email', 'email'),
+        Index('idx_map_email_verifications_email_lower', func.lower(literal_column('email'))),
         Index('idx_map_email_verifications_purpose', 'purpose'),
         Index('idx_map_email_verifications_expires', 'expires_at'),
     )
@@ -73,6 +85,7 @@ class MapSubmission(MapBase):
         CheckConstraint("status IN ('pending','approved','rejected')", name='ck_map_submissions_status'),
         Index('idx_map_submissions_school_status', 'school_id', 'status'),
         Index('idx_map_submissions_submitted_at', 'submitted_at'),
+        Index('idx_map_submissions_email_lower', func.lower(literal_column('email'))),
     )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -84,7 +97,12 @@ class MapSubmission(MapBase):
     pin_id = Column(String)
     image_filename = Column(String)
     image_mime = Column(String)
-    image_data = Column(LargeBinary)
+    # Legacy inline bytes; new images live in the blob store under image_sha256.
+    # Deferred so metadata queries never pull blobs; has_inline_image answers
+    # "is there one" without reading it.
+    image_data = deferred(Column(LargeBinary))
+    has_inline_image = column_property(image_data.columns[0].isnot(None))
+    image_sha256 = Column(String(64))
     image_size = Column(Integer)
     status = Column(String, nullable=False, default='pending')
 
@@ -120,7 +138,9 @@ class MapSubmissionImage(MapBase):
     position = Column(Integer, nullable=False, default=0)
     image_filename = Column(String)
     image_mime = Column(String)
-    image_data = Column(LargeBinary, nullable=False)
+    image_data = deferred(Column(LargeBinary))
+    has_inline_image = column_property(image_data.columns[0].isnot(None))
+    image_sha256 = Column(String(64))
     image_size = Column(Integer)
     created_at = Column(DateTime(timezone=True), default=_map_now_utc)
 
@@ -131,6 +151,7 @@ class MapSubmitterAccount(MapBase):
         CheckConstraint("status IN ('active','disabled')", name='ck_map_submitter_accounts_status'),
         UniqueConstraint('email', name='uq_map_submitter_accounts_email'),
         Index('idx_map_submitter_accounts_school', 'school_id'),
+        Index('idx_map_submitter_accounts_email_lower', func.lower(literal_column('email'))),
     )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -170,7 +191,9 @@ class MapBackground(MapBase):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     school_id = Column(String, nullable=False)
-    image_data = Column(LargeBinary, nullable=False)
+    image_data = deferred(Column(LargeBinary))
+    has_inline_image = column_property(image_data.columns[0].isnot(None))
+    image_sha256 = Column(String(64))
     image_mime = Column(String, nullable=False)
     image_filename = Column(String)
     image_size = Column(Integer)
@@ -179,6 +202,67 @@ class MapBackground(MapBase):
     uploaded_by_username = Column(String)
 
 
+class MapBlob(MapBase):
+    """One file in the content-addressed blob store and how many rows use it.
+
+    ``refcount`` is kept up to date as images are attached and released, and
+    recounted from the image tables by the garbage collector. ``released_at``
+    records when it last dropped to zero so collection can wait out a grace
+    period."""
+    __tablename__ = 'map_blobs'
+    __table_args__ = (
+        Index('idx_map_blobs_refcount', 'refcount'),
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    mime = Column(String)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=_map_now_utc)
+    released_at = Column(DateTime(timezone=True))
+
+
+class MapImageJob(MapBase):
+    """Background conversion of a submission's uploaded images."""
+    __tablename__ = 'map_image_jobs'
+    __table_args__ = (
+        CheckConstraint("status IN ('queued','processing','done','failed')", name='ck_map_image_jobs_status'),
+        Index('idx_map_image_jobs_status', 'status'),
+        Index('idx_map_image_jobs_submission', 'submission_id'),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    submission_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='queued')
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    # Where the reviewer notification links point once the job is done
+    notify_base_url = Column(String)
+    created_at = Column(DateTime(timezone=True), default=_map_now_utc)
+    updated_at = Column(DateTime(timezone=True), default=_map_now_utc, onupdate=_map_now_utc)
+    finished_at = Column(DateTime(timezone=True))
+
+
+class MapImageJobItem(MapBase):
+    """One uploaded image waiting for conversion. ``position`` 0 is the
+    submission's primary image; the rest become gallery rows. The raw upload
+    is held in the blob store until the item finishes."""
+    __tablename__ = 'map_image_job_items'
+    __table_args__ = (
+        Index('idx_map_image_job_items_job', 'job_id', 'position'),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_id = Column(String, ForeignKey('map_image_jobs.id', ondelete='CASCADE'), nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    original_filename = Column(String)
+    source_mime = Column(String)
+    source_sha256 = Column(String(64))
+    status = Column(String, nullable=False, default='queued')
+    error = Column(Text)
+
+
 class MapSetting(MapBase):
     """Generic key/value store for map-portal-scoped configuration that needs
     to live in the database (so it survives restarts and can be edited from
@@ -201,6 +285,24 @@ def _add_column_if_missing(connection, table_name, column_name, column_ddl):
         connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_ddl}'))
 
 
+def _rebuild_map_table(connection, model) -> None:
+    """Recreate ``model``'s SQLite table from its current definition, keeping rows."""
+    table_name = model.__tablename__
+    existing_columns = [col['name'] for col in inspect(connection).get_columns(table_name)]
+    connection.execute(text(f'ALTER TABLE {table_name} RENAME TO {table_name}__old'))
+    for row in connection.execute(text(f"PRAGMA index_list('{table_name}__old')")).fetchall():
+        index_name = row[1]
+        if index_name and not str(index_name).startswith('sqlite_autoindex'):
+            connection.execute(text(f'DROP INDEX IF EXISTS "{index_name}"'))
+    model.__table__.create(bind=connection, checkfirst=False)
+    shared_columns = [col.name for col in model.__table__.columns if col.name in existing_columns]
+    column_csv = ', '.join(shared_columns)
+    connection.execute(text(
+        f'INSERT INTO {table_name} ({column_csv}) SELECT {column_csv} FROM {table_name}__old'
+    ))
+    connection.execute(text(f'DROP TABLE {table_name}__old'))
+
+
 def _bootstrap_map_database() -> None:
     MapBase.metadata.create_all(bind=map_engine)
     with map_engine.begin() as connection:
@@ -209,6 +311,23 @@ def _bootstrap_map_database() -> None:
         _add_column_if_missing(connection, 'map_submissions', 'pin_id', 'VARCHAR')
         _add_column_if_missing(connection, 'map_submissions', 'featured', 'INTEGER NOT NULL DEFAULT 0')
         _add_column_if_missing(connection, 'map_submissions', 'approval_token', 'VARCHAR')
+        for table_name in ('map_submissions', 'map_submission_images', 'map_backgrounds'):
+            _add_column_if_missing(connection, table_name, 'image_sha256', 'VARCHAR(64)')
+        # Blob-backed rows leave image_data NULL; SQLite cannot drop NOT NULL in place
+        if map_engine.dialect.name == 'sqlite':
+            for model in (MapSubmissionImage, MapBackground):
+                columns = {col['name']: col for col in inspect(connection).get_columns(model.__tablename__)}
+                if not columns['image_data']['nullable']:
+                    _rebuild_map_table(connection, model)
+        # Case-insensitive email lookups; create_all only indexes new tables
+        for index_name, table_name in (
+            ('idx_map_email_verifications_email_lower', 'map_email_verifications'),
+            ('idx_map_submissions_email_lower', 'map_submissions'),
+            ('idx_map_submitter_accounts_email_lower', 'map_submitter_accounts'),
+        ):
+            connection.execute(text(
+                f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} (lower(email))'
+            ))
 
 
 _bootstrap_map_database()
@@ -218,12 +337,17 @@ __all__ = [
     'MAP_DATABASE_URL',
     'MapBackground',
     'MapBase',
+    'MapBlob',
     'MapEmailVerification',
+    'MapImageJob',
+    'MapImageJobItem',
     'MapPin',
     'MapSetting',
     'MapSubmission',
+    'MapSubmissionImage',
     'MapSubmitterAccount',
     '_map_now_utc',
     'map_db_session',
+    'map_dialect_insert',
     'map_engine',
 ]
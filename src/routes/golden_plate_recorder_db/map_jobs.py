@@ -0,0 +1,395 @@
+"""Off-request conversion of uploaded map images.
+
+HEIC, TIFF, SVG and camera RAW uploads have to be re-encoded before
+browsers can show them, which can take tens of seconds per file. Instead of
+doing that in the upload request, ``create_map_submission`` stores the raw
+files in the blob store, records a :class:`MapImageJob` with one
+:class:`MapImageJobItem` per file and answers 202 with the job id.
+
+A runner thread per job hands the files to a process pool sized from the
+CPU count (``MAP_IMAGE_WORKERS`` overrides it), so encodes neither hold a
+Flask thread nor contend for its GIL. Workers are started from a fork
+server (spawned where that is unavailable), never forked from the threaded
+app process. They read the raw blob from disk and write the result back to
+the store; only paths and hashes cross the process boundary. A pool whose
+worker crashed is replaced. Progress is committed after every file.
+
+When every file has converted, the images are attached to the submission
+and the registered ``on_finished`` hook runs (reviewer email, thumbnails).
+If any file fails, or the job itself errors, the submission is removed, its
+raw uploads are released and the job keeps the error. Jobs left behind by a
+restart or a lost runner are picked up by :func:`resume_image_jobs`, which
+runs at startup and again from status polls. A runner touches its job row
+while it waits so a slow job is not mistaken for a lost one, and each file
+is claimed with a guarded update before its result is attached, so a job
+resumed twice still attaches every image once.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+
+from .blob_store import LocalBlobStore, get_blob_store
+from .map_blobs import acquire_map_blob, release_map_blob, release_submission_images
+from .map_db import (
+    MapImageJob,
+    MapImageJobItem,
+    MapSubmission,
+    MapSubmissionImage,
+    _map_now_utc,
+    map_db_session,
+)
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_JOB_STATUSES = ('queued', 'processing')
+# A processing job whose row has not moved for this long lost its runner
+STALE_JOB_AGE = timedelta(minutes=15)
+# How often a runner waiting on slow conversions touches its job row
+HEARTBEAT_SECONDS = 60.0
+# Minimum gap between resume passes triggered by status polls
+RESUME_INTERVAL_SECONDS = 60.0
+
+
+def _default_workers() -> int:
+    configured = os.environ.get('MAP_IMAGE_WORKERS')
+    if configured and configured.isdigit() and int(configured) > 0:
+        return int(configured)
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+MAX_WORKERS = _default_workers()
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_runner: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_converter: Optional[Callable[..., Any]] = None
+_on_finished: Optional[Callable[[str, Optional[str]], None]] = None
+# Jobs queued on or running in this process's runner pool
+_active_jobs: Set[str] = set()
+_last_resume = float('-inf')
+
+
+def register_image_job_handlers(convert: Callable[..., Any], on_finished: Callable[[str, Optional[str]], None]) -> None:
+    """Set the converter run in worker processes and the hook run when a job is done.
+
+    ``convert(raw_bytes, filename=..., mime=...)`` must be a module-level
+    function returning ``(bytes, mime, extension)`` or ``None``.
+    """
+    global _converter, _on_finished
+    _converter = convert
+    _on_finished = on_finished
+
+
+def _pool_context():
+    # Forking a process that runs request and runner threads can copy a held lock
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    if _converter is not None and context.get_start_method() == 'forkserver':
+        # Workers fork from a server that has already imported the converter
+        context.set_forkserver_preload([_converter.__module__])
+    return context
+
+
+def _get_pools():
+    global _process_pool, _runner
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_pool_context())
+        if _runner is None:
+            _runner = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='map-image-jobs')
+        return _process_pool, _runner
+
+
+def _discard_process_pool(broken: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died so the next submission starts a fresh one."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is broken:
+            _process_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_conversion(*args):
+    process_pool, _ = _get_pools()
+    try:
+        return process_pool, process_pool.submit(_convert_in_worker, *args)
+    except BrokenProcessPool:
+        _discard_process_pool(process_pool)
+        process_pool, _ = _get_pools()
+        return process_pool, process_pool.submit(_convert_in_worker, *args)
+
+
+def _convert_in_worker(convert, store_root: str, source_path: str, filename: Optional[str], mime: Optional[str]):
+    with open(source_path, 'rb') as handle:
+        raw_bytes = handle.read()
+    converted = convert(raw_bytes, filename=filename, mime=mime)
+    if not converted:
+        return None
+    data, new_mime, extension = converted
+    sha256, size = LocalBlobStore(store_root).put(data)
+    return sha256, size, new_mime, extension
+
+
+def unfinished_job_submission_ids():
+    """Select the submissions whose images are still being converted."""
+    return select(MapImageJob.submission_id).where(MapImageJob.status.in_(UNFINISHED_JOB_STATUSES))
+
+
+def serialize_image_job(job: MapImageJob) -> Dict[str, Any]:
+    return {
+        'id': job.id,
+        'submission_id': job.submission_id,
+        'status': job.status,
+        'total': job.total,
+        'completed': job.completed,
+        'progress': (job.completed / job.total) if job.total else 1.0,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _attach_converted(session, job: MapImageJob, item: MapImageJobItem, result) -> None:
+    sha256, size, mime, extension = result
+    base = os.path.splitext(secure_filename(item.original_filename or '') or 'submission-image')[0] or 'submission-image'
+    filename = f'{base}{extension}'
+    submission = session.get(MapSubmission, job.submission_id)
+    if submission is None:
+        # Deleted while converting; the orphaned blob is swept by collection
+        return
+    acquire_map_blob(session, sha256, size, mime)
+    if item.position == 0:
+        submission.image_filename = filename
+        submission.image_mime = mime
+        submission.image_sha256 = sha256
+        submission.image_size = size
+        return
+    session.add(MapSubmissionImage(
+        submission_id=job.submission_id,
+        position=item.position,
+        image_filename=filename,
+        image_mime=mime,
+        image_sha256=sha256,
+        image_size=size,
+    ))
+
+
+def _finish_job(session, job: MapImageJob) -> bool:
+    """Mark ``job`` done or failed; returns whether this runner finished a surviving submission."""
+    failed = (
+        session.query(MapImageJobItem.original_filename)
+        .filter(MapImageJobItem.job_id == job.id, MapImageJobItem.status == 'failed')
+        .all()
+    )
+    values = {MapImageJob.status: 'failed' if failed else 'done', MapImageJob.finished_at: _map_now_utc()}
+    if failed:
+        names = ', '.join(name or 'image' for (name,) in failed)
+        values[MapImageJob.error] = f'Could not decode image: {names}'
+    finished = (
+        session.query(MapImageJob)
+        .filter(MapImageJob.id == job.id, MapImageJob.status == 'processing')
+        .update(values, synchronize_session=False)
+    )
+    if not finished:
+        # Another runner resumed this job and already finished it
+        session.rollback()
+        return False
+    if failed:
+        _discard_submission(session, job.submission_id)
+    session.commit()
+    return not failed
+
+
+def _discard_submission(session, submission_id: str) -> None:
+    submission = session.get(MapSubmission, submission_id)
+    if submission is None:
+        return
+    release_submission_images(session, submission)
+    session.query(MapSubmissionImage).filter(
+        MapSubmissionImage.submission_id == submission.id
+    ).delete(synchronize_session=False)
+    session.delete(submission)
+
+
+def _fail_job(session, job_id: str, error: str) -> None:
+    """Mark a job that errored as failed, releasing its raw uploads and dropping its submission."""
+    session.rollback()
+    job = session.get(MapImageJob, job_id)
+    if job is None:
+        return
+    job.status = 'failed'
+    job.error = error
+    job.finished_at = _map_now_utc()
+    items = (
+        session.query(MapImageJobItem)
+        .filter(MapImageJobItem.job_id == job_id, MapImageJobItem.source_sha256.isnot(None))
+        .all()
+    )
+    for item in items:
+        release_map_blob(session, item.source_sha256)
+        item.source_sha256 = None
+        if item.status == 'queued':
+            item.status = 'failed'
+    _discard_submission(session, job.submission_id)
+    session.commit()
+
+
+def _touch_job(session, job_id: str) -> None:
+    session.query(MapImageJob).filter(MapImageJob.id == job_id).update(
+        {MapImageJob.updated_at: _map_now_utc()}, synchronize_session=False,
+    )
+    session.commit()
+
+
+def _record_item(session, job: MapImageJob, item_id: str, process_pool, future) -> None:
+    """Claim a converted item and attach its result, unless another runner already did."""
+    try:
+        result = future.result()
+    except BrokenProcessPool:
+        logger.error('Map image worker died converting a file for job %s', job.id)
+        _discard_process_pool(process_pool)
+        result = None
+    except Exception:
+        logger.exception('Map image conversion crashed for job %s', job.id)
+        result = None
+
+    item = session.get(MapImageJobItem, item_id)
+    source_sha256 = item.source_sha256
+    values = {MapImageJobItem.status: 'done', MapImageJobItem.source_sha256: None}
+    if result is None:
+        values.update({MapImageJobItem.status: 'failed', MapImageJobItem.error: 'Could not decode image'})
+    claimed = (
+        session.query(MapImageJobItem)
+        .filter(MapImageJobItem.id == item_id, MapImageJobItem.status == 'queued')
+        .update(values, synchronize_session=False)
+    )
+    if not claimed:
+        # A resumed runner recorded this file first; its blob is swept by collection
+        session.rollback()
+        return
+    if result is not None:
+        _attach_converted(session, job, item, result)
+    release_map_blob(session, source_sha256)
+    session.query(MapImageJob).filter(MapImageJob.id == job.id).update(
+        {MapImageJob.completed: MapImageJob.completed + 1, MapImageJob.updated_at: _map_now_utc()},
+        synchronize_session=False,
+    )
+    session.commit()
+
+
+def _run_job(job_id: str) -> None:
+    session = map_db_session
+    try:
+        claimed = (
+            session.query(MapImageJob)
+            .filter(MapImageJob.id == job_id, MapImageJob.status == 'queued')
+            .update({MapImageJob.status: 'processing', MapImageJob.updated_at: _map_now_utc()},
+                    synchronize_session=False)
+        )
+        session.commit()
+        if not claimed:
+            return
+        job = session.get(MapImageJob, job_id)
+        items = (
+            session.query(MapImageJobItem)
+            .filter(MapImageJobItem.job_id == job_id, MapImageJobItem.status == 'queued')
+            .order_by(MapImageJobItem.position)
+            .all()
+        )
+        store = get_blob_store()
+        futures = {}
+        for item in items:
+            process_pool, future = _submit_conversion(
+                _converter, store.root, store.path(item.source_sha256), item.original_filename, item.source_mime,
+            )
+            futures[future] = (item.id, process_pool)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+            if not done:
+                _touch_job(session, job_id)
+                continue
+            for future in done:
+                item_id, process_pool = futures[future]
+                _record_item(session, job, item_id, process_pool, future)
+
+        if _finish_job(session, job) and _on_finished is not None:
+            try:
+                _on_finished(job.submission_id, job.notify_base_url)
+            except Exception:
+                logger.exception('Map image job %s finished but its follow-up failed', job_id)
+    except Exception as exc:
+        logger.exception('Map image job %s failed', job_id)
+        try:
+            _fail_job(session, job_id, str(exc))
+        except Exception:
+            session.rollback()
+            logger.exception('Could not clean up failed map image job %s', job_id)
+    finally:
+        with _pool_lock:
+            _active_jobs.discard(job_id)
+        map_db_session.remove()
+
+
+def _queue_job(job_id: str):
+    with _pool_lock:
+        if job_id in _active_jobs:
+            return None
+        _active_jobs.add(job_id)
+    _, runner = _get_pools()
+    return runner.submit(_run_job, job_id)
+
+
+def submit_image_job(job_id: str):
+    """Queue a committed job on the runner pool and return its future."""
+    return _queue_job(job_id)
+
+
+def resume_image_jobs() -> int:
+    """Requeue queued jobs, and processing ones whose runner was lost, that this process is not running."""
+    global _last_resume
+    session = map_db_session
+    _last_resume = time.monotonic()
+    try:
+        stale_before = _map_now_utc() - STALE_JOB_AGE
+        session.query(MapImageJob).filter(
+            MapImageJob.status == 'processing',
+            MapImageJob.updated_at < stale_before,
+        ).update({MapImageJob.status: 'queued'}, synchronize_session=False)
+        session.commit()
+        job_ids = [
+            job_id for (job_id,) in session.query(MapImageJob.id).filter(MapImageJob.status == 'queued')
+        ]
+    except Exception:
+        session.rollback()
+        logger.exception('Could not resume map image jobs')
+        return 0
+    return sum(1 for job_id in job_ids if _queue_job(job_id) is not None)
+
+
+def resume_image_jobs_if_due() -> int:
+    """Run :func:`resume_image_jobs` at most every ``RESUME_INTERVAL_SECONDS``."""
+    if time.monotonic() - _last_resume < RESUME_INTERVAL_SECONDS:
+        return 0
+    return resume_image_jobs()
+
+
+__all__ = [
+    'MAX_WORKERS',
+    'UNFINISHED_JOB_STATUSES',
+    'register_image_job_handlers',
+    'resume_image_jobs',
+    'resume_image_jobs_if_due',
+    'serialize_image_job',
+    'submit_image_job',
+    'unfinished_job_submission_ids',
+]
@@ -4,7 +4,10 @@ import random
 import re
 import secrets
 import string
+import threading
+import time
 import base64
+import hashlib
 from datetime import timedelta, timezone
 from io import BytesIO
 import html as _html_lib
@@ -12,16 +15,28 @@ import html as _html_lib
 import requests as http_requests
 from flask import jsonify, request, send_file, session
 from sqlalchemy import func
+from sqlalchemy.orm import defer
 from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 
 from . import recorder_bp
+from .blob_store import get_blob_store
 from .db import DEFAULT_SCHOOL_ID
 from .email_service import VERIFICATION_CODE_EXPIRY_MINUTES, send_email_via_brevo
+from .map_blobs import (
+    collect_map_blobs,
+    has_map_image,
+    read_map_image,
+    release_map_blob,
+    release_submission_images,
+    store_map_blob,
+)
 from .map_db import (
     MapBackground,
     MapEmailVerification,
+    MapImageJob,
+    MapImageJobItem,
     MapPin,
     MapSetting,
     MapSubmission,
@@ -30,6 +45,21 @@ from .map_db import (
     _map_now_utc,
     map_db_session,
 )
+from .map_jobs import (
+    register_image_job_handlers,
+    resume_image_jobs_if_due,
+    serialize_image_job,
+    submit_image_job,
+    unfinished_job_submission_ids,
+)
+from .map_thumbnails import (
+    THUMBNAIL_MIME,
+    THUMBNAIL_WIDTHS,
+    ensure_derivative,
+    schedule_derivatives,
+    snap_width,
+    supports_thumbnails,
+)
 from .security import get_current_user, is_interschool_user, require_admin, require_superadmin
 
 logger = logging.getLogger(__name__)
@@ -38,6 +68,14 @@ MAP_VERIFICATION_PURPOSE = 'map_submission'
 MAX_VERIFICATION_ATTEMPTS = 5
 MAP_EMAIL_VERIFICATION_MAX_AGE_MINUTES = 30
 MAX_IMAGE_BYTES = 50 * 1024 * 1024
+# Minimum spacing between blob garbage collections triggered by read endpoints
+MAP_BLOB_GC_INTERVAL_SECONDS = 300
+_last_blob_collection = float('-inf')
+_blob_collection_lock = threading.Lock()
+# Image URLs carry ``?v=`` plus this many hex digits of the content hash; a
+# URL whose version matches can never change, so it is cached as immutable.
+MAP_IMAGE_VERSION_LENGTH = 16
+MAP_IMAGE_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
 # Recipients notified whenever a new map submission is awaiting approval.
 # Override at runtime via the MAP_APPROVAL_NOTIFY_EMAILS env var (comma-separated)
 # or — preferred — from the Map admin UI (stored in the ``map_settings`` table
@@ -309,66 +347,27 @@ def _map_error(code, message, status=400, *, detail=None):
     return jsonify(payload), status
 
 
-def _purge_orphan_image_data():
-    """Sweep image bytes that are no longer associated with a live entry.
+def _collect_map_blobs_if_due():
+    """Run image blob garbage collection from a read endpoint, at most once
+    every ``MAP_BLOB_GC_INTERVAL_SECONDS`` per process.
 
-    Deletes / nulls:
-      * `MapSubmissionImage` rows whose `submission_id` does not exist in
-        `map_submissions` (broken FK references — should not normally happen,
-        but defensively cleans up legacy data).
-      * `MapSubmissionImage` rows whose parent submission has been rejected
-        (rejected submissions are not displayed, so their image bytes serve
-        no purpose).
-      * `MapSubmission.image_data` blobs on rejected rows (clears legacy
-        rejected entries that pre-date the on-reject purge).
-
-    Safe to call from any read endpoint; commits its own transaction. Errors
-    are logged and swallowed so a sweep failure never blocks the response.
+    See :func:`collect_map_blobs` for what is collected. Errors are logged and
+    swallowed so a sweep failure never blocks the response.
     """
+    global _last_blob_collection
+    if time.monotonic() - _last_blob_collection < MAP_BLOB_GC_INTERVAL_SECONDS:
+        return
+    if not _blob_collection_lock.acquire(blocking=False):
+        return
     try:
-        live_ids_subquery = map_db_session.query(MapSubmission.id).subquery()
-        rejected_ids_subquery = (
-            map_db_session.query(MapSubmission.id)
-            .filter(MapSubmission.status == 'rejected')
-            .subquery()
-        )
-
-        orphan_count = (
-            map_db_session.query(MapSubmissionImage)
-            .filter(~MapSubmissionImage.submission_id.in_(live_ids_subquery.select()))
-            .delete(synchronize_session=False)
-        )
-        rejected_extra_count = (
-            map_db_session.query(MapSubmissionImage)
-            .filter(MapSubmissionImage.submission_id.in_(rejected_ids_subquery.select()))
-            .delete(synchronize_session=False)
-        )
-        rejected_blob_count = (
-            map_db_session.query(MapSubmission)
-            .filter(
-                MapSubmission.status == 'rejected',
-                MapSubmission.image_data.isnot(None),
-            )
-            .update(
-                {MapSubmission.image_data: None, MapSubmission.image_size: 0},
-                synchronize_session=False,
-            )
-        )
-
-        if orphan_count or rejected_extra_count or rejected_blob_count:
-            map_db_session.commit()
-            logger.info(
-                'Purged orphan map image data (orphan_extras=%d, rejected_extras=%d, rejected_blobs=%d)',
-                orphan_count, rejected_extra_count, rejected_blob_count,
-            )
-        else:
-            map_db_session.rollback()
+        _last_blob_collection = time.monotonic()
+        stats = collect_map_blobs()
+        if any(stats.values()):
+            logger.info('Collected map image blobs: %s', stats)
     except Exception as exc:  # pragma: no cover - defensive
-        logger.warning('Orphan image sweep failed: %s', exc)
-        try:
-            map_db_session.rollback()
-        except Exception:
-            pass
+        logger.warning('Map blob collection failed: %s', exc)
+    finally:
+        _blob_collection_lock.release()
 
 
 @recorder_bp.app_errorhandler(RequestEntityTooLarge)
@@ -668,9 +667,10 @@ def _collect_submission_image_attachments(submission, max_total_bytes: int = 20
 
         image_infos.append(info)
 
-    if submission.image_data:
+    primary_data = read_map_image(submission)
+    if primary_data:
         primary_name = submission.image_filename or f'submission-{submission.id}.bin'
-        _consider(primary_name, submission.image_mime, submission.image_data)
+        _consider(primary_name, submission.image_mime, primary_data)
 
     try:
         extras = (
@@ -685,7 +685,7 @@ def _collect_submission_image_attachments(submission, max_total_bytes: int = 20
 
     for idx, extra in enumerate(extras, start=1):
         extra_name = extra.image_filename or f'submission-{submission.id}-extra-{idx}.bin'
-        _consider(extra_name, extra.image_mime, extra.image_data)
+        _consider(extra_name, extra.image_mime, read_map_image(extra) or b'')
 
     return attachments, image_infos
 
@@ -1123,30 +1123,159 @@ def _current_school_id():
     return _current_identity()['school_id']
 
 
-def _serialize_submission(submission):
-    images = []
-    if submission.image_data:
-        images.append({
-            'id': 'primary',
-            'filename': submission.image_filename,
-            'mime': submission.image_mime,
-            'size': submission.image_size,
-            'url': f'/api/map/submissions/{submission.id}/image',
-        })
-    extras = (
-        map_db_session.query(MapSubmissionImage)
-        .filter(MapSubmissionImage.submission_id == submission.id)
-        .order_by(MapSubmissionImage.position.asc(), MapSubmissionImage.created_at.asc())
+def _versioned_image_url(url, image_sha256):
+    if not image_sha256:
+        return url
+    return f'{url}?v={image_sha256[:MAP_IMAGE_VERSION_LENGTH]}'
+
+
+def _image_entry(image_id, url, filename, mime, size, image_sha256):
+    """Serialize one submission image, advertising resized variants when they exist."""
+    entry = {
+        'id': image_id,
+        'filename': filename,
+        'mime': mime,
+        'size': size,
+        'url': _versioned_image_url(url, image_sha256),
+        'thumbnail_url': None,
+        'srcset': None,
+    }
+    if image_sha256 and supports_thumbnails(mime):
+        variant_urls = [f"{entry['url']}&w={width}" for width in THUMBNAIL_WIDTHS]
+        entry['thumbnail_url'] = variant_urls[0]
+        entry['srcset'] = ', '.join(
+            f'{variant_url} {width}w' for variant_url, width in zip(variant_urls, THUMBNAIL_WIDTHS)
+        )
+    return entry
+
+
+def _schedule_submission_derivatives(submission):
+    """Warm the thumbnail cache for a submission's images in the background."""
+    try:
+        images = [(submission.image_sha256, submission.image_mime)]
+        images.extend(
+            map_db_session.query(MapSubmissionImage.image_sha256, MapSubmissionImage.image_mime)
+            .filter(MapSubmissionImage.submission_id == submission.id)
+            .all()
+        )
+        schedule_derivatives(images)
+    except Exception as exc:  # pragma: no cover - best effort
+        logger.warning('Could not schedule map thumbnails: %s', exc)
+
+
+def _send_map_image(row, *, download_name, last_modified=None, public=True):
+    """Serve an image row, or return ``None`` if its bytes are gone.
+
+    The ETag is the SHA-256 of the content, so ``If-None-Match`` revalidation
+    and ``Range`` requests are answered by ``send_file``. Blob-backed images
+    stream from disk in chunks; legacy inline rows are hashed on the fly.
+    ``?w=`` selects the nearest resized derivative, falling back to the
+    original when there is none.
+    """
+    mimetype = row.image_mime or 'application/octet-stream'
+    if row.image_sha256:
+        path = get_blob_store().path(row.image_sha256)
+        if not os.path.isfile(path):
+            logger.error('Map blob %s is missing from the store', row.image_sha256)
+            return None
+        source, content_hash = path, row.image_sha256
+        etag = content_hash
+        requested_width = request.args.get('w', type=int)
+        if requested_width and requested_width > 0 and supports_thumbnails(row.image_mime):
+            width = snap_width(requested_width)
+            derivative = ensure_derivative(content_hash, width)
+            if derivative:
+                source, mimetype = derivative
+                etag = f'{content_hash}-w{width}'
+                download_name = f'{os.path.splitext(download_name)[0]}-{width}w{os.path.splitext(source)[1]}'
+    elif row.has_inline_image:
+        data = row.image_data
+        source, content_hash = BytesIO(data), hashlib.sha256(data).hexdigest()
+        etag = content_hash
+    else:
+        return None
+
+    response = send_file(
+        source,
+        mimetype=mimetype,
+        download_name=download_name,
+        conditional=True,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    cache_control = response.cache_control
+    cache_control.public = public
+    cache_control.private = not public
+    if request.args.get('v') == content_hash[:MAP_IMAGE_VERSION_LENGTH]:
+        cache_control.no_cache = None
+        cache_control.max_age = MAP_IMAGE_IMMUTABLE_MAX_AGE
+        cache_control.immutable = True
+    else:
+        cache_control.no_cache = True
+    return response
+
+
+# Listing queries must never touch blob bytes; raise if serialization tries
+_SUBMISSION_LISTING_OPTIONS = (defer(MapSubmission.image_data, raiseload=True),)
+
+
+def _load_extra_image_metadata(submission_ids):
+    """Return gallery image metadata (no bytes) for many submissions in one query."""
+    extras_by_submission = {submission_id: [] for submission_id in submission_ids}
+    if not extras_by_submission:
+        return extras_by_submission
+    rows = (
+        map_db_session.query(
+            MapSubmissionImage.submission_id,
+            MapSubmissionImage.id,
+            MapSubmissionImage.image_filename,
+            MapSubmissionImage.image_mime,
+            MapSubmissionImage.image_size,
+            MapSubmissionImage.image_sha256,
+        )
+        .filter(MapSubmissionImage.submission_id.in_(list(extras_by_submission)))
+        .order_by(
+            MapSubmissionImage.submission_id,
+            MapSubmissionImage.position.asc(),
+            MapSubmissionImage.created_at.asc(),
+        )
         .all()
     )
+    for row in rows:
+        extras_by_submission[row.submission_id].append(row)
+    return extras_by_submission
+
+
+def _serialize_submissions(submissions):
+    extras_by_submission = _load_extra_image_metadata([submission.id for submission in submissions])
+    return [
+        _serialize_submission(submission, extras=extras_by_submission[submission.id])
+        for submission in submissions
+    ]
+
+
+def _serialize_submission(submission, extras=None):
+    images = []
+    if has_map_image(submission):
+        images.append(_image_entry(
+            'primary',
+            f'/api/map/submissions/{submission.id}/image',
+            submission.image_filename,
+            submission.image_mime,
+            submission.image_size,
+            submission.image_sha256,
+        ))
+    if extras is None:
+        extras = _load_extra_image_metadata([submission.id])[submission.id]
     for extra in extras:
-        images.append({
-            'id': extra.id,
-            'filename': extra.image_filename,
-            'mime': extra.image_mime,
-            'size': extra.image_size,
-            'url': f'/api/map/submissions/{submission.id}/images/{extra.id}',
-        })
+        images.append(_image_entry(
+            extra.id,
+            f'/api/map/submissions/{submission.id}/images/{extra.id}',
+            extra.image_filename,
+            extra.image_mime,
+            extra.image_size,
+            extra.image_sha256,
+        ))
     return {
         'id': submission.id,
         'school_id': submission.school_id,
@@ -1159,6 +1288,7 @@ def _serialize_submission(submission):
         'image_mime': submission.image_mime,
         'image_size': submission.image_size,
         'image_url': images[0]['url'] if images else None,
+        'image_srcset': images[0]['srcset'] if images else None,
         'images': images,
         'status': submission.status,
         'submitted_at': submission.submitted_at.isoformat() if submission.submitted_at else None,
@@ -1228,16 +1358,17 @@ def _upsert_submitter_password(email, password, school_id, submission_id):
 
 @recorder_bp.route('/map/submissions', methods=['GET'])
 def get_approved_map_submissions():
-    _purge_orphan_image_data()
+    _collect_map_blobs_if_due()
     submissions = (
         map_db_session.query(MapSubmission)
+        .options(*_SUBMISSION_LISTING_OPTIONS)
         .filter(MapSubmission.status == 'approved')
         .order_by(MapSubmission.submitted_at.desc())
         .all()
     )
     return jsonify({
         'status': 'success',
-        'submissions': [_serialize_submission(submission) for submission in submissions],
+        'submissions': _serialize_submissions(submissions),
     }), 200
 
 
@@ -1246,16 +1377,20 @@ def get_pending_map_submissions():
     if not require_admin():
         return _map_error('MAP_ADMIN_REQUIRED', 'Admin access required', 403)
 
-    _purge_orphan_image_data()
+    _collect_map_blobs_if_due()
     submissions = (
         map_db_session.query(MapSubmission)
-        .filter(MapSubmission.status == 'pending')
+        .options(*_SUBMISSION_LISTING_OPTIONS)
+        .filter(
+            MapSubmission.status == 'pending',
+            ~MapSubmission.id.in_(unfinished_job_submission_ids()),
+        )
         .order_by(MapSubmission.submitted_at.desc())
         .all()
     )
     return jsonify({
         'status': 'success',
-        'submissions': [_serialize_submission(submission) for submission in submissions],
+        'submissions': _serialize_submissions(submissions),
     }), 200
 
 
@@ -1266,17 +1401,21 @@ def get_map_submission_image(submission_id):
         .filter(MapSubmission.id == submission_id)
         .first()
     )
-    if not submission or not submission.image_data:
+    if not submission or not has_map_image(submission):
         return _map_error('MAP_IMAGE_NOT_FOUND', 'Image not found', 404)
 
     if submission.status != 'approved' and not require_admin():
         return _map_error('MAP_ADMIN_REQUIRED', 'Admin access required', 403)
 
-    return send_file(
-        BytesIO(submission.image_data),
-        mimetype=submission.image_mime or 'application/octet-stream',
+    response = _send_map_image(
+        submission,
         download_name=submission.image_filename or 'map-submission-image',
+        last_modified=submission.submitted_at,
+        public=submission.status == 'approved',
     )
+    if response is None:
+        return _map_error('MAP_IMAGE_NOT_FOUND', 'Image not found', 404)
+    return response
 
 
 @recorder_bp.route('/map/submissions/<submission_id>/images/<image_id>', methods=['GET'])
@@ -1298,13 +1437,15 @@ def get_map_submission_extra_image(submission_id, image_id):
         )
         .first()
     )
-    if not image or not image.image_data:
-        return _map_error('MAP_IMAGE_NOT_FOUND', 'Image not found', 404)
-    return send_file(
-        BytesIO(image.image_data),
-        mimetype=image.image_mime or 'application/octet-stream',
+    response = _send_map_image(
+        image,
         download_name=image.image_filename or 'map-submission-image',
-    )
+        last_modified=image.created_at,
+        public=submission.status == 'approved',
+    ) if image else None
+    if response is None:
+        return _map_error('MAP_IMAGE_NOT_FOUND', 'Image not found', 404)
+    return response
 
 
 @recorder_bp.route('/map/send-verification-code', methods=['POST'])
@@ -1413,6 +1554,56 @@ def get_map_submitter_account_status():
     }), 200
 
 
+def _read_image_upload(upload):
+    """Read one uploaded image and check its size and type.
+
+    Returns ``(upload_info, None)`` or ``(None, error_response)``.
+    ``upload_info['convert']`` is true for formats an image job must convert.
+    """
+    mime = (upload.mimetype or '').lower()
+    original_filename = upload.filename
+    data = upload.read()
+    if len(data) > MAX_IMAGE_BYTES:
+        return None, _map_error('MAP_IMAGE_TOO_LARGE', 'Image must be 50 MB or smaller', 413)
+    convert = _needs_server_image_conversion(original_filename, mime)
+    if not convert and not _is_browser_native_image(original_filename, mime):
+        return None, _map_error('MAP_IMAGE_TYPE_UNSUPPORTED', IMAGE_TYPE_ERROR_MESSAGE, 400)
+    return {
+        'filename': secure_filename(original_filename) or 'submission-image',
+        'original_filename': original_filename,
+        'mime': mime,
+        'data': data,
+        'size': len(data),
+        'convert': convert,
+    }, None
+
+
+def _on_image_job_finished(submission_id, base_url):
+    """Announce a submission whose images finished converting."""
+    submission = map_db_session.get(MapSubmission, submission_id)
+    if submission is None:
+        return
+    _schedule_submission_derivatives(submission)
+    _notify_pending_map_submission(submission, base_url=base_url)
+
+
+register_image_job_handlers(_normalize_image_to_png, _on_image_job_finished)
+
+
+@recorder_bp.route('/map/image-jobs/<job_id>', methods=['GET'])
+def get_map_image_job(job_id):
+    # Polls double as the retry tick for jobs whose runner was lost
+    resume_image_jobs_if_due()
+    job = map_db_session.get(MapImageJob, job_id)
+    if not job:
+        return _map_error('MAP_IMAGE_JOB_NOT_FOUND', 'Image job not found', 404)
+    payload = {'status': 'success', 'job': serialize_image_job(job)}
+    if job.status == 'done':
+        submission = map_db_session.get(MapSubmission, job.submission_id)
+        payload['submission'] = _serialize_submission(submission) if submission else None
+    return jsonify(payload), 200
+
+
 @recorder_bp.route('/map/submissions', methods=['POST'])
 def create_map_submission():
     recaptcha_token = (request.form.get('recaptcha_token') or '').strip()
@@ -1484,71 +1675,29 @@ def create_map_submission():
         if auth_method == 'password' and shortcut_password == password:
             shortcut_password = ''
 
+    # Formats browsers can't show are converted later by an image job;
+    # here they are only checked for size and kept as uploaded.
     image_file = request.files.get('image')
-    image_filename = None
-    image_mime = None
-    image_data = None
-    image_size = None
-
+    primary_upload = None
     if image_file and image_file.filename:
-        image_mime = (image_file.mimetype or '').lower()
-        original_filename = image_file.filename
-        image_data = image_file.read()
-        image_size = len(image_data)
-        if image_size > MAX_IMAGE_BYTES:
-            return _map_error('MAP_IMAGE_TOO_LARGE', 'Image must be 50 MB or smaller', 413)
-
-        if _needs_server_image_conversion(original_filename, image_mime):
-            converted = _normalize_image_to_png(image_data, filename=original_filename, mime=image_mime)
-            if not converted:
-                return _map_error('MAP_IMAGE_DECODE_FAILED', 'Could not decode image', 400)
-            image_data, image_mime, new_ext = converted
-            image_size = len(image_data)
-            base = os.path.splitext(secure_filename(original_filename) or 'submission-image')[0] or 'submission-image'
-            image_filename = f'{base}{new_ext}'
-        else:
-            if not _is_browser_native_image(original_filename, image_mime):
-                return _map_error('MAP_IMAGE_TYPE_UNSUPPORTED', IMAGE_TYPE_ERROR_MESSAGE, 400)
-            image_filename = secure_filename(original_filename) or 'submission-image'
+        primary_upload, error_response = _read_image_upload(image_file)
+        if error_response:
+            return error_response
 
     # Additional images uploaded as field 'images' (one or many).
-    extra_uploads = request.files.getlist('images')
-    extra_processed = []  # list of dicts: filename, mime, data, size
-    for extra in extra_uploads:
+    extra_processed = []
+    for extra in request.files.getlist('images'):
         if not extra or not extra.filename:
             continue
-        ext_mime = (extra.mimetype or '').lower()
-        ext_original = extra.filename
-        ext_data = extra.read()
-        ext_size = len(ext_data)
-        if ext_size > MAX_IMAGE_BYTES:
-            return _map_error('MAP_IMAGE_TOO_LARGE', 'Image must be 50 MB or smaller', 413)
-        if _needs_server_image_conversion(ext_original, ext_mime):
-            converted = _normalize_image_to_png(ext_data, filename=ext_original, mime=ext_mime)
-            if not converted:
-                return _map_error('MAP_IMAGE_DECODE_FAILED', 'Could not decode image', 400)
-            ext_data, ext_mime, new_ext = converted
-            ext_size = len(ext_data)
-            base = os.path.splitext(secure_filename(ext_original) or 'submission-image')[0] or 'submission-image'
-            ext_filename = f'{base}{new_ext}'
-        else:
-            if not _is_browser_native_image(ext_original, ext_mime):
-                return _map_error('MAP_IMAGE_TYPE_UNSUPPORTED', IMAGE_TYPE_ERROR_MESSAGE, 400)
-            ext_filename = secure_filename(ext_original) or 'submission-image'
-        extra_processed.append({
-            'filename': ext_filename,
-            'mime': ext_mime,
-            'data': ext_data,
-            'size': ext_size,
-        })
+        extra_upload, error_response = _read_image_upload(extra)
+        if error_response:
+            return error_response
+        extra_processed.append(extra_upload)
 
     # If no primary 'image' field but extras exist, promote the first extra.
-    if image_data is None and extra_processed:
-        first = extra_processed.pop(0)
-        image_filename = first['filename']
-        image_mime = first['mime']
-        image_data = first['data']
-        image_size = first['size']
+    if primary_upload is None and extra_processed:
+        primary_upload = extra_processed.pop(0)
+    primary_ready = primary_upload is not None and not primary_upload['convert']
 
     identity = _current_identity()
 
@@ -1568,10 +1717,9 @@ def create_map_submission():
         title=title,
         submission_display_name=submission_display_name or None,
         pin_id=pin_id,
-        image_filename=image_filename,
-        image_mime=image_mime,
-        image_data=image_data,
-        image_size=image_size,
+        image_filename=primary_upload['filename'] if primary_ready else None,
+        image_mime=primary_upload['mime'] if primary_ready else None,
+        image_size=primary_upload['size'] if primary_ready else None,
         status='pending',
         # 256-bit URL-safe token used by the email "speed approval" link.
         # Cleared the moment it (or any normal review action) is consumed.
@@ -1583,19 +1731,42 @@ def create_map_submission():
         submitted_at=_map_now_utc(),
     )
 
+    image_job = None
     try:
+        if primary_ready:
+            submission.image_sha256 = store_map_blob(map_db_session, primary_upload['data'], primary_upload['mime'])
         map_db_session.add(submission)
         map_db_session.flush()
+        pending_conversions = [(0, primary_upload)] if primary_upload and not primary_ready else []
         # Persist any additional gallery images.
         for index, extra in enumerate(extra_processed):
+            if extra['convert']:
+                pending_conversions.append((index + 1, extra))
+                continue
             map_db_session.add(MapSubmissionImage(
                 submission_id=submission.id,
                 position=index + 1,
                 image_filename=extra['filename'],
                 image_mime=extra['mime'],
-                image_data=extra['data'],
+                image_sha256=store_map_blob(map_db_session, extra['data'], extra['mime']),
                 image_size=extra['size'],
             ))
+        if pending_conversions:
+            image_job = MapImageJob(
+                submission_id=submission.id,
+                total=len(pending_conversions),
+                notify_base_url=request.host_url,
+            )
+            map_db_session.add(image_job)
+            map_db_session.flush()
+            for position, upload in pending_conversions:
+                map_db_session.add(MapImageJobItem(
+                    job_id=image_job.id,
+                    position=position,
+                    original_filename=upload['original_filename'],
+                    source_mime=upload['mime'],
+                    source_sha256=store_map_blob(map_db_session, upload['data'], upload['mime']),
+                ))
         # Backfill: any prior submissions from the same email take on the latest display name
         if submission_display_name:
             map_db_session.query(MapSubmission).filter(
@@ -1615,6 +1786,21 @@ def create_map_submission():
         map_db_session.rollback()
         return _map_error('MAP_SUBMISSION_CREATE_FAILED', 'Could not submit map entry', 500)
 
+    if image_job is not None:
+        # Reviewers are notified once the images are ready
+        submit_image_job(image_job.id)
+        return jsonify({
+            'status': 'success',
+            'message': 'Map submission received. Images are being processed.',
+            'submission': _serialize_submission(submission),
+            'image_job': serialize_image_job(image_job),
+            'status_url': f'/api/map/image-jobs/{image_job.id}',
+            'password_created': password_created,
+            'password_used': password_verified,
+        }), 202
+
+    _schedule_submission_derivatives(submission)
+
     # Notify reviewers (best-effort; never fails the request).
     try:
         notify_base_url = request.host_url
@@ -1668,6 +1854,8 @@ def approve_map_submission(submission_id):
         map_db_session.rollback()
         return _map_error('MAP_SUBMISSION_APPROVE_FAILED', 'Could not approve submission', 500)
 
+    _schedule_submission_derivatives(submission)
+
     return jsonify({
         'status': 'success',
         'message': 'Submission approved',
@@ -1795,6 +1983,8 @@ def quick_approve_map_submission(submission_id):
             ok=False,
         ), 500
 
+    _schedule_submission_derivatives(submission)
+
     return _quick_approve_html_response(
         'Submission approved ✓',
         success_message,
@@ -1967,10 +2157,12 @@ def reject_map_submission(submission_id):
     # link will see a clean "Already rejected" page instead of a
     # confusing "no longer valid" error.
 
-    # Purge stored image bytes to reclaim disk space. We keep filename/mime
+    # Release stored image bytes to reclaim disk space. We keep filename/mime
     # for the audit trail but the binary blobs are no longer needed once a
     # submission is rejected (rejected submissions are not displayed).
+    release_submission_images(map_db_session, submission)
     submission.image_data = None
+    submission.image_sha256 = None
     submission.image_size = 0
     map_db_session.query(MapSubmissionImage).filter(
         MapSubmissionImage.submission_id == submission.id
@@ -2360,6 +2552,7 @@ def delete_map_submission(submission_id):
     pin_id = submission.pin_id
 
     try:
+        release_submission_images(map_db_session, submission)
         # Explicitly remove gallery rows (SQLite ignores ON DELETE CASCADE
         # unless PRAGMA foreign_keys=ON is set per-connection).
         map_db_session.query(MapSubmissionImage).filter(
@@ -2401,7 +2594,7 @@ def delete_map_submission(submission_id):
 
 @recorder_bp.route('/map/leaderboard', methods=['GET'])
 def map_leaderboard():
-    _purge_orphan_image_data()
+    _collect_map_blobs_if_due()
     rows = (
         map_db_session.query(
             MapSubmission.email,
@@ -2425,14 +2618,15 @@ def map_leaderboard():
 
 @recorder_bp.route('/map/featured', methods=['GET'])
 def get_featured_submission():
-    _purge_orphan_image_data()
+    _collect_map_blobs_if_due()
     submissions = (
         map_db_session.query(MapSubmission)
+        .options(*_SUBMISSION_LISTING_OPTIONS)
         .filter(MapSubmission.status == 'approved', MapSubmission.featured == 1)
         .order_by(MapSubmission.submitted_at.desc())
         .all()
     )
-    payload = [_serialize_submission(s) for s in submissions]
+    payload = _serialize_submissions(submissions)
     return jsonify({
         'status': 'success',
         'submissions': payload,
@@ -2639,14 +2833,14 @@ def get_map_background():
         .order_by(MapBackground.uploaded_at.desc())
         .first()
     )
-    if not background:
-        return _map_error('MAP_BACKGROUND_NOT_FOUND', 'No background uploaded', 404)
-
-    return send_file(
-        BytesIO(background.image_data),
-        mimetype=background.image_mime or 'application/octet-stream',
+    response = _send_map_image(
+        background,
         download_name=background.image_filename or 'map-background',
-    )
+        last_modified=background.uploaded_at,
+    ) if background else None
+    if response is None:
+        return _map_error('MAP_BACKGROUND_NOT_FOUND', 'No background uploaded', 404)
+    return response
 
 
 @recorder_bp.route('/map/background/info', methods=['GET'])
@@ -2662,7 +2856,7 @@ def get_map_background_info():
     return jsonify({
         'status': 'success',
         'has_background': True,
-        'image_url': '/api/map/background',
+        'image_url': _versioned_image_url('/api/map/background', background.image_sha256),
         'image_mime': background.image_mime,
         'image_size': background.image_size,
         'uploaded_at': background.uploaded_at.isoformat() if background.uploaded_at else None,
@@ -2705,8 +2899,17 @@ def upload_map_background():
         .filter(MapBackground.school_id == school_id)
         .first()
     )
+    try:
+        image_sha256 = store_map_blob(map_db_session, image_data, image_mime)
+    except Exception as exc:
+        logger.exception('Unable to store map background: %s', exc)
+        map_db_session.rollback()
+        return _map_error('MAP_BACKGROUND_SAVE_FAILED', 'Could not save background image', 500)
+
     if background:
-        background.image_data = image_data
+        release_map_blob(map_db_session, background.image_sha256)
+        background.image_data = None
+        background.image_sha256 = image_sha256
         background.image_mime = image_mime
         background.image_filename = stored_filename
         background.image_size = image_size
@@ -2716,7 +2919,7 @@ def upload_map_background():
     else:
         background = MapBackground(
             school_id=school_id,
-            image_data=image_data,
+            image_sha256=image_sha256,
             image_mime=image_mime,
             image_filename=stored_filename,
             image_size=image_size,
@@ -2736,7 +2939,7 @@ def upload_map_background():
     return jsonify({
         'status': 'success',
         'message': 'Background image saved',
-        'image_url': '/api/map/background',
+        'image_url': _versioned_image_url('/api/map/background', image_sha256),
         'image_size': image_size,
     }), 200
 
@@ -0,0 +1,186 @@
+"""Resized derivatives of map images for cards, popovers and ``srcset``.
+
+Derivatives are keyed by the source blob's SHA-256 and a width from
+:data:`THUMBNAIL_WIDTHS`, and cached under ``derived/`` in the blob store
+root. Because the source is content-addressed, a cached derivative never
+goes stale; a missing one is rebuilt on first request. Uploads and approvals
+warm the cache on a small background pool so the first viewer does not pay
+for the resize.
+
+WebP is used when Pillow was built with it, JPEG otherwise. Sources that are
+already no wider than a requested width (as displayed, after EXIF rotation)
+have no derivative at that width; callers serve the original instead.
+Concurrent requests for the same missing derivative render it once.
+"""
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .blob_store import get_blob_store, validate_sha256
+
+try:
+    from PIL import Image, ImageOps, features  # type: ignore
+except Exception:  # pragma: no cover - dependency missing
+    Image = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (256, 768, 1600)
+THUMBNAIL_QUALITY = 80
+# Animated and vector formats are served as-is
+_SKIPPED_MIMES = {'image/gif', 'image/svg+xml', 'image/svg'}
+_EXIF_ORIENTATION = 0x0112
+# Orientations that rotate the stored image by 90 degrees when displayed
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+if Image is not None and features.check('webp'):
+    THUMBNAIL_FORMAT, THUMBNAIL_MIME, _THUMBNAIL_EXT = 'WEBP', 'image/webp', '.webp'
+else:
+    THUMBNAIL_FORMAT, THUMBNAIL_MIME, _THUMBNAIL_EXT = 'JPEG', 'image/jpeg', '.jpg'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# (sha256, width) -> [lock, waiters] for derivatives being rendered
+_render_locks: Dict[Tuple[str, int], List] = {}
+_render_locks_guard = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, min(2, (os.cpu_count() or 2) // 2))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='map-thumbnails')
+        return _executor
+
+
+def supports_thumbnails(mime: Optional[str]) -> bool:
+    return Image is not None and bool(mime) and mime.startswith('image/') and mime not in _SKIPPED_MIMES
+
+
+def snap_width(requested: int) -> int:
+    """Round a requested width up to the nearest derivative width."""
+    for width in THUMBNAIL_WIDTHS:
+        if requested <= width:
+            return width
+    return THUMBNAIL_WIDTHS[-1]
+
+
+def derivative_path(sha256: str, width: int) -> str:
+    validate_sha256(sha256)
+    root = os.path.join(get_blob_store().root, 'derived')
+    return os.path.join(root, sha256[:2], f'{sha256}-w{width}{_THUMBNAIL_EXT}')
+
+
+def _render(source_path: str, width: int, target_path: str) -> bool:
+    with Image.open(source_path) as img:
+        transposed = img.getexif().get(_EXIF_ORIENTATION) in _TRANSPOSED_ORIENTATIONS
+        shown_width, shown_height = (img.height, img.width) if transposed else (img.width, img.height)
+        if shown_width <= width:
+            return False
+        if img.format == 'JPEG':
+            # Let the decoder downscale by a power of two before resampling
+            target = (width, max(1, shown_height * width // shown_width))
+            img.draft('RGB', target[::-1] if transposed else target)
+        img = ImageOps.exif_transpose(img)
+        height = max(1, round(img.height * width / img.width))
+        if img.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        if THUMBNAIL_FORMAT == 'JPEG' and img.mode == 'RGBA':
+            img = img.convert('RGB')
+        resized = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), prefix='.thumb-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                resized.save(handle, format=THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return True
+
+
+@contextmanager
+def _single_flight(key: Tuple[str, int]):
+    with _render_locks_guard:
+        entry = _render_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _render_locks[key]
+
+
+def ensure_derivative(sha256: str, width: int) -> Optional[Tuple[str, str]]:
+    """Return ``(path, mime)`` of the derivative, building it if needed.
+
+    Returns ``None`` when the original should be served instead (source no
+    wider than ``width``, blob missing, or the image could not be decoded).
+    """
+    if Image is None:
+        return None
+    path = derivative_path(sha256, width)
+    if os.path.isfile(path):
+        return path, THUMBNAIL_MIME
+    store = get_blob_store()
+    with _single_flight((sha256, width)):
+        if os.path.isfile(path):
+            # Rendered by the request we waited on
+            return path, THUMBNAIL_MIME
+        try:
+            if not _render(store.path(sha256), width, path):
+                return None
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning('Could not build %dpx derivative of map blob %s', width, sha256, exc_info=True)
+            return None
+    return path, THUMBNAIL_MIME
+
+
+def _warm(sha256: str) -> None:
+    for width in THUMBNAIL_WIDTHS:
+        if ensure_derivative(sha256, width) is None:
+            break
+
+
+def schedule_derivatives(images: Iterable[Tuple[Optional[str], Optional[str]]]) -> None:
+    """Build every derivative width for ``(sha256, mime)`` pairs in the background."""
+    for sha256, mime in images:
+        if sha256 and supports_thumbnails(mime) and not os.path.isfile(derivative_path(sha256, THUMBNAIL_WIDTHS[-1])):
+            _get_executor().submit(_warm, sha256)
+
+
+def delete_derivatives(sha256: str) -> int:
+    """Remove cached derivatives of a collected blob."""
+    removed = 0
+    for width in THUMBNAIL_WIDTHS:
+        try:
+            os.unlink(derivative_path(sha256, width))
+            removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+__all__ = [
+    'THUMBNAIL_MIME',
+    'THUMBNAIL_WIDTHS',
+    'delete_derivatives',
+    'derivative_path',
+    'ensure_derivative',
+    'schedule_derivatives',
+    'snap_width',
+    'supports_thumbnails',
+]
@@ -0,0 +1,118 @@
+"""Reusable weighted sampler for ticket draws.
+
+A :class:`WeightedSampler` is built once from an eligibility snapshot and can
+then be drawn from repeatedly: it keeps the cumulative ticket totals and
+picks a candidate by binary search, so a draw is O(log n) instead of a walk
+over the pool. NumPy is used for the prefix sums and vectorized batch draws
+when it is installed; otherwise the sampler falls back to ``bisect``.
+
+Real draws pass ``secure_random`` (the default); simulations may pass a
+seeded ``random.Random`` or ``numpy.random.Generator`` for speed and
+reproducibility.
+"""
+import bisect
+import itertools
+import random
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+try:
+    import numpy as _np  # type: ignore
+except Exception:  # pragma: no cover - dependency missing
+    _np = None  # type: ignore
+
+secure_random = random.SystemRandom()
+
+T = TypeVar('T')
+
+
+class WeightedSampler(Generic[T]):
+    """Draw items with probability proportional to their weight."""
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if len(items) != len(weights):
+            raise ValueError('items and weights must have the same length')
+        pairs = [(item, float(weight)) for item, weight in zip(items, weights) if weight > 0]
+        self.items: List[T] = [item for item, _ in pairs]
+        self.weights: List[float] = [weight for _, weight in pairs]
+        if _np is not None:
+            self._cumulative = _np.cumsum(_np.asarray(self.weights, dtype=_np.float64))
+            self.total = float(self._cumulative[-1]) if self.weights else 0.0
+        else:
+            self._cumulative = list(itertools.accumulate(self.weights))
+            self.total = self._cumulative[-1] if self.weights else 0.0
+
+    @classmethod
+    def from_pairs(cls, pairs: Sequence[Tuple[T, float]]) -> 'WeightedSampler[T]':
+        """Build a sampler from ``(item, weight)`` pairs such as the eligible list."""
+        return cls([item for item, _ in pairs], [weight for _, weight in pairs])
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def probability(self, index: int) -> float:
+        """Return the chance (0-1) that ``items[index]`` is drawn."""
+        return self.weights[index] / self.total if self.total else 0.0
+
+    def _index_for(self, target: float) -> int:
+        if _np is not None:
+            index = int(_np.searchsorted(self._cumulative, target, side='right'))
+        else:
+            index = bisect.bisect_right(self._cumulative, target)
+        return min(index, len(self.items) - 1)
+
+    def draw_index(self, rng: Any = secure_random) -> int:
+        """Pick one index using ``rng.random()`` as the entropy source."""
+        if not self.items:
+            raise ValueError('Cannot draw from an empty pool')
+        return self._index_for(rng.random() * self.total)
+
+    def draw(self, rng: Any = secure_random) -> Tuple[T, float]:
+        """Return ``(item, weight)`` for one draw."""
+        index = self.draw_index(rng)
+        return self.items[index], self.weights[index]
+
+    def _vector_indices(self, count: int, rng: Optional[Any]):
+        """Draw ``count`` indices with NumPy, or return ``None`` if it cannot be used."""
+        if _np is None or not (rng is None or isinstance(rng, _np.random.Generator)):
+            return None
+        generator = rng if rng is not None else _np.random.default_rng(secure_random.getrandbits(128))
+        targets = generator.random(count) * self.total
+        indices = _np.searchsorted(self._cumulative, targets, side='right')
+        return _np.minimum(indices, len(self.items) - 1)
+
+    def draw_indices(self, count: int, rng: Optional[Any] = None) -> List[int]:
+        """Return ``count`` independent draws as indices.
+
+        ``rng`` may be a ``numpy.random.Generator`` (vectorized) or anything
+        with ``random()``. Without one, a NumPy generator seeded from
+        ``secure_random`` is used when NumPy is available.
+        """
+        if not self.items:
+            raise ValueError('Cannot draw from an empty pool')
+        if count <= 0:
+            return []
+        indices = self._vector_indices(count, rng)
+        if indices is not None:
+            return indices.tolist()
+        rng = rng if rng is not None else secure_random
+        return [self._index_for(rng.random() * self.total) for _ in range(count)]
+
+    def draw_counts(self, count: int, rng: Optional[Any] = None) -> List[int]:
+        """Return how often each item wins across ``count`` draws."""
+        if not self.items:
+            raise ValueError('Cannot draw from an empty pool')
+        if count <= 0:
+            return [0] * len(self.items)
+        indices = self._vector_indices(count, rng)
+        if indices is not None:
+            return _np.bincount(indices, minlength=len(self.items)).tolist()
+        counts = [0] * len(self.items)
+        for index in self.draw_indices(count, rng):
+            counts[index] += 1
+        return counts
+
+
+__all__ = [
+    'WeightedSampler',
+    'secure_random',
+]
@@ -0,0 +1,205 @@
+"""Consolidated write path for recorded scans.
+
+A scan used to touch the ORM several times: a Student lookup and flush, a
+SessionRecord flush, a second Session fetch to bump counters in Python and a
+read-modify-write of ``draft_pool``. These helpers issue a fixed number of
+set-based statements instead and leave the commit to the caller, so one scan
+is one short transaction.
+"""
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+
+from .db import Session as SessionModel, SessionRecord, Student, _now_utc, db_session
+from .draw_db import update_tickets_for_record
+from .student_cache import snapshot_student, stage_student_change
+from .ticket_ledger import enqueue_ticket_update, is_write_behind_enabled
+
+# Category -> (per-category counter, clean/dirty rollup) on the sessions row
+SESSION_COUNTER_COLUMNS = {
+    'clean': ('clean_number', 'total_clean'),
+    'red': ('red_number', 'total_dirty'),
+    'dirty': ('dirty_number', 'total_dirty'),
+    'faculty': ('faculty_number', 'total_clean'),
+}
+
+
+def increment_session_counters(session_id: str, counts: Dict[str, int]) -> None:
+    """Atomically bump the cached per-category counters and ledger version on a session row."""
+    sessions = SessionModel.__table__
+    values = {}
+    total = 0
+    for category, amount in counts.items():
+        if not amount or category not in SESSION_COUNTER_COLUMNS:
+            continue
+        for column_name in SESSION_COUNTER_COLUMNS[category]:
+            column = sessions.c[column_name]
+            values[column_name] = values.get(column_name, func.coalesce(column, 0)) + amount
+        total += amount
+
+    if not total:
+        return
+
+    values['total_records'] = func.coalesce(sessions.c.total_records, 0) + total
+    values['ledger_version'] = func.coalesce(sessions.c.ledger_version, 0) + 1
+    values['updated_at'] = _now_utc()
+    db_session.execute(sessions.update().where(sessions.c.id == session_id).values(**values))
+
+
+def ensure_student_row(
+    school_id: str,
+    student_identifier: str,
+    *,
+    preferred_name: str = '',
+    last_name: str = '',
+    grade: str = '',
+    advisor: str = '',
+    house: str = '',
+    clan: str = '',
+    existing=None,
+) -> Tuple[str, bool]:
+    """Return ``(students.id, created)`` for an identifier, inserting it if unknown.
+
+    ``existing`` lets callers that already resolved the student skip the lookup.
+    """
+    if existing is not None and existing.student_identifier == student_identifier:
+        return existing.id, False
+
+    row = (
+        db_session.query(Student.id)
+        .filter_by(student_identifier=student_identifier, school_id=school_id)
+        .first()
+    )
+    if row:
+        return row[0], False
+
+    new_id = str(uuid.uuid4())
+    db_session.execute(Student.__table__.insert().values(
+        id=new_id,
+        school_id=school_id,
+        student_identifier=student_identifier,
+        preferred_name=preferred_name,
+        last_name=last_name,
+        grade=grade,
+        advisor=advisor,
+        house=house,
+        clan=clan,
+    ))
+    stage_student_change(
+        db_session,
+        school_id,
+        new_id,
+        snapshot_student(new_id, student_identifier, preferred_name, last_name, grade, advisor, house, clan),
+    )
+    return new_id, True
+
+
+def _insert_dirty_record(values: Dict) -> None:
+    """Insert a dirty record numbered one past the session's last dirty plate.
+
+    The ordinal is computed by the INSERT ... SELECT itself, so concurrent
+    writers serialize on the insert instead of racing on a separate read.
+    Rows from before ``dirty_ordinal`` existed count by position.
+    """
+    records = SessionRecord.__table__
+    prior = records.alias('prior_dirty')
+    columns = list(values)
+    next_ordinal = func.coalesce(func.max(prior.c.dirty_ordinal), func.count(prior.c.id)) + 1
+    db_session.execute(records.insert().from_select(
+        columns + ['dirty_ordinal'],
+        select(
+            *[literal(values[name], type_=records.c[name].type) for name in columns],
+            next_ordinal,
+        ).where(prior.c.session_id == values['session_id'], prior.c.category == 'dirty'),
+    ))
+
+
+def record_scan(
+    *,
+    school_id: str,
+    session_id: str,
+    category: str,
+    recorded_by: str,
+    dedupe_key: str,
+    student_id: Optional[str] = None,
+    grade: Optional[str] = None,
+    house: Optional[str] = None,
+    is_manual_entry: bool = False,
+    preferred_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    client_recorded_at: Optional[datetime] = None,
+    update_counters: bool = True,
+) -> Dict:
+    """Write one scan: the session record, the session counters and the ticket ledger.
+
+    ``student_id`` is the ``students.id`` primary key. ``recorded_at`` is
+    always the server time; a client-supplied scan time is kept apart in
+    ``client_recorded_at``. In write-behind mode the ticket update is only
+    queued and the returned ``ticket_balance`` is ``None``.
+
+    Raises ``IntegrityError`` when ``dedupe_key`` is already recorded in the
+    session; the caller owns the transaction and must roll back. Batch
+    writers pass ``update_counters=False`` and call
+    :func:`increment_session_counters` once with the totals.
+    """
+    record_id = str(uuid.uuid4())
+    values = dict(
+        id=record_id,
+        school_id=school_id,
+        session_id=session_id,
+        student_id=student_id,
+        category=category,
+        grade=grade,
+        house=house,
+        recorded_by=recorded_by,
+        recorded_at=_now_utc(),
+        client_recorded_at=client_recorded_at,
+        is_manual_entry=1 if is_manual_entry else 0,
+        dedupe_key=dedupe_key,
+        preferred_name=preferred_name,
+        last_name=last_name,
+    )
+    dirty_ordinal = None
+    if category == 'dirty':
+        _insert_dirty_record(values)
+        dirty_ordinal = db_session.execute(
+            select(SessionRecord.dirty_ordinal).where(SessionRecord.id == record_id)
+        ).scalar()
+    else:
+        db_session.execute(SessionRecord.__table__.insert().values(**values))
+
+    if update_counters:
+        increment_session_counters(session_id, {category: 1})
+
+    ticket_balance = None
+    if student_id and is_write_behind_enabled():
+        # The balance is unknown until the ledger worker applies the update
+        enqueue_ticket_update(
+            school_id=school_id,
+            session_id=session_id,
+            session_record_id=record_id,
+            student_id=student_id,
+            category=category,
+            recorded_by=recorded_by,
+        )
+    elif student_id:
+        ticket_balance = update_tickets_for_record(
+            session_id=session_id,
+            student_id=student_id,
+            category=category,
+            session_record_id=record_id,
+            user_id=recorded_by,
+            school_id=school_id,
+        )
+
+    return {'record_id': record_id, 'ticket_balance': ticket_balance, 'dirty_ordinal': dirty_ordinal}
+
+
+__all__ = [
+    'SESSION_COUNTER_COLUMNS',
+    'ensure_student_row',
+    'increment_session_counters',
+    'record_scan',
+]
@@ -0,0 +1,221 @@
+"""Bounded LRU cache for hydrated session JSON.
+
+``storage.session_data`` used to be a plain dict that kept every session a
+worker ever hydrated. Entries are rebuilt from the database on a miss, so
+this cache may drop them freely: it holds at most ``max_entries`` sessions,
+roughly ``max_bytes`` of record data, and forgets entries idle for longer
+than ``ttl_seconds``. A limit of ``0`` disables that bound.
+
+Sizes are estimated from record counts rather than measured, because
+callers append to cached lists in place after every scan.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Rough in-memory cost of one cached session and of one record dict in it
+ENTRY_OVERHEAD_BYTES = 4096
+RECORD_BYTES = 1024
+RECORD_LIST_FIELDS = ('clean_records', 'red_records', 'faculty_clean_records', 'scan_history')
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+
+def estimate_session_bytes(session_info) -> int:
+    """Approximate the memory held by a cached session entry."""
+    if not isinstance(session_info, dict):
+        return ENTRY_OVERHEAD_BYTES
+    records = 0
+    for field in RECORD_LIST_FIELDS:
+        value = session_info.get(field)
+        if isinstance(value, list):
+            records += len(value)
+    return ENTRY_OVERHEAD_BYTES + records * RECORD_BYTES
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.environ.get(name, '')
+    try:
+        return max(0, int(raw)) if raw.strip() else default
+    except ValueError:
+        print(f"Ignoring invalid {name}={raw!r}; using {default}")
+        return default
+
+
+class SessionCache(MutableMapping):
+    """Dict-like LRU cache with entry, byte and idle-time limits."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        *,
+        clock=time.monotonic,
+        sizer: Callable[[Any], int] = estimate_session_bytes,
+    ):
+        self._entries: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._clock = clock
+        self._sizer = sizer
+        self._bytes = 0
+        self.configure(max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'SessionCache':
+        """Build a cache sized by the ``SESSION_CACHE_*`` environment variables."""
+        return cls(
+            max_entries=_env_int('SESSION_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            max_bytes=_env_int('SESSION_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+            ttl_seconds=_env_int('SESSION_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS),
+            **kwargs,
+        )
+
+    def configure(
+        self,
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max(0, int(max_entries))
+            if max_bytes is not None:
+                self.max_bytes = max(0, int(max_bytes))
+            if ttl_seconds is not None:
+                self.ttl_seconds = max(0, ttl_seconds)
+            self._evict()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'estimated_bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    # Each slot is [value, last_access, estimated_bytes]
+    def _is_expired(self, slot, now) -> bool:
+        return bool(self.ttl_seconds) and now - slot[1] > self.ttl_seconds
+
+    def _drop(self, key) -> None:
+        slot = self._entries.pop(key)
+        self._bytes -= slot[2]
+
+    def _resize(self, slot) -> None:
+        size = self._sizer(slot[0])
+        self._bytes += size - slot[2]
+        slot[2] = size
+
+    def _evict(self, protect=None) -> None:
+        now = self._clock()
+        while self._entries:
+            oldest_key, oldest_slot = next(iter(self._entries.items()))
+            if self._is_expired(oldest_slot, now):
+                self._drop(oldest_key)
+                self.expirations += 1
+                continue
+            over_count = self.max_entries and len(self._entries) > self.max_entries
+            over_bytes = self.max_bytes and self._bytes > self.max_bytes
+            if not (over_count or over_bytes) or oldest_key == protect:
+                break
+            self._drop(oldest_key)
+            self.evictions += 1
+
+    def _live_slot(self, key, now):
+        """Return the slot for ``key``, dropping it first if it has expired."""
+        slot = self._entries.get(key)
+        if slot is not None and self._is_expired(slot, now):
+            self._drop(key)
+            self.expirations += 1
+            slot = None
+        return slot
+
+    def __getitem__(self, key):
+        with self._lock:
+            now = self._clock()
+            slot = self._live_slot(key, now)
+            if slot is None:
+                self.misses += 1
+                raise KeyError(key)
+            self.hits += 1
+            slot[1] = now
+            self._entries.move_to_end(key)
+            self._resize(slot)
+            self._evict(protect=key)
+            return slot[0]
+
+    def __setitem__(self, key, value) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            slot = [value, self._clock(), 0]
+            self._entries[key] = slot
+            self._resize(slot)
+            self._evict(protect=key)
+
+    def __delitem__(self, key) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return self._live_slot(key, self._clock()) is not None
+
+    def pop(self, key, *default):
+        """Remove ``key`` and return its value in one step; expired entries count as missing."""
+        with self._lock:
+            slot = self._live_slot(key, self._clock())
+            if slot is None:
+                if default:
+                    return default[0]
+                raise KeyError(key)
+            self._drop(key)
+            return slot[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self):
+        """Snapshot of ``(key, value)`` pairs without touching recency or stats."""
+        with self._lock:
+            return [(key, slot[0]) for key, slot in self._entries.items()]
+
+    def values(self):
+        with self._lock:
+            return [slot[0] for slot in self._entries.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+__all__ = [
+    'SessionCache',
+    'estimate_session_bytes',
+]
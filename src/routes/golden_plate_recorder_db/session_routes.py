@@ -2,10 +2,10 @@ import csv
 import io
 import re
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from flask import Response, jsonify, request, session
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_
 from sqlalchemy.exc import IntegrityError
 
 from . import recorder_bp
@@ -17,10 +17,19 @@ from .db import (
     SessionDrawEvent,
     SessionRecord,
     Student,
+    TicketLedgerQueueItem,
     _now_utc,
     db_session,
 )
-from .domain import serialize_draw_info
+from .dedupe import (
+    SessionDedupeIndex,
+    discard_session_dedupe_index,
+    get_session_dedupe_index,
+    normalize_profile,
+)
+from .domain import load_draw_winners, session_draw_info
+from .eligibility_cache import stage_eligibility_change
+from .scan_service import ensure_student_row, increment_session_counters, record_scan
 from .security import get_current_user, is_guest, is_interschool_user, require_admin, require_auth, require_auth_or_guest
 from .storage import (
     delete_requests,
@@ -29,12 +38,15 @@ from .storage import (
     get_session_entry,
     get_student_lookup_for_school,
     hydrate_session_from_db,
+    note_recorded_scan,
     save_delete_requests,
     save_session_data,
     session_data,
-    update_student_lookup,
 )
+from .student_cache import get_student_resolver
 from .utils import (
+    decode_keyset_cursor,
+    encode_keyset_cursor,
     extract_student_id_from_key,
     format_display_name,
     make_student_key,
@@ -112,16 +124,19 @@ def _delete_session_with_dependencies(db_sess):
 
     # Explicitly delete dependents because SQLite foreign key cascades
     # are easy to disable accidentally and we do not want orphan rows.
+    db_session.query(TicketLedgerQueueItem).filter_by(session_id=session_id).delete(synchronize_session=False)
     db_session.query(SessionRecord).filter_by(session_id=session_id).delete(synchronize_session=False)
     db_session.query(SessionDrawEvent).filter_by(session_id=session_id).delete(synchronize_session=False)
+    # Bulk deletes skip the flush hooks that invalidate cached draw pools
+    stage_eligibility_change(db_session, db_sess.school_id)
 
     db_session.delete(db_sess)
     db_session.commit()
+    discard_session_dedupe_index(session_id)
 
     save_delete_requests()
 
-    if session_id in session_data:
-        del session_data[session_id]
+    if session_data.pop(session_id, None) is not None:
         save_session_data()
 
     if session.get('session_id') == session_id:
@@ -369,6 +384,7 @@ def list_sessions():
         query = query.filter(SessionModel.is_public == 1)
     
     db_sessions = query.order_by(SessionModel.created_at.desc()).all()
+    winners = load_draw_winners(db_sessions)
 
     user_sessions = []
     for db_sess in db_sessions:
@@ -385,11 +401,7 @@ def list_sessions():
         clean_percentage = (combined_clean_count / total_for_ratio * 100) if total_for_ratio > 0 else 0
         dirty_percentage = ((dirty_count + red_count) / total_for_ratio * 100) if total_for_ratio > 0 else 0
 
-        # Get draw_info from JSON storage for backward compatibility
-        json_data = session_data.get(db_sess.id, {})
-        if json_data.get('school_id') and json_data.get('school_id') != school_id:
-            json_data = {}
-        draw_info = serialize_draw_info(json_data.get('draw_info', {}))
+        draw_info = session_draw_info(db_sess, winners)
 
         pending = any(
             req['session_id'] == db_sess.id and req['status'] == 'pending'
@@ -619,14 +631,10 @@ def get_session_status():
     clean_percentage = (combined_clean_count / total_recorded * 100) if total_recorded > 0 else 0
     dirty_percentage = (combined_dirty_count / total_recorded * 100) if total_recorded > 0 else 0
 
-    # Get scan history count and draw_info from JSON storage for backward compatibility
-    json_data = session_data.get(session_id, {})
-    if json_data.get('school_id') and json_data.get('school_id') != school_id:
-        json_data = {}
-    ensure_session_structure(json_data)
-    scan_history_count = len(json_data.get('scan_history', []))
-    draw_info = serialize_draw_info(json_data.get('draw_info', {}))
-    faculty_pick = _serialize_faculty_pick(db_sess, json_data.get('faculty_pick'))
+    # Read from the session row: the hydrated cache may have evicted this session
+    scan_history_count = db_sess.total_records or 0
+    draw_info = session_draw_info(db_sess)
+    faculty_pick = _serialize_faculty_pick(db_sess)
 
     return jsonify({
         'session_id': session_id,
@@ -821,9 +829,81 @@ def get_house_stats(session_id):
     }), 200
 
 
+SCAN_HISTORY_PAGE_SIZE = 100
+# How far behind a since cursor polls look again for late-committed records
+SCAN_HISTORY_OVERLAP = timedelta(seconds=30)
+MAX_SCAN_HISTORY_PAGE_SIZE = 500
+
+
+def _records_after(recorded_at, record_id):
+    return or_(
+        SessionRecord.recorded_at > recorded_at,
+        and_(SessionRecord.recorded_at == recorded_at, SessionRecord.id > record_id),
+    )
+
+
+def _records_before(recorded_at, record_id):
+    return or_(
+        SessionRecord.recorded_at < recorded_at,
+        and_(SessionRecord.recorded_at == recorded_at, SessionRecord.id < record_id),
+    )
+
+
+def _scan_history_name(session_record, student):
+    if session_record.preferred_name or session_record.last_name:
+        # Names stored on the record win (faculty and manual entries)
+        preferred = (session_record.preferred_name or '').strip()
+        last = (session_record.last_name or '').strip()
+        return f"{preferred} {last}".strip()
+    if student:
+        preferred = (student.preferred_name or '').strip()
+        last = (student.last_name or '').strip()
+        return f"{preferred} {last}".strip()
+    return ''
+
+
+def _format_scan_history(session_id, rows):
+    """Format ``rows`` (oldest first) newest first.
+
+    Dirty plates are numbered by the ordinal stored when they were recorded,
+    so a record keeps its number however the history is paged.
+    """
+    formatted = []
+    for session_record, student in rows:
+        category = session_record.category.lower()
+        name = _scan_history_name(session_record, student)
+        if category == 'dirty':
+            ordinal = session_record.dirty_ordinal
+            name = f'Dirty Plate #{ordinal}' if ordinal else 'Dirty Plate'
+        elif not name and category == 'faculty':
+            name = 'Faculty Clean Plate'
+        elif not name:
+            name = 'Unknown'
+
+        formatted.append({
+            'id': session_record.id,
+            'cursor': encode_keyset_cursor(session_id, session_record.recorded_at, session_record.id),
+            'timestamp': _isoformat_timestamp(session_record.client_recorded_at or session_record.recorded_at) or '',
+            'name': name,
+            'category': category.upper(),
+            'is_manual_entry': bool(session_record.is_manual_entry)
+        })
+    formatted.reverse()
+    return formatted
+
+
 @recorder_bp.route('/session/scan-history', methods=['GET'])
 def get_scan_history():
-    """Get scan history for current session (formatted) from session_records table."""
+    """Get formatted scan history for the current session, newest first.
+
+    ``?since=<cursor>`` returns only records newer than the cursor and
+    ``?before=<cursor>&limit=N`` pages backwards. Without either, the newest
+    ``limit`` records (all of them when no limit is given) are returned.
+    ``since`` polls also re-send the last ``SCAN_HISTORY_OVERLAP`` of records
+    behind the cursor, so clients merge by ``id``.
+    ``cursor`` in the response is what the next ``since`` poll should send;
+    ``reset`` tells the client to replace rather than merge its list.
+    """
     if not require_auth_or_guest():
         return jsonify({'error': 'Authentication or guest access required'}), 401
 
@@ -842,259 +922,127 @@ def get_scan_history():
     if is_guest() and not db_sess.is_public:
         return jsonify({'error': 'Access denied'}), 403
 
-    # Get all records from session_records table
-    records = (
+    since = (request.args.get('since') or '').strip()
+    before = (request.args.get('before') or '').strip()
+    if since and before:
+        return jsonify({'error': 'Use either since or before, not both'}), 400
+
+    limit = None
+    raw_limit = request.args.get('limit')
+    if raw_limit not in (None, ''):
+        try:
+            limit = max(1, min(int(raw_limit), MAX_SCAN_HISTORY_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+    elif before:
+        limit = SCAN_HISTORY_PAGE_SIZE
+
+    try:
+        since_key = decode_keyset_cursor(since) if since else None
+        before_key = decode_keyset_cursor(before) if before else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    # A cursor from another session (the client switched) restarts the list
+    reset = True
+    if since_key and since_key[0] == session_id:
+        reset = False
+    if before_key and before_key[0] != session_id:
+        return jsonify({'error': 'Cursor does not belong to the active session'}), 400
+
+    query = (
         db_session.query(SessionRecord, Student)
         .outerjoin(Student, SessionRecord.student_id == Student.id)
         .filter(
             SessionRecord.session_id == session_id,
             SessionRecord.school_id == school_id
         )
-        .order_by(SessionRecord.recorded_at.desc())
-        .all()
     )
-
-    formatted_history = []
-    dirty_count = 0
-    
-    for session_record, student in records:
-        category = session_record.category.lower()
-        
-        # Build the name - prioritize names stored in session_record
-        name = ''
-        if session_record.preferred_name or session_record.last_name:
-            # Use names directly from session_record (for faculty and manual entries)
-            preferred = (session_record.preferred_name or '').strip()
-            last = (session_record.last_name or '').strip()
-            name = f"{preferred} {last}".strip()
-        elif student:
-            # Fall back to student record if available
-            preferred = (student.preferred_name or '').strip()
-            last = (student.last_name or '').strip()
-            name = f"{preferred} {last}".strip()
-        
-        # Handle special categories
-        if category == 'dirty':
-            dirty_count += 1
-            name = f'Dirty Plate #{dirty_count}'
-        elif not name and category == 'faculty':
-            name = 'Faculty Clean Plate'
-        elif not name:
-            name = 'Unknown'
-
-        formatted_history.append({
-            'timestamp': session_record.recorded_at.isoformat() if session_record.recorded_at else '',
-            'name': name,
-            'category': category.upper(),
-            'is_manual_entry': bool(session_record.is_manual_entry)
-        })
+    overlap_rows = []
+    if not reset:
+        # recorded_at is stamped before commit, so a slow writer can land
+        # behind a cursor we already handed out; re-send that window and let
+        # the client drop the ids it already holds.
+        overlap_rows = (
+            query.filter(
+                SessionRecord.recorded_at >= since_key[1] - SCAN_HISTORY_OVERLAP,
+                ~_records_after(since_key[1], since_key[2]),
+            )
+            .order_by(SessionRecord.recorded_at.asc(), SessionRecord.id.asc())
+            .all()
+        )
+        # Oldest first, so a truncated page resumes where it stopped
+        query = query.filter(_records_after(since_key[1], since_key[2])).order_by(
+            SessionRecord.recorded_at.asc(), SessionRecord.id.asc()
+        )
+    else:
+        if before_key:
+            query = query.filter(_records_before(before_key[1], before_key[2]))
+        query = query.order_by(SessionRecord.recorded_at.desc(), SessionRecord.id.desc())
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    rows = query.all()
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    if reset:
+        rows.reverse()
+
+    formatted_history = _format_scan_history(session_id, rows) if rows else []
+
+    if not reset:
+        # Only rows past the old cursor may move it forward
+        cursor = formatted_history[0]['cursor'] if formatted_history else since
+        if overlap_rows:
+            formatted_history += _format_scan_history(session_id, overlap_rows)
+    elif before_key:
+        # Paging backwards never moves the polling cursor
+        cursor = None
+    else:
+        cursor = formatted_history[0]['cursor'] if formatted_history else None
 
     return jsonify({
-        'scan_history': formatted_history
+        'session_id': session_id,
+        'scan_history': formatted_history,
+        'cursor': cursor,
+        'before_cursor': formatted_history[-1]['cursor'] if formatted_history and (reset and has_more) else None,
+        'has_more': has_more,
+        'reset': reset and not before_key,
     }), 200
 
 
-@recorder_bp.route('/record/<category>', methods=['POST'])
-def record_student(category):
-    """Record a student in a category."""
-    if not require_auth():
-        return jsonify({'error': 'Authentication required'}), 401
-
-    forbidden = _forbid_interschool_accounts()
-    if forbidden:
-        return forbidden
-
-    actor_id, actor_username, school_id = _get_request_actor()
-
-    session_id = session.get('session_id')
-    if not session_id:
-        return jsonify({'error': 'No active session'}), 400
-
-    session_info = get_session_entry(session_id)
-    if session_info is None:
-        return jsonify({'error': 'Session not found'}), 404
+RECORD_CATEGORIES = ('clean', 'dirty', 'red', 'faculty')
+MAX_BATCH_SCANS = 500
 
-    if category not in ['clean', 'dirty', 'red', 'faculty']:
-        return jsonify({'error': 'Invalid category'}), 400
 
-    data = request.get_json(silent=True) or {}
-    input_value = str(data.get('input_value', '') or '').strip()
-    provided_student_id = normalize_name(data.get('student_id'))
+def _parse_scan_reference(data):
+    """Normalize the student reference fields of a scan payload."""
     provided_key_raw = str(data.get('student_key') or '').strip()
-    provided_key = provided_key_raw.lower() if provided_key_raw else ''
-    provided_preferred = normalize_name(data.get('preferred_name') or data.get('preferred'))
-    provided_last = normalize_name(data.get('last_name') or data.get('last'))
-
-    ensure_session_structure(session_info)
-    school_lookup = get_student_lookup_for_school(school_id)
-
-    if category == 'dirty':
-        new_count = session_info.get('dirty_count', 0) + 1
-        session_info['dirty_count'] = new_count
-        record = {
-            'category': 'dirty',
-            'timestamp': datetime.now().isoformat(),
-                'recorded_by': actor_username,
-            'display_name': f"Dirty Plate #{new_count}"
-        }
-        session_info['scan_history'].append(record)
-        save_session_data()
-        
-        # Save to database
-        dedupe_key = f"dirty_{new_count}_{datetime.now().isoformat()}"
-        db_record = SessionRecord(
-            school_id=school_id,
-            session_id=session_id,
-            category='dirty',
-                recorded_by=actor_id,
-            is_manual_entry=0,
-            dedupe_key=dedupe_key
-        )
-        db_session.add(db_record)
-        
-        # Update session counts
-        db_sess = db_session.query(SessionModel).filter_by(id=session_id, school_id=school_id).first()
-        if db_sess:
-            db_sess.dirty_number = (db_sess.dirty_number or 0) + 1
-            db_sess.total_dirty = (db_sess.total_dirty or 0) + 1
-            db_sess.total_records = (db_sess.total_records or 0) + 1
-            db_sess.updated_at = datetime.now()
-        
-        db_session.commit()
-        
-        return jsonify({
-            'status': 'success',
-            'category': 'dirty',
-            'dirty_count': new_count
-        }), 200
-
-    if category == 'faculty':
-        if not input_value:
-            return jsonify({'error': 'Faculty name is required'}), 400
-
-        name_parts = input_value.split()
-        preferred_name = ""
-        last_name = ""
-        if len(name_parts) >= 2:
-            preferred_name = name_parts[0].strip().title()
-            last_name = ' '.join(name_parts[1:]).strip().title()
-        elif len(name_parts) == 1:
-            preferred_name = name_parts[0].strip().title()
-            last_name = ""
-        else:
-            return jsonify({'error': 'Faculty name is required'}), 400
-
-        duplicate_check = any(
-            (record.get('preferred_name') or record.get('first_name', '')).lower() == preferred_name.lower() and
-            record.get('last_name', '').lower() == last_name.lower()
-            for record in session_info['faculty_clean_records']
-        )
-        
-        # Also check database for duplicates
-        if not duplicate_check:
-            dedupe_key_to_check = f"faculty_{preferred_name.lower()}_{last_name.lower()}"
-            existing_db_record = (
-                db_session.query(SessionRecord)
-                .filter(
-                    SessionRecord.session_id == session_id,
-                    SessionRecord.school_id == school_id,
-                    SessionRecord.dedupe_key == dedupe_key_to_check
-                )
-                .first()
-            )
-            if existing_db_record:
-                duplicate_check = True
-
-        if duplicate_check:
-            return jsonify({
-                'error': 'duplicate',
-                'message': 'Faculty member already recorded in this session'
-            }), 409
+    return {
+        'input_value': str(data.get('input_value', '') or '').strip(),
+        'student_id': normalize_name(data.get('student_id')),
+        'student_key': provided_key_raw.lower() if provided_key_raw else '',
+        'preferred_name': normalize_name(data.get('preferred_name') or data.get('preferred')),
+        'last_name': normalize_name(data.get('last_name') or data.get('last')),
+    }
 
-        record = {
-            'preferred_name': preferred_name,
-            'first_name': preferred_name,
-            'last_name': last_name,
-            'grade': '',
-            'advisor': '',
-            'house': '',
-            'clan': '',
-            'category': 'faculty',
-            'timestamp': datetime.now().isoformat(),
-                'recorded_by': actor_username,
-            'is_manual_entry': True
-        }
-        session_info['faculty_clean_records'].append(record)
-        session_info['scan_history'].append(record)
-        save_session_data()
-        
-        # Save to database
-        dedupe_key = f"faculty_{preferred_name.lower()}_{last_name.lower()}"
-        db_record = SessionRecord(
-            school_id=school_id,
-            session_id=session_id,
-            category='faculty',
-            grade='',
-            house='',
-            recorded_by=actor_id,
-            is_manual_entry=1,
-            dedupe_key=dedupe_key,
-            preferred_name=preferred_name,
-            last_name=last_name
-        )
-        db_session.add(db_record)
-        
-        # Update session counts
-        db_sess = db_session.query(SessionModel).filter_by(id=session_id, school_id=school_id).first()
-        if db_sess:
-            db_sess.faculty_number = (db_sess.faculty_number or 0) + 1
-            db_sess.total_clean = (db_sess.total_clean or 0) + 1
-            db_sess.total_records = (db_sess.total_records or 0) + 1
-            db_sess.updated_at = datetime.now()
-        
-        db_session.commit()
-        
-        return jsonify({
-            'status': 'success',
-            'preferred_name': preferred_name,
-            'first_name': preferred_name,
-            'last_name': last_name,
-            'category': 'faculty',
-            'is_manual_entry': True,
-            'recorded_by': actor_username
-        }), 200
 
-    has_reference = bool(
-        input_value or
-        provided_student_id or
-        provided_key or
-        (provided_preferred and provided_last)
+def _scan_has_reference(reference):
+    return bool(
+        reference['input_value'] or
+        reference['student_id'] or
+        reference['student_key'] or
+        (reference['preferred_name'] and reference['last_name'])
     )
-    if not has_reference:
-        return jsonify({'error': 'Student ID or Name is required'}), 400
 
-    student_record = None
-    lookup_profile = None
-    dataset_match = False
-
-    def build_student_record(student_obj):
-        if not student_obj:
-            return None
-        preferred_val = str(student_obj.preferred_name or '').strip()
-        last_val = str(student_obj.last_name or '').strip()
-        return {
-            'Preferred': preferred_val,
-            'Last': last_val,
-            'Grade': str(student_obj.grade or '').strip(),
-            'Advisor': str(student_obj.advisor or '').strip(),
-            'House': str(student_obj.house or '').strip(),
-            'Clan': str(student_obj.clan or '').strip(),
-            'Student ID': str(student_obj.student_identifier or '').strip()
-        }
 
+def _scan_candidate_ids(reference):
+    """Return the normalized student identifiers a scan could refer to."""
+    input_value = reference['input_value']
+    provided_key = reference['student_key']
     candidate_ids = []
-    if provided_student_id:
-        candidate_ids.append(provided_student_id)
+    if reference['student_id']:
+        candidate_ids.append(reference['student_id'])
     key_id = extract_student_id_from_key(provided_key) if provided_key else ''
     if key_id:
         candidate_ids.append(key_id)
@@ -1110,26 +1058,18 @@ def record_student(category):
         norm_id = normalize_name(candidate_id)
         if norm_id and norm_id not in normalized_ids:
             normalized_ids.append(norm_id)
+    return normalized_ids
 
-    student_obj = None
-    if normalized_ids:
-        student_obj = (
-            db_session.query(Student)
-            .filter(
-                Student.school_id == school_id,
-                Student.student_identifier.in_(normalized_ids)
-            )
-            .first()
-        )
-        if student_obj:
-            dataset_match = True
 
-    cleaned_input = input_value
+def _scan_candidate_names(reference):
+    """Return ``(cleaned_input, preferred, last)`` guessed from a scan payload."""
+    provided_key = reference['student_key']
+    cleaned_input = reference['input_value']
     if cleaned_input:
         cleaned_input = re.sub(r'\([^)]*\)', '', cleaned_input).strip()
 
-    candidate_preferred = provided_preferred
-    candidate_last = provided_last
+    candidate_preferred = reference['preferred_name']
+    candidate_last = reference['last_name']
 
     if (not candidate_preferred or not candidate_last) and provided_key and not provided_key.startswith('id:'):
         key_preferred, key_last = split_student_key(provided_key)
@@ -1147,42 +1087,30 @@ def record_student(category):
             candidate_preferred = candidate_preferred or name_parts[0]
             candidate_last = candidate_last or ''
 
-    if not student_obj and candidate_preferred and candidate_last:
-        student_obj = (
-            db_session.query(Student)
-            .filter(Student.school_id == school_id)
-            .filter(func.lower(Student.preferred_name) == candidate_preferred.lower())
-            .filter(func.lower(Student.last_name) == candidate_last.lower())
-            .first()
-        )
-        if student_obj:
-            dataset_match = True
+    return cleaned_input, candidate_preferred, candidate_last
+
 
-    student_record = build_student_record(student_obj)
+def _build_scan_profile(reference, student_obj, school_lookup, normalized_ids, cleaned_input,
+                        candidate_preferred, candidate_last):
+    """Resolve the stored profile, student key and dedupe key for a student scan."""
+    input_value = reference['input_value']
+    provided_key = reference['student_key']
+    dataset_match = student_obj is not None
+    lookup_profile = None
 
-    if not student_record and provided_key:
+    if not student_obj and provided_key:
         lookup_profile = school_lookup.get(provided_key)
         if lookup_profile:
             dataset_match = True
-    else:
-        lookup_profile = None
-
-    preferred_name = ''
-    last_name = ''
-    grade = ''
-    advisor = ''
-    house = ''
-    clan = ''
-    student_id = ''
-
-    if student_record:
-        preferred_name = str(student_record.get('Preferred', '') or '').strip()
-        last_name = str(student_record.get('Last', '') or '').strip()
-        grade = str(student_record.get('Grade', '') or '').strip()
-        advisor = str(student_record.get('Advisor', '') or '').strip()
-        house = str(student_record.get('House', '') or '').strip()
-        clan = str(student_record.get('Clan', '') or '').strip()
-        student_id = str(student_record.get('Student ID', '') or '').strip()
+
+    if student_obj:
+        preferred_name = str(student_obj.preferred_name or '').strip()
+        last_name = str(student_obj.last_name or '').strip()
+        grade = str(student_obj.grade or '').strip()
+        advisor = str(student_obj.advisor or '').strip()
+        house = str(student_obj.house or '').strip()
+        clan = str(student_obj.clan or '').strip()
+        student_id = str(student_obj.student_identifier or '').strip()
     elif lookup_profile:
         preferred_name = normalize_name(lookup_profile.get('preferred_name'))
         last_name = normalize_name(lookup_profile.get('last_name'))
@@ -1192,6 +1120,7 @@ def record_student(category):
         clan = normalize_name(lookup_profile.get('clan'))
         student_id = normalize_name(lookup_profile.get('student_id'))
     else:
+        grade = advisor = house = clan = student_id = ''
         preferred_name = normalize_name(candidate_preferred or (cleaned_input.split()[0] if cleaned_input else input_value))
         if cleaned_input:
             parts = cleaned_input.split()
@@ -1199,12 +1128,12 @@ def record_student(category):
                 candidate_last = candidate_last or ' '.join(parts[1:])
         last_name = normalize_name(candidate_last)
 
-    if not preferred_name and provided_preferred:
-        preferred_name = provided_preferred
-    if not last_name and provided_last:
-        last_name = provided_last
-    if not student_id and provided_student_id:
-        student_id = provided_student_id
+    if not preferred_name and reference['preferred_name']:
+        preferred_name = reference['preferred_name']
+    if not last_name and reference['last_name']:
+        last_name = reference['last_name']
+    if not student_id and reference['student_id']:
+        student_id = reference['student_id']
     if not student_id and provided_key:
         extracted_id = extract_student_id_from_key(provided_key)
         if extracted_id:
@@ -1220,216 +1149,562 @@ def record_student(category):
     clan = clan or ''
     student_id = student_id or ''
 
-    student_key = make_student_key(preferred_name, last_name, student_id) or provided_key or None
-    if student_key:
-        student_key = student_key.lower()
+    student_key = make_student_key(preferred_name, last_name, student_id) or provided_key or ''
+    student_key = student_key.lower()
 
-    is_manual_entry = not dataset_match
+    # Create dedupe key from student info
+    dedupe_key = student_key or f"{preferred_name.lower()}_{last_name.lower()}_{grade}_{house}"
+    return {
+        'preferred_name': preferred_name,
+        'last_name': last_name,
+        'grade': grade,
+        'advisor': advisor,
+        'house': house,
+        'clan': clan,
+        'student_id': student_id,
+        'student_key': student_key,
+        'dedupe_key': dedupe_key,
+        'is_manual_entry': not dataset_match,
+    }
 
-    student_records = session_info['clean_records'] + session_info['red_records']
 
-    def normalize_field(value):
-        return str(value or '').strip().lower()
+def _scan_dedupe_lookup(profile):
+    return {
+        'dedupe_key': profile['dedupe_key'],
+        'student_id': profile['student_id'],
+        'student_key': profile['student_key'],
+        'profile': normalize_profile(
+            profile['preferred_name'],
+            profile['last_name'],
+            profile['grade'],
+            profile['advisor'],
+            profile['house'],
+            profile['clan'],
+        ),
+    }
 
-    student_key = student_key or ''
 
-    target_student_id = normalize_field(student_id)
-    target_preferred = normalize_field(preferred_name)
-    target_last = normalize_field(last_name)
-    target_grade = normalize_field(grade)
-    target_advisor = normalize_field(advisor)
-    target_house = normalize_field(house)
-    target_clan = normalize_field(clan)
-    target_key = normalize_field(student_key)
+def _student_scan_entry(profile, category, actor_username, timestamp=None):
+    """Build the cached session entry for a recorded student scan."""
+    return {
+        'preferred_name': profile['preferred_name'],
+        'first_name': profile['preferred_name'],
+        'last_name': profile['last_name'],
+        'grade': profile['grade'],
+        'advisor': profile['advisor'],
+        'house': profile['house'],
+        'clan': profile['clan'],
+        'student_id': profile['student_id'],
+        'student_key': profile['student_key'],
+        'category': category,
+        'timestamp': timestamp or datetime.now().isoformat(),
+        'recorded_by': actor_username,
+        'is_manual_entry': profile['is_manual_entry']
+    }
 
-    def is_duplicate(existing_record):
-        existing_student_id = normalize_field(existing_record.get('student_id'))
 
-        if target_student_id and existing_student_id:
-            return existing_student_id == target_student_id
+def _split_faculty_name(input_value):
+    """Return ``(preferred, last)`` for a faculty entry, or ``None`` when blank."""
+    name_parts = input_value.split()
+    if len(name_parts) >= 2:
+        return name_parts[0].strip().title(), ' '.join(name_parts[1:]).strip().title()
+    if len(name_parts) == 1:
+        return name_parts[0].strip().title(), ""
+    return None
 
-        if target_student_id and not existing_student_id:
-            return False
 
-        if not target_student_id and existing_student_id:
-            return False
+def _faculty_scan_entry(preferred_name, last_name, actor_username, timestamp=None):
+    return {
+        'preferred_name': preferred_name,
+        'first_name': preferred_name,
+        'last_name': last_name,
+        'grade': '',
+        'advisor': '',
+        'house': '',
+        'clan': '',
+        'category': 'faculty',
+        'timestamp': timestamp or datetime.now().isoformat(),
+        'recorded_by': actor_username,
+        'is_manual_entry': True
+    }
 
-        existing_key = normalize_field(existing_record.get('student_key'))
-        if target_key and existing_key:
-            return existing_key == target_key
 
-        existing_preferred = normalize_field(existing_record.get('preferred_name') or existing_record.get('first_name'))
-        existing_last = normalize_field(existing_record.get('last_name'))
-        existing_grade = normalize_field(existing_record.get('grade'))
-        existing_advisor = normalize_field(existing_record.get('advisor'))
-        existing_house = normalize_field(existing_record.get('house'))
-        existing_clan = normalize_field(existing_record.get('clan'))
+@recorder_bp.route('/record/<category>', methods=['POST'])
+def record_student(category):
+    """Record a student in a category."""
+    if not require_auth():
+        return jsonify({'error': 'Authentication required'}), 401
 
-        return (
-            existing_preferred == target_preferred and
-            existing_last == target_last and
-            existing_grade == target_grade and
-            existing_advisor == target_advisor and
-            existing_house == target_house and
-            existing_clan == target_clan
-        )
+    forbidden = _forbid_interschool_accounts()
+    if forbidden:
+        return forbidden
 
-    duplicate_check = any(
-        is_duplicate(record)
-        for record in student_records
-    )
-    
-    # Also check database for duplicates
-    if not duplicate_check:
-        dedupe_key_to_check = student_key or f"{preferred_name.lower()}_{last_name.lower()}_{grade}_{house}"
-        existing_db_record = (
-            db_session.query(SessionRecord)
-            .filter(
-                SessionRecord.school_id == school_id,
-                SessionRecord.session_id == session_id,
-                SessionRecord.dedupe_key == dedupe_key_to_check
-            )
-            .first()
+    actor_id, actor_username, school_id = _get_request_actor()
+
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'No active session'}), 400
+
+    session_info = get_session_entry(session_id)
+    if session_info is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    if category not in RECORD_CATEGORIES:
+        return jsonify({'error': 'Invalid category'}), 400
+
+    data = request.get_json(silent=True) or {}
+    reference = _parse_scan_reference(data)
+    input_value = reference['input_value']
+
+    school_lookup = get_student_lookup_for_school(school_id)
+
+    if category == 'dirty':
+        new_count = session_info.get('dirty_count', 0) + 1
+
+        # Save to database
+        dedupe_key = f"dirty_{new_count}_{datetime.now().isoformat()}"
+        outcome = record_scan(
+            school_id=school_id,
+            session_id=session_id,
+            category='dirty',
+            recorded_by=actor_id,
+            dedupe_key=dedupe_key,
         )
-        if existing_db_record:
-            duplicate_check = True
-
-    if duplicate_check:
-        existing_category = None
-        for cat in ['clean', 'red']:
-            if any(
-                is_duplicate(record)
-                for record in session_info[f'{cat}_records']
-            ):
-                existing_category = cat
-                break
-        
-        # If not found in JSON, check database
-        if not existing_category:
-            dedupe_key_to_check = student_key or f"{preferred_name.lower()}_{last_name.lower()}_{grade}_{house}"
-            db_record = (
-                db_session.query(SessionRecord)
-                .filter(
-                    SessionRecord.school_id == school_id,
-                    SessionRecord.session_id == session_id,
-                    SessionRecord.dedupe_key == dedupe_key_to_check
-                )
-                .first()
+        db_session.commit()
+        note_recorded_scan(session_info, outcome['record_id'])
+
+        session_info['dirty_count'] = new_count
+        session_info['scan_history'].append({
+            'category': 'dirty',
+            'timestamp': datetime.now().isoformat(),
+            'recorded_by': actor_username,
+            'display_name': f"Dirty Plate #{outcome['dirty_ordinal'] or new_count}"
+        })
+        save_session_data()
+
+        return jsonify({
+            'status': 'success',
+            'category': 'dirty',
+            'dirty_count': new_count
+        }), 200
+
+    if category == 'faculty':
+        if not input_value:
+            return jsonify({'error': 'Faculty name is required'}), 400
+
+        faculty_name = _split_faculty_name(input_value)
+        if faculty_name is None:
+            return jsonify({'error': 'Faculty name is required'}), 400
+        preferred_name, last_name = faculty_name
+
+        dedupe_key = f"faculty_{preferred_name.lower()}_{last_name.lower()}"
+        dedupe_index = get_session_dedupe_index(session_id)
+        if dedupe_index.lookup(dedupe_key=dedupe_key):
+            return jsonify({
+                'error': 'duplicate',
+                'message': 'Faculty member already recorded in this session'
+            }), 409
+
+        record = _faculty_scan_entry(preferred_name, last_name, actor_username)
+
+        # Save to database
+        try:
+            outcome = record_scan(
+                school_id=school_id,
+                session_id=session_id,
+                category='faculty',
+                grade='',
+                house='',
+                recorded_by=actor_id,
+                is_manual_entry=True,
+                dedupe_key=dedupe_key,
+                preferred_name=preferred_name,
+                last_name=last_name
             )
-            if db_record:
-                existing_category = db_record.category
+            db_session.commit()
+        except IntegrityError:
+            db_session.rollback()
+            discard_session_dedupe_index(session_id)
+            return jsonify({
+                'error': 'duplicate',
+                'message': 'Faculty member already recorded in this session'
+            }), 409
+
+        dedupe_index.add('faculty', dedupe_key=dedupe_key)
+        note_recorded_scan(session_info, outcome['record_id'])
+        session_info['faculty_clean_records'].append(record)
+        session_info['scan_history'].append(record)
+        save_session_data()
 
+        return jsonify({
+            'status': 'success',
+            'preferred_name': preferred_name,
+            'first_name': preferred_name,
+            'last_name': last_name,
+            'category': 'faculty',
+            'is_manual_entry': True,
+            'recorded_by': actor_username
+        }), 200
+
+    if not _scan_has_reference(reference):
+        return jsonify({'error': 'Student ID or Name is required'}), 400
+
+    resolver = get_student_resolver(school_id)
+    normalized_ids = _scan_candidate_ids(reference)
+    student_obj = resolver.find_by_identifier(normalized_ids)
+
+    cleaned_input, candidate_preferred, candidate_last = _scan_candidate_names(reference)
+    if not student_obj and candidate_preferred and candidate_last:
+        student_obj = resolver.find_by_name(candidate_preferred, candidate_last)
+
+    profile = _build_scan_profile(
+        reference,
+        student_obj,
+        school_lookup,
+        normalized_ids,
+        cleaned_input,
+        candidate_preferred,
+        candidate_last,
+    )
+    student_id = profile['student_id']
+    dedupe_key = profile['dedupe_key']
+    dedupe_index = get_session_dedupe_index(session_id)
+    dedupe_lookup = _scan_dedupe_lookup(profile)
+
+    existing_category = dedupe_index.lookup(**dedupe_lookup)
+    if existing_category:
         return jsonify({
             'error': 'duplicate',
-            'message': f'Student already recorded as {existing_category.upper() if existing_category else "UNKNOWN"} in this session'
+            'message': f'Student already recorded as {existing_category.upper()} in this session'
         }), 409
 
-    record = {
-        'preferred_name': preferred_name,
-        'first_name': preferred_name,
-        'last_name': last_name,
-        'grade': grade,
-        'advisor': advisor,
-        'house': house,
-        'clan': clan,
-        'student_id': student_id,
-        'student_key': student_key,
-        'category': category,
-        'timestamp': datetime.now().isoformat(),
-        'recorded_by': actor_username,
-        'is_manual_entry': is_manual_entry
-    }
+    record = _student_scan_entry(profile, category, actor_username)
 
+    def duplicate_race_response():
+        # A concurrent scanner won the (session_id, dedupe_key) race.
+        db_session.rollback()
+        discard_session_dedupe_index(session_id)
+        winner_category = get_session_dedupe_index(session_id).lookup(**dedupe_lookup)
+        return jsonify({
+            'error': 'duplicate',
+            'message': f'Student already recorded as {(winner_category or "unknown").upper()} in this session'
+        }), 409
+
+    # Save to database: resolve or create the student row, then write the scan
+    db_student_id = None
+    try:
+        if student_id:
+            db_student_id, _ = ensure_student_row(
+                school_id,
+                student_id,
+                preferred_name=profile['preferred_name'],
+                last_name=profile['last_name'],
+                grade=profile['grade'],
+                advisor=profile['advisor'],
+                house=profile['house'],
+                clan=profile['clan'],
+                existing=student_obj,
+            )
+        outcome = record_scan(
+            school_id=school_id,
+            session_id=session_id,
+            student_id=db_student_id,
+            category=category,
+            grade=profile['grade'],
+            house=profile['house'],
+            recorded_by=actor_id,
+            is_manual_entry=profile['is_manual_entry'],
+            dedupe_key=dedupe_key,
+            preferred_name=profile['preferred_name'],
+            last_name=profile['last_name']
+        )
+        db_session.commit()
+    except IntegrityError:
+        return duplicate_race_response()
+
+    dedupe_index.add(category, **dedupe_lookup)
+    note_recorded_scan(session_info, outcome['record_id'])
     session_info[f'{category}_records'].append(record)
     session_info['scan_history'].append(record)
     save_session_data()
 
-    # Save to database
-    # Look up or create student in database
-    db_student = None
-    lookup_refresh_needed = False
-    if student_id:
-        db_student = (
-            db_session.query(Student)
-            .filter_by(student_identifier=student_id, school_id=school_id)
-            .first()
+    return jsonify({
+        'status': 'success',
+        'preferred_name': record['preferred_name'],
+        'first_name': record['first_name'],
+        'last_name': record['last_name'],
+        'grade': record['grade'],
+        'advisor': record['advisor'],
+        'house': record['house'],
+        'clan': record['clan'],
+        'student_id': record['student_id'],
+        'student_key': record['student_key'],
+        'category': category,
+        'is_manual_entry': record['is_manual_entry'],
+        'recorded_by': actor_username
+    }), 200
+
+
+def _parse_client_timestamp(value):
+    """Parse a scanner-supplied ISO timestamp as UTC, clamped to the present.
+
+    Returns ``None`` when there is no usable timestamp. The result is only
+    stored as ``client_recorded_at``; ``recorded_at`` is always server time so
+    history cursors and hydration marks never see backdated rows.
+    """
+    parsed = _parse_iso_timestamp(str(value)) if value else None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return min(parsed, _now_utc())
+
+
+def _plan_batch_scans(items, session_id, school_id, session_info, actor_username):
+    """Resolve and dedupe a batch of scans without writing anything.
+
+    Returns ``(results, writes)``: one result dict per input item, in order,
+    and the scans to write, each pointing back at its result.
+    """
+    school_lookup = get_student_lookup_for_school(school_id)
+    dedupe_index = get_session_dedupe_index(session_id)
+    pending = SessionDedupeIndex()
+
+    resolver = get_student_resolver(school_id)
+    parsed = []
+    for item in items:
+        reference = _parse_scan_reference(item if isinstance(item, dict) else {})
+        parsed.append((reference, _scan_candidate_ids(reference), _scan_candidate_names(reference)))
+
+    results = []
+    writes = []
+    dirty_count = session_info.get('dirty_count', 0)
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        reference, normalized_ids, candidate_names = parsed[index]
+        category = str(item.get('category') or '').strip().lower()
+        result = {'index': index, 'category': category}
+        results.append(result)
+
+        if category not in RECORD_CATEGORIES:
+            result.update({'status': 'error', 'error': 'Invalid category'})
+            continue
+
+        client_recorded_at = _parse_client_timestamp(item.get('client_timestamp'))
+        timestamp = (client_recorded_at or _now_utc()).isoformat()
+
+        if category == 'dirty':
+            dirty_count += 1
+            result.update({'status': 'success', 'dirty_count': dirty_count})
+            writes.append({
+                'result': result,
+                'entry': {
+                    'category': 'dirty',
+                    'timestamp': timestamp,
+                    'recorded_by': actor_username,
+                    'display_name': f"Dirty Plate #{dirty_count}"
+                },
+                'scan': {
+                    'category': 'dirty',
+                    'dedupe_key': f"dirty_{dirty_count}_{timestamp}",
+                    'client_recorded_at': client_recorded_at,
+                },
+            })
+            continue
+
+        if category == 'faculty':
+            faculty_name = _split_faculty_name(reference['input_value'])
+            if faculty_name is None:
+                result.update({'status': 'error', 'error': 'Faculty name is required'})
+                continue
+            preferred_name, last_name = faculty_name
+            dedupe_key = f"faculty_{preferred_name.lower()}_{last_name.lower()}"
+            if dedupe_index.lookup(dedupe_key=dedupe_key) or pending.lookup(dedupe_key=dedupe_key):
+                result.update({
+                    'status': 'duplicate',
+                    'message': 'Faculty member already recorded in this session'
+                })
+                continue
+            pending.add('faculty', dedupe_key=dedupe_key)
+            result.update({'status': 'success', 'preferred_name': preferred_name, 'last_name': last_name})
+            writes.append({
+                'result': result,
+                'entry': _faculty_scan_entry(preferred_name, last_name, actor_username, timestamp),
+                'dedupe_lookup': {'dedupe_key': dedupe_key},
+                'scan': {
+                    'category': 'faculty',
+                    'grade': '',
+                    'house': '',
+                    'is_manual_entry': True,
+                    'dedupe_key': dedupe_key,
+                    'preferred_name': preferred_name,
+                    'last_name': last_name,
+                    'client_recorded_at': client_recorded_at,
+                },
+            })
+            continue
+
+        if not _scan_has_reference(reference):
+            result.update({'status': 'error', 'error': 'Student ID or Name is required'})
+            continue
+
+        cleaned_input, candidate_preferred, candidate_last = candidate_names
+        student_obj = resolver.find_by_identifier(normalized_ids)
+        if not student_obj and candidate_preferred and candidate_last:
+            student_obj = resolver.find_by_name(candidate_preferred, candidate_last)
+
+        profile = _build_scan_profile(
+            reference,
+            student_obj,
+            school_lookup,
+            normalized_ids,
+            cleaned_input,
+            candidate_preferred,
+            candidate_last,
         )
-        if not db_student:
-            db_student = Student(
-                school_id=school_id,
-                student_identifier=student_id,
-                preferred_name=preferred_name,
-                last_name=last_name,
-                grade=grade,
-                advisor=advisor,
-                house=house,
-                clan=clan
+        dedupe_lookup = _scan_dedupe_lookup(profile)
+        existing_category = dedupe_index.lookup(**dedupe_lookup) or pending.lookup(**dedupe_lookup)
+        if existing_category:
+            result.update({
+                'status': 'duplicate',
+                'message': f'Student already recorded as {existing_category.upper()} in this session'
+            })
+            continue
+
+        pending.add(category, **dedupe_lookup)
+        result.update({
+            'status': 'success',
+            'preferred_name': profile['preferred_name'],
+            'last_name': profile['last_name'],
+            'student_id': profile['student_id'],
+            'student_key': profile['student_key'],
+            'is_manual_entry': profile['is_manual_entry'],
+        })
+        writes.append({
+            'result': result,
+            'entry': _student_scan_entry(profile, category, actor_username, timestamp),
+            'dedupe_lookup': dedupe_lookup,
+            'profile': profile,
+            'student_obj': student_obj,
+            'scan': {
+                'category': category,
+                'grade': profile['grade'],
+                'house': profile['house'],
+                'is_manual_entry': profile['is_manual_entry'],
+                'dedupe_key': profile['dedupe_key'],
+                'preferred_name': profile['preferred_name'],
+                'last_name': profile['last_name'],
+                'client_recorded_at': client_recorded_at,
+            },
+        })
+
+    return results, writes
+
+
+def _write_batch_scans(writes, session_id, school_id, actor_id):
+    """Write planned scans in order, bumping the session counters once."""
+    counts = {}
+    for write in writes:
+        profile = write.get('profile')
+        db_student_id = None
+        if profile and profile['student_id']:
+            db_student_id, _ = ensure_student_row(
+                school_id,
+                profile['student_id'],
+                preferred_name=profile['preferred_name'],
+                last_name=profile['last_name'],
+                grade=profile['grade'],
+                advisor=profile['advisor'],
+                house=profile['house'],
+                clan=profile['clan'],
+                existing=write['student_obj'],
             )
-            db_session.add(db_student)
-            db_session.flush()  # Get the ID
-            lookup_refresh_needed = True
-    
-    # Create dedupe key from student info
-    dedupe_key = student_key or f"{preferred_name.lower()}_{last_name.lower()}_{grade}_{house}"
-    
-    db_record = SessionRecord(
-        school_id=school_id,
-        session_id=session_id,
-        student_id=db_student.id if db_student else None,
-        category=category,
-        grade=grade,
-        house=house,
-        recorded_by=actor_id,
-        is_manual_entry=1 if is_manual_entry else 0,
-        dedupe_key=dedupe_key,
-        preferred_name=preferred_name,
-        last_name=last_name
-    )
-    db_session.add(db_record)
-    db_session.flush()  # Flush to get db_record.id
-    
-    # Update session counts
-    db_sess = db_session.query(SessionModel).filter_by(id=session_id, school_id=school_id).first()
-    if db_sess:
-        if category == 'clean':
-            db_sess.clean_number = (db_sess.clean_number or 0) + 1
-            db_sess.total_clean = (db_sess.total_clean or 0) + 1
-            db_sess.total_records = (db_sess.total_records or 0) + 1
-        elif category == 'red':
-            db_sess.red_number = (db_sess.red_number or 0) + 1
-            db_sess.total_dirty = (db_sess.total_dirty or 0) + 1
-            db_sess.total_records = (db_sess.total_records or 0) + 1
-        db_sess.updated_at = datetime.now()
-    
-    # Handle ticket events and draft_pool updates
-    if db_student and db_student.id:
-        from .draw_db import update_tickets_for_record
-        update_tickets_for_record(
+        outcome = record_scan(
+            school_id=school_id,
             session_id=session_id,
-            student_id=db_student.id,
-            category=category,
-            session_record_id=db_record.id,
-            user_id=actor_id
+            student_id=db_student_id,
+            recorded_by=actor_id,
+            update_counters=False,
+            **write['scan'],
         )
-    
-    db_session.commit()
-    if lookup_refresh_needed:
-        update_student_lookup()
+        write['record_id'] = outcome['record_id']
+        if outcome['dirty_ordinal']:
+            write['entry']['display_name'] = f"Dirty Plate #{outcome['dirty_ordinal']}"
+        if outcome['ticket_balance'] is not None:
+            write['result']['tickets'] = outcome['ticket_balance']
+        category = write['scan']['category']
+        counts[category] = counts.get(category, 0) + 1
+    increment_session_counters(session_id, counts)
+
+
+@recorder_bp.route('/record/batch', methods=['POST'])
+def record_batch():
+    """Record a buffered list of scans in one transaction."""
+    if not require_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+
+    forbidden = _forbid_interschool_accounts()
+    if forbidden:
+        return forbidden
+
+    actor_id, actor_username, school_id = _get_request_actor()
+
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'No active session'}), 400
+
+    session_info = get_session_entry(session_id)
+    if session_info is None:
+        return jsonify({'error': 'Session not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(items) > MAX_BATCH_SCANS:
+        return jsonify({'error': f'At most {MAX_BATCH_SCANS} scans can be recorded per batch'}), 400
+
+    # A concurrent scanner can win a (session_id, dedupe_key) race between
+    # planning and commit; re-plan once against a fresh index so the loser
+    # is reported as a duplicate instead of failing the whole batch.
+    for attempt in range(2):
+        results, writes = _plan_batch_scans(items, session_id, school_id, session_info, actor_username)
+        try:
+            _write_batch_scans(writes, session_id, school_id, actor_id)
+            db_session.commit()
+            break
+        except IntegrityError:
+            db_session.rollback()
+            discard_session_dedupe_index(session_id)
+            if attempt:
+                return jsonify({'error': 'Batch conflicted with concurrent scans; retry'}), 409
+
+    dedupe_index = get_session_dedupe_index(session_id)
+    for write in writes:
+        category = write['scan']['category']
+        entry = write['entry']
+        note_recorded_scan(session_info, write['record_id'])
+        if category == 'dirty':
+            session_info['dirty_count'] = write['result']['dirty_count']
+        else:
+            dedupe_index.add(category, **write['dedupe_lookup'])
+            list_name = 'faculty_clean_records' if category == 'faculty' else f'{category}_records'
+            session_info[list_name].append(entry)
+        session_info['scan_history'].append(entry)
+    if writes:
+        save_session_data()
+
+    statuses = [result['status'] for result in results]
+    summary = {
+        'recorded': statuses.count('success'),
+        'duplicates': statuses.count('duplicate'),
+        'errors': statuses.count('error'),
+    }
 
     return jsonify({
         'status': 'success',
-        'preferred_name': preferred_name,
-        'first_name': preferred_name,
-        'last_name': last_name,
-        'grade': grade,
-        'advisor': advisor,
-        'house': house,
-        'clan': clan,
-        'student_id': student_id,
-        'student_key': student_key,
-        'category': category,
-        'is_manual_entry': is_manual_entry,
-        'recorded_by': actor_username
+        'results': results,
+        'summary': summary,
     }), 200
 
 
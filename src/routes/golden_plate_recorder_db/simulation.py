@@ -0,0 +1,164 @@
+"""Monte Carlo fairness reports for ticket draws.
+
+:func:`simulate_draws` runs many batch draws against one eligibility snapshot
+and compares how often each student (and each house, grade and clan) won
+with the share of tickets they hold. Batches run on a small shared thread
+pool; NumPy releases the GIL while generating and bucketing draws, so a large
+simulation does not starve the request threads that are serving scans.
+
+The request waits for the result: ``MAX_SIMULATIONS`` caps a report at a few
+``CHUNK_SIZE`` batches (well under a second with NumPy), and one overall
+deadline bounds the wait. Batches still queued when it passes are cancelled;
+a batch already running is at most one chunk of work.
+"""
+import math
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from .sampler import WeightedSampler, secure_random
+
+try:
+    import numpy as _np  # type: ignore
+except Exception:  # pragma: no cover - dependency missing
+    _np = None  # type: ignore
+
+DEFAULT_SIMULATIONS = 10000
+MAX_SIMULATIONS = 1000000
+CHUNK_SIZE = 250000
+GROUP_FIELDS = ('house', 'grade', 'clan')
+# Two-sided 95% normal quantile for the Wilson interval
+Z_95 = 1.959963984540054
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='draw-simulation')
+        return _executor
+
+
+def wilson_interval(wins: int, trials: int, z: float = Z_95) -> Dict[str, float]:
+    """Return the Wilson score interval for a win rate as ``{'low', 'high'}``."""
+    if trials <= 0:
+        return {'low': 0.0, 'high': 0.0}
+    rate = wins / trials
+    denominator = 1 + z * z / trials
+    centre = (rate + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials)) / denominator
+    return {'low': max(0.0, centre - margin), 'high': min(1.0, centre + margin)}
+
+
+def _chunk_rngs(chunks: int, seed: Optional[int]):
+    if _np is not None:
+        entropy = seed if seed is not None else secure_random.getrandbits(128)
+        return [_np.random.default_rng(child) for child in _np.random.SeedSequence(entropy).spawn(chunks)]
+    base = seed if seed is not None else secure_random.getrandbits(64)
+    return [random.Random(base + index) for index in range(chunks)]
+
+
+def _rate_entry(wins: int, tickets: float, total_tickets: float, simulations: int) -> Dict:
+    interval = wilson_interval(wins, simulations)
+    return {
+        'tickets': tickets,
+        'wins': wins,
+        'theoretical_rate': tickets / total_tickets if total_tickets else 0.0,
+        'empirical_rate': wins / simulations if simulations else 0.0,
+        'ci_low': interval['low'],
+        'ci_high': interval['high'],
+    }
+
+
+def simulate_draws(
+    sampler: WeightedSampler,
+    simulations: int,
+    *,
+    profile: Callable[[Any], Dict],
+    seed: Optional[int] = None,
+    timeout: Optional[float] = 30.0,
+) -> Dict:
+    """Draw ``simulations`` winners and report empirical vs theoretical win rates.
+
+    ``sampler`` is usually the cached ``EligibilitySnapshot.sampler()``;
+    ``profile(item)`` turns one of its items into a plain dict
+    (``student_id``, ``display_name``, ``house``, ``grade``, ``clan``...).
+    Raises ``concurrent.futures.TimeoutError`` if every batch has not
+    finished within ``timeout`` seconds in total.
+    """
+    if not len(sampler) or simulations <= 0:
+        return {
+            'simulations': 0,
+            'pool_size': len(sampler),
+            'total_tickets': sampler.total,
+            'confidence_level': 0.95,
+            'students': [],
+            'groups': {},
+        }
+
+    sizes = [CHUNK_SIZE] * (simulations // CHUNK_SIZE)
+    if simulations % CHUNK_SIZE:
+        sizes.append(simulations % CHUNK_SIZE)
+    executor = _get_executor()
+    futures = [
+        executor.submit(sampler.draw_counts, size, rng)
+        for size, rng in zip(sizes, _chunk_rngs(len(sizes), seed))
+    ]
+    _, pending = wait(futures, timeout=timeout)
+    if pending:
+        for future in pending:
+            future.cancel()
+        raise FutureTimeoutError()
+    counts = [0] * len(sampler)
+    for future in futures:
+        for index, wins in enumerate(future.result()):
+            counts[index] += wins
+
+    students: List[Dict] = []
+    groups: Dict[str, Dict[str, Dict]] = {field: {} for field in GROUP_FIELDS}
+    for item, tickets, wins in zip(sampler.items, sampler.weights, counts):
+        row = profile(item)
+        students.append({**row, **_rate_entry(wins, tickets, sampler.total, simulations)})
+        for field in GROUP_FIELDS:
+            value = (row.get(field) or '').strip() or 'Unknown'
+            bucket = groups[field].setdefault(value, {'candidates': 0, 'tickets': 0.0, 'wins': 0})
+            bucket['candidates'] += 1
+            bucket['tickets'] += tickets
+            bucket['wins'] += wins
+
+    group_report = {}
+    for field, buckets in groups.items():
+        rows = [
+            {
+                field: value,
+                'candidates': bucket['candidates'],
+                **_rate_entry(bucket['wins'], bucket['tickets'], sampler.total, simulations),
+            }
+            for value, bucket in buckets.items()
+        ]
+        rows.sort(key=lambda row: (-row['theoretical_rate'], row[field]))
+        group_report[field] = rows
+
+    students.sort(key=lambda row: (-row['theoretical_rate'], row.get('display_name') or ''))
+    return {
+        'simulations': simulations,
+        'pool_size': len(sampler),
+        'total_tickets': sampler.total,
+        'confidence_level': 0.95,
+        'students': students,
+        'groups': group_report,
+    }
+
+
+__all__ = [
+    'DEFAULT_SIMULATIONS',
+    'MAX_SIMULATIONS',
+    'simulate_draws',
+    'wilson_interval',
+]
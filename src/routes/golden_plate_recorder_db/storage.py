@@ -3,6 +3,8 @@ import os
 import uuid
 from datetime import datetime
 
+from sqlalchemy import and_, func, or_
+
 from .db import (
     DEFAULT_SCHOOL_ID,
     Session as SessionModel,
@@ -13,6 +15,10 @@ from .db import (
     User,
     db_session,
 )
+from .dedupe import reset_dedupe_indexes
+from .eligibility_cache import reset_eligibility_cache
+from .session_cache import SessionCache
+from .student_cache import get_student_lookup_for_school, reset_student_caches
 from .users import (
     DEFAULT_SUPERADMIN,
     ensure_default_superadmin,
@@ -23,11 +29,8 @@ from .users import (
 )
 from .utils import extract_student_id_from_key, make_student_key, normalize_name, split_student_key
 
-# Student lookup cache keyed by school for fast eligibility checks
-student_lookup = {}
-
-# Global in-memory state
-session_data = {}
+# Global in-memory state; session_data is bounded and refills from the database
+session_data = SessionCache.from_env()
 delete_requests = []
 global_csv_data = {}
 global_teacher_data = {}
@@ -122,7 +125,6 @@ def sync_students_table_from_csv_rows(rows, *, school_id=None):
     if result['processed']:
         try:
             db_session.commit()
-            update_student_lookup()
         except Exception:
             db_session.rollback()
             raise
@@ -194,44 +196,6 @@ def sync_teacher_table_from_list(teachers, *, school_id=None):
     return result
 
 
-def update_student_lookup():
-    """Hydrate the student lookup cache from the students table."""
-    global student_lookup
-    student_lookup = {}
-
-    try:
-        students = db_session.query(Student).all()
-    except Exception as exc:
-        db_session.rollback()
-        print(f"Error building student lookup: {exc}")
-        return
-
-    for student in students:
-        preferred = normalize_name(student.preferred_name)
-        last = normalize_name(student.last_name)
-        student_id = normalize_name(student.student_identifier)
-        key = make_student_key(preferred, last, student_id)
-        if not key:
-            continue
-        school_bucket = student_lookup.setdefault(student.school_id or DEFAULT_SCHOOL_ID, {})
-        school_bucket[key] = {
-            'preferred_name': preferred,
-            'last_name': last,
-            'grade': normalize_name(student.grade),
-            'advisor': normalize_name(student.advisor),
-            'house': normalize_name(student.house),
-            'clan': normalize_name(student.clan),
-            'student_id': student_id,
-            'key': key
-        }
-
-
-def get_student_lookup_for_school(school_id):
-    if not school_id:
-        return {}
-    return student_lookup.get(school_id, {})
-
-
 def save_all_data():
     """Save all data - now a no-op as data persists in database tables."""
     print("All data is persisted in database tables")
@@ -341,7 +305,6 @@ def save_delete_requests():
 
 def save_global_csv_data():
     """Save global CSV data - now handled by students table."""
-    update_student_lookup()
     return True
 
 
@@ -453,6 +416,226 @@ def _extract_faculty_names(dedupe_key):
     return normalize_name(preferred).title(), normalize_name(last).title()
 
 
+# Key on a cached session holding the last hydrated (recorded_at, id) and
+# the ids of scans this process appended after that point
+HYDRATION_MARK_KEY = '_hydration_mark'
+
+
+def _load_students_for_records(session_id, records):
+    student_ids = {record.student_id for record in records if record.student_id}
+    if not student_ids:
+        return {}
+    try:
+        students = db_session.query(Student).filter(Student.id.in_(student_ids)).all()
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error loading students for session {session_id}: {exc}")
+        return {}
+    return {student.id: student for student in students}
+
+
+def _session_record_entry(record, student_obj, dirty_number):
+    """Build the cached entry for one session record."""
+    timestamp = _isoformat_timestamp(record.client_recorded_at or record.recorded_at)
+    base_entry = {
+        'timestamp': timestamp,
+        'recorded_by': record.recorded_by,
+        'category': record.category,
+        'is_manual_entry': bool(record.is_manual_entry),
+    }
+
+    if record.category == 'dirty':
+        entry = base_entry.copy()
+        entry['display_name'] = f"Dirty Plate #{record.dirty_ordinal or dirty_number}"
+        return entry
+
+    if record.category == 'faculty':
+        preferred_name, last_name = _extract_faculty_names(record.dedupe_key)
+        return {
+            **base_entry,
+            'preferred_name': preferred_name,
+            'first_name': preferred_name,
+            'last_name': last_name,
+            'grade': '',
+            'advisor': '',
+            'house': '',
+            'clan': '',
+            'student_id': '',
+            'student_key': None,
+        }
+
+    preferred_name = normalize_name(student_obj.preferred_name) if student_obj else ''
+    last_name = normalize_name(student_obj.last_name) if student_obj else ''
+    student_identifier = normalize_name(student_obj.student_identifier) if student_obj else ''
+    advisor = normalize_name(student_obj.advisor) if student_obj else ''
+    grade = normalize_name(record.grade or (student_obj.grade if student_obj else ''))
+    house = normalize_name(record.house or (student_obj.house if student_obj else ''))
+    clan = normalize_name(student_obj.clan) if student_obj else ''
+
+    if (not preferred_name or not last_name) and record.dedupe_key:
+        key_preferred, key_last = split_student_key(record.dedupe_key)
+        if not preferred_name:
+            preferred_name = normalize_name(key_preferred)
+        if not last_name:
+            last_name = normalize_name(key_last)
+
+    student_key = make_student_key(preferred_name, last_name, student_identifier)
+    return {
+        **base_entry,
+        'preferred_name': preferred_name,
+        'first_name': preferred_name,
+        'last_name': last_name,
+        'grade': grade,
+        'advisor': advisor,
+        'house': house,
+        'clan': clan,
+        'student_id': student_identifier,
+        'student_key': student_key.lower() if student_key else None,
+    }
+
+
+def load_ledger_records(session_ids):
+    """Return ``{session_id: {'clean_records': [...], 'red_records': [...]}}`` from the database.
+
+    Only the categories the ticket rules read are loaded, with one query for
+    the records and one for their students.
+    """
+    loaded = {session_id: {'clean_records': [], 'red_records': []} for session_id in session_ids}
+    if not loaded:
+        return loaded
+    records = (
+        db_session.query(SessionRecord)
+        .filter(SessionRecord.session_id.in_(list(loaded)), SessionRecord.category.in_(('clean', 'red')))
+        .order_by(SessionRecord.recorded_at.asc(), SessionRecord.id.asc())
+        .all()
+    )
+    students_map = _load_students_for_records(None, records)
+    for record in records:
+        entry = _session_record_entry(record, students_map.get(record.student_id), 0)
+        loaded[record.session_id][f'{record.category}_records'].append(entry)
+    return loaded
+
+
+def _set_hydration_mark(session_info, records, count):
+    last = records[-1] if records else None
+    session_info[HYDRATION_MARK_KEY] = {
+        'recorded_at': last.recorded_at if last else None,
+        'id': last.id if last else None,
+        'count': count,
+        'local_ids': set(),
+    }
+
+
+def _hydrate_records_fully(session_id, session_info):
+    try:
+        records = (
+            db_session.query(SessionRecord)
+            .filter(SessionRecord.session_id == session_id)
+            .order_by(SessionRecord.recorded_at.asc(), SessionRecord.id.asc())
+            .all()
+        )
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error fetching session records for {session_id}: {exc}")
+        records = []
+
+    students_map = _load_students_for_records(session_id, records)
+
+    clean_records = []
+    red_records = []
+    faculty_records = []
+    scan_history = []
+    dirty_count = 0
+
+    for record in records:
+        if record.category == 'dirty':
+            dirty_count += 1
+        entry = _session_record_entry(record, students_map.get(record.student_id), dirty_count)
+        if record.category == 'faculty':
+            faculty_records.append(entry)
+        elif record.category == 'clean':
+            clean_records.append(entry)
+        elif record.category == 'red':
+            red_records.append(entry)
+        scan_history.append(entry.copy() if record.category != 'dirty' else entry)
+
+    # Newest first by (recorded_at, id), the key incremental hydration and the history cursor use
+    scan_history.reverse()
+
+    session_info['clean_records'] = clean_records
+    session_info['red_records'] = red_records
+    session_info['faculty_clean_records'] = faculty_records
+    session_info['scan_history'] = scan_history
+    session_info['dirty_count'] = dirty_count
+    session_info['_hydrated_from_db'] = True
+    _set_hydration_mark(session_info, records, len(records))
+
+
+def _hydrate_records_incrementally(session_id, session_info):
+    """Append records newer than the session's hydration mark.
+
+    Returns ``False`` when a full rebuild is needed instead: the session was
+    never hydrated, or the record count shows rows were removed or landed
+    behind the mark.
+    """
+    mark = session_info.get(HYDRATION_MARK_KEY)
+    if not isinstance(mark, dict) or not session_info.get('_hydrated_from_db'):
+        return False
+
+    try:
+        total = (
+            db_session.query(func.count(SessionRecord.id))
+            .filter(SessionRecord.session_id == session_id)
+            .scalar()
+        ) or 0
+        query = db_session.query(SessionRecord).filter(SessionRecord.session_id == session_id)
+        if mark['recorded_at'] is not None:
+            query = query.filter(or_(
+                SessionRecord.recorded_at > mark['recorded_at'],
+                and_(SessionRecord.recorded_at == mark['recorded_at'], SessionRecord.id > mark['id']),
+            ))
+        records = query.order_by(SessionRecord.recorded_at.asc(), SessionRecord.id.asc()).all()
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error fetching new session records for {session_id}: {exc}")
+        return False
+
+    if mark['count'] + len(records) != total:
+        return False
+
+    local_ids = mark['local_ids']
+    fresh = [record for record in records if record.id not in local_ids]
+    students_map = _load_students_for_records(session_id, fresh)
+
+    new_history = []
+    dirty_count = session_info.get('dirty_count', 0)
+    for record in fresh:
+        if record.category == 'dirty':
+            dirty_count += 1
+        entry = _session_record_entry(record, students_map.get(record.student_id), dirty_count)
+        if record.category == 'faculty':
+            session_info['faculty_clean_records'].append(entry)
+        elif record.category in ('clean', 'red'):
+            session_info[f'{record.category}_records'].append(entry)
+        new_history.append(entry.copy() if record.category != 'dirty' else entry)
+
+    # Newest first, matching the order of a full rebuild
+    new_history.reverse()
+    session_info['scan_history'][0:0] = new_history
+    session_info['dirty_count'] = dirty_count
+
+    if records:
+        _set_hydration_mark(session_info, records, total)
+    return True
+
+
+def note_recorded_scan(session_info, record_id):
+    """Tell the hydration mark about a scan this process already cached."""
+    mark = session_info.get(HYDRATION_MARK_KEY) if isinstance(session_info, dict) else None
+    if isinstance(mark, dict):
+        mark['local_ids'].add(record_id)
+
+
 def hydrate_session_from_db(session_id, *, persist=True, session_model=None):
     """Rebuild session metadata from relational tables when legacy JSON is missing."""
     if not session_id:
@@ -475,6 +658,7 @@ def hydrate_session_from_db(session_id, *, persist=True, session_model=None):
         return None
 
     session_info.setdefault('session_name', db_sess.session_name)
+    session_info.setdefault('school_id', db_sess.school_id)
     session_info.setdefault('owner', db_sess.created_by)
     session_info.setdefault('created_at', _isoformat_timestamp(db_sess.created_at) or datetime.now().isoformat())
     session_info.setdefault('is_public', bool(db_sess.is_public))
@@ -501,112 +685,8 @@ def hydrate_session_from_db(session_id, *, persist=True, session_model=None):
     else:
         session_info.setdefault('faculty_pick', None)
 
-    try:
-        records = (
-            db_session.query(SessionRecord)
-            .filter(SessionRecord.session_id == session_id)
-            .order_by(SessionRecord.recorded_at.asc(), SessionRecord.id.asc())
-            .all()
-        )
-    except Exception as exc:
-        db_session.rollback()
-        print(f"Error fetching session records for {session_id}: {exc}")
-        records = []
-
-    student_ids = {record.student_id for record in records if record.student_id}
-    students_map = {}
-    if student_ids:
-        try:
-            students = db_session.query(Student).filter(Student.id.in_(student_ids)).all()
-            students_map = {student.id: student for student in students}
-        except Exception as exc:
-            db_session.rollback()
-            print(f"Error loading students for session {session_id}: {exc}")
-
-    clean_records = []
-    red_records = []
-    faculty_records = []
-    scan_history = []
-    dirty_count = 0
-
-    for record in records:
-        timestamp = _isoformat_timestamp(record.recorded_at)
-        base_entry = {
-            'timestamp': timestamp,
-            'recorded_by': record.recorded_by,
-            'category': record.category,
-            'is_manual_entry': bool(record.is_manual_entry),
-        }
-
-        if record.category == 'dirty':
-            dirty_count += 1
-            entry = base_entry.copy()
-            entry['display_name'] = f"Dirty Plate #{dirty_count}"
-            scan_history.append(entry)
-            continue
-
-        if record.category == 'faculty':
-            preferred_name, last_name = _extract_faculty_names(record.dedupe_key)
-            faculty_entry = {
-                **base_entry,
-                'preferred_name': preferred_name,
-                'first_name': preferred_name,
-                'last_name': last_name,
-                'grade': '',
-                'advisor': '',
-                'house': '',
-                'clan': '',
-                'student_id': '',
-                'student_key': None,
-            }
-            faculty_records.append(faculty_entry)
-            scan_history.append(faculty_entry.copy())
-            continue
-
-        student_obj = students_map.get(record.student_id)
-        preferred_name = normalize_name(student_obj.preferred_name) if student_obj else ''
-        last_name = normalize_name(student_obj.last_name) if student_obj else ''
-        student_identifier = normalize_name(student_obj.student_identifier) if student_obj else ''
-        advisor = normalize_name(student_obj.advisor) if student_obj else ''
-        grade = normalize_name(record.grade or (student_obj.grade if student_obj else ''))
-        house = normalize_name(record.house or (student_obj.house if student_obj else ''))
-        clan = normalize_name(student_obj.clan) if student_obj else ''
-
-        if (not preferred_name or not last_name) and record.dedupe_key:
-            key_preferred, key_last = split_student_key(record.dedupe_key)
-            if not preferred_name:
-                preferred_name = normalize_name(key_preferred)
-            if not last_name:
-                last_name = normalize_name(key_last)
-
-        student_key = make_student_key(preferred_name, last_name, student_identifier)
-        entry = {
-            **base_entry,
-            'preferred_name': preferred_name,
-            'first_name': preferred_name,
-            'last_name': last_name,
-            'grade': grade,
-            'advisor': advisor,
-            'house': house,
-            'clan': clan,
-            'student_id': student_identifier,
-            'student_key': student_key.lower() if student_key else None,
-        }
-
-        if record.category == 'clean':
-            clean_records.append(entry)
-        else:
-            red_records.append(entry)
-        scan_history.append(entry.copy())
-
-    scan_history.sort(key=lambda item: item.get('timestamp') or '', reverse=True)
-
-    session_info['clean_records'] = clean_records
-    session_info['red_records'] = red_records
-    session_info['faculty_clean_records'] = faculty_records
-    session_info['scan_history'] = scan_history
-    session_info['dirty_count'] = dirty_count
-    session_info['_hydrated_from_db'] = True
+    if not _hydrate_records_incrementally(session_id, session_info):
+        _hydrate_records_fully(session_id, session_info)
 
     ensure_session_structure(session_info)
 
@@ -663,16 +743,19 @@ def normalize_loaded_sessions():
 
 def reset_storage_for_testing():
     """Reset all persistent stores to defaults to keep pytest runs isolated."""
-    global session_data, delete_requests, global_csv_data, global_teacher_data, student_lookup
+    global delete_requests, global_csv_data, global_teacher_data
 
-    session_data = {}
+    # Cleared in place: other modules hold a reference to this object
+    session_data.clear()
+    session_data.reset_stats()
     delete_requests = []
     global_csv_data = {}
     global_teacher_data = {}
-    student_lookup = {}
+    reset_dedupe_indexes()
+    reset_student_caches()
+    reset_eligibility_cache()
 
     reset_user_store()
-    update_student_lookup()
     try:
         db_session.query(SessionDeleteRequest).delete()
         db_session.commit()
@@ -684,14 +767,10 @@ def reset_storage_for_testing():
 
 print("Initializing persistent storage (database-backed)...")
 # Initialize empty in-memory caches
-session_data = {}
 delete_requests = []
 global_csv_data = {}
 global_teacher_data = {}
 
-# Build student lookup from database
-update_student_lookup()
-
 # Load delete requests cache
 _refresh_delete_requests_cache()
 
@@ -715,7 +794,9 @@ __all__ = [
     'global_csv_data',
     'global_teacher_data',
     'hydrate_session_from_db',
+    'load_ledger_records',
     'normalize_loaded_sessions',
+    'note_recorded_scan',
     'reset_storage_for_testing',
     'save_all_data',
     'save_delete_requests',
@@ -723,8 +804,6 @@ __all__ = [
     'save_global_teacher_data',
     'save_session_data',
     'session_data',
-    'student_lookup',
     'sync_students_table_from_csv_rows',
     'sync_teacher_table_from_list',
-    'update_student_lookup',
 ]
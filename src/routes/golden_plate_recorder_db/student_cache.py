@@ -0,0 +1,371 @@
+"""Per-school student lookup cache kept current by session events.
+
+Each school's roster is loaded from ``students`` the first time it is needed
+and stamped with the school's row in ``student_versions``. Every commit that
+changes a :class:`Student` row (or a Core insert registered with
+:func:`stage_student_change`) bumps that row in the same transaction. This
+process applies its own changes in place, so a new manual entry or a roster
+sync never reloads every school; a cache whose stamp no longer matches the
+database, because another worker committed, is reloaded on next use.
+
+The cache doubles as the school's student resolver: hash indexes on the
+identifier and on the lowercased ``(preferred, last)`` pair answer scan
+matching without a table scan, and a sorted prefix index serves typeahead.
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, select
+
+from .db import Student, StudentVersion, db_session, dialect_insert
+from .utils import make_student_key, normalize_name
+
+# Keys used to park uncommitted changes and the versions they bumped on ``Session.info``
+_PENDING_CHANGES_KEY = 'student_cache_changes'
+_BUMPED_VERSIONS_KEY = 'student_cache_versions'
+
+
+class StudentMatch(NamedTuple):
+    """Read-only copy of a ``students`` row with normalized text fields."""
+
+    id: str
+    student_identifier: str
+    preferred_name: str
+    last_name: str
+    grade: str
+    advisor: str
+    house: str
+    clan: str
+
+
+# (school_id, students.id, snapshot or None when the row was deleted)
+StudentChange = Tuple[str, str, Optional[StudentMatch]]
+
+
+def snapshot_student(
+    row_id,
+    student_identifier,
+    preferred_name,
+    last_name,
+    grade=None,
+    advisor=None,
+    house=None,
+    clan=None,
+) -> StudentMatch:
+    return StudentMatch(
+        id=row_id,
+        student_identifier=normalize_name(student_identifier),
+        preferred_name=normalize_name(preferred_name),
+        last_name=normalize_name(last_name),
+        grade=normalize_name(grade),
+        advisor=normalize_name(advisor),
+        house=normalize_name(house),
+        clan=normalize_name(clan),
+    )
+
+
+def _snapshot(student: Student) -> StudentMatch:
+    return snapshot_student(
+        student.id,
+        student.student_identifier,
+        student.preferred_name,
+        student.last_name,
+        student.grade,
+        student.advisor,
+        student.house,
+        student.clan,
+    )
+
+
+def _lookup_profile(match: StudentMatch) -> Optional[dict]:
+    key = make_student_key(match.preferred_name, match.last_name, match.student_identifier)
+    if not key:
+        return None
+    return {
+        'preferred_name': match.preferred_name,
+        'last_name': match.last_name,
+        'grade': match.grade,
+        'advisor': match.advisor,
+        'house': match.house,
+        'clan': match.clan,
+        'student_id': match.student_identifier,
+        'key': key
+    }
+
+
+def _name_key(preferred_name, last_name) -> Tuple[str, str]:
+    return normalize_name(preferred_name).lower(), normalize_name(last_name).lower()
+
+
+class SchoolStudentCache:
+    """Student profiles and lookup indexes for one school."""
+
+    def __init__(self, school_id: str):
+        self.school_id = school_id
+        # Student key -> lookup profile (the legacy ``student_lookup`` shape)
+        self.entries: Dict[str, dict] = {}
+        self._rows: Dict[str, StudentMatch] = {}
+        self._keys_by_row: Dict[str, str] = {}
+        self._by_identifier: Dict[str, str] = {}
+        self._by_name: Dict[Tuple[str, str], List[str]] = {}
+        # Sorted (search token, row id) pairs, rebuilt lazily after changes
+        self._prefix_index: Optional[List[Tuple[str, str]]] = None
+        self._prefix_lock = threading.Lock()
+        self._generation = 0
+        # ``student_versions`` value this cache reflects
+        self.version = 0
+
+    def apply(self, row_id: str, match: Optional[StudentMatch]) -> None:
+        old = self._rows.pop(row_id, None)
+        if old is not None:
+            old_key = self._keys_by_row.pop(row_id, None)
+            if old_key is not None:
+                self.entries.pop(old_key, None)
+            if self._by_identifier.get(old.student_identifier) == row_id:
+                del self._by_identifier[old.student_identifier]
+            name_rows = self._by_name.get(_name_key(old.preferred_name, old.last_name))
+            if name_rows and row_id in name_rows:
+                name_rows.remove(row_id)
+                if not name_rows:
+                    del self._by_name[_name_key(old.preferred_name, old.last_name)]
+
+        if match is not None:
+            self._rows[row_id] = match
+            profile = _lookup_profile(match)
+            if profile is not None:
+                self.entries[profile['key']] = profile
+                self._keys_by_row[row_id] = profile['key']
+            if match.student_identifier:
+                self._by_identifier[match.student_identifier] = row_id
+            self._by_name.setdefault(_name_key(match.preferred_name, match.last_name), []).append(row_id)
+
+        self._generation += 1
+        self._prefix_index = None
+
+    def find_by_identifier(self, identifiers: Iterable[str]) -> Optional[StudentMatch]:
+        """Return the first student whose identifier is in ``identifiers``."""
+        for identifier in identifiers:
+            row_id = self._by_identifier.get(normalize_name(identifier))
+            if row_id is not None:
+                return self._rows.get(row_id)
+        return None
+
+    def find_by_name(self, preferred_name, last_name) -> Optional[StudentMatch]:
+        """Return a student by case-insensitive preferred and last name."""
+        row_ids = self._by_name.get(_name_key(preferred_name, last_name))
+        if not row_ids:
+            return None
+        return self._rows.get(row_ids[0])
+
+    def students(self) -> List[StudentMatch]:
+        """Return every student ordered by lowercased preferred then last name."""
+        return sorted(
+            self._rows.values(),
+            key=lambda match: (match.preferred_name.lower(), match.last_name.lower(), match.student_identifier),
+        )
+
+    def _build_prefix_index(self) -> List[Tuple[str, str]]:
+        tokens = []
+        for row_id, match in self._rows.items():
+            preferred = match.preferred_name.lower()
+            last = match.last_name.lower()
+            for token in {f"{preferred} {last}".strip(), last, match.student_identifier.lower()}:
+                if token:
+                    tokens.append((token, row_id))
+        tokens.sort()
+        return tokens
+
+    def search(self, prefix: str, limit: int = 20) -> List[StudentMatch]:
+        """Return students whose full name, last name or identifier starts with ``prefix``."""
+        prefix = normalize_name(prefix).lower()
+        if not prefix or limit <= 0:
+            return []
+        index = self._prefix_index
+        if index is None:
+            with self._prefix_lock:
+                index = self._prefix_index
+                if index is None:
+                    generation = self._generation
+                    index = self._build_prefix_index()
+                    if generation == self._generation:
+                        self._prefix_index = index
+
+        results: List[StudentMatch] = []
+        seen = set()
+        position = bisect.bisect_left(index, (prefix, ''))
+        while position < len(index) and len(results) < limit:
+            token, row_id = index[position]
+            if not token.startswith(prefix):
+                break
+            position += 1
+            match = self._rows.get(row_id)
+            if match is None or row_id in seen:
+                continue
+            seen.add(row_id)
+            results.append(match)
+        return results
+
+    def __len__(self):
+        return len(self._rows)
+
+
+# School id -> SchoolStudentCache, hydrated on first use
+school_student_caches: Dict[str, SchoolStudentCache] = {}
+_lock = threading.RLock()
+
+
+def get_school_student_version(school_id: str) -> int:
+    """Return a counter that changes whenever a school's students change."""
+    versions = StudentVersion.__table__
+    return int(db_session.execute(
+        select(versions.c.version).where(versions.c.school_id == school_id)
+    ).scalar() or 0)
+
+
+def _hydrate_school(school_id: str) -> SchoolStudentCache:
+    cache = SchoolStudentCache(school_id)
+    try:
+        students = db_session.query(Student).filter(Student.school_id == school_id).all()
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error building student lookup for school {school_id}: {exc}")
+        return cache
+
+    for student in students:
+        cache.apply(student.id, _snapshot(student))
+    return cache
+
+
+def get_school_student_cache(school_id: str) -> SchoolStudentCache:
+    """Return a school's cache, reloading it if another process changed its students."""
+    version = get_school_student_version(school_id)
+    cache = school_student_caches.get(school_id)
+    if cache is not None and cache.version == version:
+        return cache
+
+    # A commit landing while we read makes the stamp stale, so the next caller reloads
+    cache = _hydrate_school(school_id)
+    cache.version = version
+    with _lock:
+        existing = school_student_caches.get(school_id)
+        if existing is not None and existing.version >= version:
+            return existing
+        school_student_caches[school_id] = cache
+    return cache
+
+
+def get_student_resolver(school_id: str) -> SchoolStudentCache:
+    """Return the resolver used to match scans and names for a school."""
+    return get_school_student_cache(school_id)
+
+
+def get_student_lookup_for_school(school_id) -> Dict[str, dict]:
+    """Return ``{student_key: profile}`` for a school."""
+    if not school_id:
+        return {}
+    return get_school_student_cache(school_id).entries
+
+
+def invalidate_school_students(school_id: Optional[str] = None) -> None:
+    """Drop one school's cache (or all of them) so it reloads on next use."""
+    with _lock:
+        if school_id is None:
+            school_student_caches.clear()
+            return
+        school_student_caches.pop(school_id, None)
+
+
+def reset_student_caches() -> None:
+    with _lock:
+        school_student_caches.clear()
+
+
+def stage_student_change(session, school_id: str, row_id: str, match: Optional[StudentMatch]) -> None:
+    """Queue a student change made outside the ORM; applied when ``session`` commits."""
+    changes: List[StudentChange] = session.info.setdefault(_PENDING_CHANGES_KEY, [])
+    changes.append((school_id, row_id, match))
+
+
+def _bump_versions(session, school_ids) -> Dict[str, int]:
+    versions = StudentVersion.__table__
+    for school_id in sorted(school_ids):
+        session.execute(
+            dialect_insert(versions)
+            .values(school_id=school_id, version=1)
+            .on_conflict_do_update(
+                index_elements=[versions.c.school_id],
+                set_={'version': versions.c.version + 1},
+            )
+        )
+    rows = session.execute(
+        select(versions.c.school_id, versions.c.version).where(versions.c.school_id.in_(school_ids))
+    )
+    return {school_id: version for school_id, version in rows}
+
+
+def _apply_changes(changes: List[StudentChange], bumped: Dict[str, int]) -> None:
+    with _lock:
+        for school_id, version in bumped.items():
+            cache = school_student_caches.get(school_id)
+            if cache is None:
+                continue
+            if cache.version != version - 1:
+                # Another process changed the school since this cache loaded
+                del school_student_caches[school_id]
+                continue
+            for change_school_id, row_id, match in changes:
+                if change_school_id == school_id:
+                    cache.apply(row_id, match)
+            cache.version = version
+
+
+@event.listens_for(db_session, 'after_flush')
+def _collect_student_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Student):
+            stage_student_change(session, obj.school_id, obj.id, _snapshot(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Student) and session.is_modified(obj, include_collections=False):
+            stage_student_change(session, obj.school_id, obj.id, _snapshot(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Student):
+            stage_student_change(session, obj.school_id, obj.id, None)
+
+
+@event.listens_for(db_session, 'before_commit')
+def _bump_student_versions(session):
+    # Flush first so changes staged by the final flush land in this commit
+    session.flush()
+    changes = session.info.get(_PENDING_CHANGES_KEY)
+    if changes:
+        session.info[_BUMPED_VERSIONS_KEY] = _bump_versions(session, {change[0] for change in changes})
+
+
+@event.listens_for(db_session, 'after_commit')
+def _publish_student_changes(session):
+    changes = session.info.pop(_PENDING_CHANGES_KEY, None)
+    bumped = session.info.pop(_BUMPED_VERSIONS_KEY, None)
+    if changes and bumped:
+        _apply_changes(changes, bumped)
+
+
+@event.listens_for(db_session, 'after_rollback')
+def _discard_student_changes(session):
+    session.info.pop(_PENDING_CHANGES_KEY, None)
+    session.info.pop(_BUMPED_VERSIONS_KEY, None)
+
+
+__all__ = [
+    'SchoolStudentCache',
+    'StudentMatch',
+    'get_school_student_cache',
+    'get_school_student_version',
+    'get_student_lookup_for_school',
+    'get_student_resolver',
+    'invalidate_school_students',
+    'reset_student_caches',
+    'school_student_caches',
+    'snapshot_student',
+    'stage_student_change',
+]
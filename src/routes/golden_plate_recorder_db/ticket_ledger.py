@@ -0,0 +1,253 @@
+"""Optional write-behind mode for the ticket ledger.
+
+By default a scan updates ``draft_pool`` and ``session_ticket_events`` in the
+same transaction as its ``session_records`` row. With
+``TICKET_LEDGER_WRITE_BEHIND=1`` the scan only enqueues a row in
+``ticket_ledger_queue`` and a background thread, started with the app,
+applies queued updates in insertion order. Admin reads of balances (draw
+start, summary, simulation, overview) call :func:`flush_ticket_ledger` first
+to drain the school's queue; guest summaries only report what is pending.
+
+A queue row is unique per ``session_record_id`` and is claimed and applied in
+one transaction, so each scan moves the ledger exactly once even when several
+workers drain the queue. An update that keeps failing is set aside after
+``MAX_ATTEMPTS`` tries (its ``attempts`` and ``last_error`` stay on the row)
+so one bad row cannot hold up every other student's balance.
+"""
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import event
+
+from .db import TicketLedgerQueueItem, _now_utc, db_session, dialect_insert
+from .draw_db import update_tickets_for_record
+
+TICKET_CATEGORIES = ('clean', 'red')
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 3
+
+# Key used on ``Session.info`` to wake the worker once the scan commits
+_WAKE_WORKER_KEY = 'ticket_ledger_wake'
+
+_settings = {
+    'write_behind': (os.environ.get('TICKET_LEDGER_WRITE_BEHIND', '') or '').strip().lower() in ('1', 'true', 'yes', 'on'),
+    'poll_seconds': DEFAULT_POLL_SECONDS,
+}
+_apply_lock = threading.Lock()
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+def is_write_behind_enabled() -> bool:
+    return _settings['write_behind']
+
+
+def configure_ticket_ledger(*, write_behind: Optional[bool] = None, poll_seconds: Optional[float] = None) -> None:
+    """Switch write-behind mode on or off, starting or stopping the worker."""
+    if poll_seconds is not None:
+        _settings['poll_seconds'] = max(0.05, float(poll_seconds))
+    if write_behind is not None:
+        _settings['write_behind'] = bool(write_behind)
+        if write_behind:
+            start_ticket_ledger_worker()
+        else:
+            stop_ticket_ledger_worker()
+
+
+def enqueue_ticket_update(
+    *,
+    school_id: str,
+    session_id: str,
+    session_record_id: str,
+    student_id: str,
+    category: str,
+    recorded_by: Optional[str],
+) -> None:
+    """Queue the ticket update for a scan inside the caller's transaction."""
+    if category not in TICKET_CATEGORIES:
+        return
+    queue = TicketLedgerQueueItem.__table__
+    db_session.execute(
+        dialect_insert(queue).values(
+            school_id=school_id,
+            session_id=session_id,
+            session_record_id=session_record_id,
+            student_id=student_id,
+            category=category,
+            recorded_by=recorded_by,
+            enqueued_at=_now_utc(),
+            attempts=0,
+        ).on_conflict_do_nothing(index_elements=[queue.c.session_record_id])
+    )
+    db_session.info[_WAKE_WORKER_KEY] = True
+
+
+def _pending_items(school_id: Optional[str], limit: int):
+    queue = TicketLedgerQueueItem.__table__
+    query = queue.select().where(queue.c.applied_at.is_(None), queue.c.attempts < MAX_ATTEMPTS)
+    if school_id is not None:
+        query = query.where(queue.c.school_id == school_id)
+    return db_session.execute(query.order_by(queue.c.id).limit(limit)).fetchall()
+
+
+def _record_failure(item_id: int, exc: Exception) -> None:
+    queue = TicketLedgerQueueItem.__table__
+    try:
+        db_session.execute(
+            queue.update()
+            .where(queue.c.id == item_id)
+            .values(attempts=queue.c.attempts + 1, last_error=str(exc)[:1000])
+        )
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+
+
+def apply_pending_ticket_updates(school_id: Optional[str] = None, *, limit: int = DEFAULT_BATCH_SIZE) -> int:
+    """Apply up to ``limit`` queued updates in order and return how many were applied.
+
+    Each update commits on its own. A failure is recorded on the queue row and
+    the rest of that student's updates wait for the next pass, so per-student
+    ordering holds while other students keep draining.
+    """
+    queue = TicketLedgerQueueItem.__table__
+    applied = 0
+    blocked = set()
+    with _apply_lock:
+        for item in _pending_items(school_id, limit):
+            if (item.school_id, item.student_id) in blocked:
+                continue
+            try:
+                claimed = db_session.execute(
+                    queue.update()
+                    .where(queue.c.id == item.id, queue.c.applied_at.is_(None))
+                    .values(applied_at=_now_utc(), attempts=queue.c.attempts + 1, last_error=None)
+                ).rowcount
+                if not claimed:
+                    # Another worker applied it first
+                    db_session.rollback()
+                    continue
+                update_tickets_for_record(
+                    session_id=item.session_id,
+                    student_id=item.student_id,
+                    category=item.category,
+                    session_record_id=item.session_record_id,
+                    user_id=item.recorded_by,
+                    school_id=item.school_id,
+                )
+                db_session.commit()
+                applied += 1
+            except Exception as exc:
+                db_session.rollback()
+                _record_failure(item.id, exc)
+                blocked.add((item.school_id, item.student_id))
+                print(f"Error applying queued ticket update {item.id} (attempt {item.attempts + 1}): {exc}")
+    return applied
+
+
+def pending_ticket_update_count(school_id: Optional[str] = None) -> int:
+    """Count queued updates still to apply, excluding ones set aside as failed."""
+    query = db_session.query(TicketLedgerQueueItem).filter(
+        TicketLedgerQueueItem.applied_at.is_(None),
+        TicketLedgerQueueItem.attempts < MAX_ATTEMPTS,
+    )
+    if school_id is not None:
+        query = query.filter(TicketLedgerQueueItem.school_id == school_id)
+    return query.count()
+
+
+def failed_ticket_update_count(school_id: Optional[str] = None) -> int:
+    """Count updates set aside after ``MAX_ATTEMPTS`` failures."""
+    query = db_session.query(TicketLedgerQueueItem).filter(
+        TicketLedgerQueueItem.applied_at.is_(None),
+        TicketLedgerQueueItem.attempts >= MAX_ATTEMPTS,
+    )
+    if school_id is not None:
+        query = query.filter(TicketLedgerQueueItem.school_id == school_id)
+    return query.count()
+
+
+def flush_ticket_ledger(school_id: Optional[str] = None) -> bool:
+    """Drain queued ticket updates for a school (or all schools) before returning.
+
+    Failing updates are retried until they are set aside, so only an error
+    reading the queue itself leaves this returning ``False``.
+    """
+    try:
+        for _ in range(MAX_ATTEMPTS):
+            while apply_pending_ticket_updates(school_id):
+                pass
+            if not _pending_items(school_id, 1):
+                return True
+    except Exception as exc:
+        db_session.rollback()
+        print(f"Error flushing ticket ledger for school {school_id}: {exc}")
+        return False
+    return not _pending_items(school_id, 1)
+
+
+def _run_worker() -> None:
+    while not _stop.is_set():
+        _wake.wait(_settings['poll_seconds'])
+        _wake.clear()
+        if _stop.is_set():
+            break
+        try:
+            while apply_pending_ticket_updates():
+                pass
+        except Exception as exc:
+            db_session.rollback()
+            print(f"Error applying queued ticket updates: {exc}")
+        finally:
+            db_session.remove()
+
+
+def start_ticket_ledger_worker() -> None:
+    """Start the background thread that drains the queue, if it is not running."""
+    global _worker
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _stop.clear()
+        _worker = threading.Thread(target=_run_worker, name='ticket-ledger-worker', daemon=True)
+        _worker.start()
+
+
+def stop_ticket_ledger_worker(timeout: float = 5.0) -> None:
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+        _stop.set()
+        _wake.set()
+    if worker is not None and worker is not threading.current_thread():
+        worker.join(timeout)
+
+
+@event.listens_for(db_session, 'after_commit')
+def _wake_worker_after_commit(session):
+    if session.info.pop(_WAKE_WORKER_KEY, False):
+        start_ticket_ledger_worker()
+        _wake.set()
+
+
+@event.listens_for(db_session, 'after_rollback')
+def _forget_wake_after_rollback(session):
+    session.info.pop(_WAKE_WORKER_KEY, None)
+
+
+__all__ = [
+    'MAX_ATTEMPTS',
+    'apply_pending_ticket_updates',
+    'configure_ticket_ledger',
+    'enqueue_ticket_update',
+    'failed_ticket_update_count',
+    'flush_ticket_ledger',
+    'is_write_behind_enabled',
+    'pending_ticket_update_count',
+    'start_ticket_ledger_worker',
+    'stop_ticket_ledger_worker',
+]
@@ -1,3 +1,5 @@
+import base64
+import binascii
 from datetime import datetime
 
 
@@ -55,7 +57,28 @@ def safe_parse_datetime(value):
             return datetime.min
 
 
+def encode_keyset_cursor(scope_id, timestamp, row_id):
+    """Opaque cursor for a ``(timestamp, id)`` position within ``scope_id``."""
+    raw = f"{scope_id}|{timestamp.isoformat() if timestamp else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_keyset_cursor(cursor):
+    """Return ``(scope_id, timestamp, row_id)`` or raise ``ValueError``."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+    except (binascii.Error, UnicodeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    parts = raw.split('|')
+    if len(parts) != 3 or not parts[1] or not parts[2]:
+        raise ValueError('Invalid cursor')
+    return parts[0], datetime.fromisoformat(parts[1]), parts[2]
+
+
 __all__ = [
+    'decode_keyset_cursor',
+    'encode_keyset_cursor',
     'extract_student_id_from_key',
     'format_display_name',
     'make_student_key',
@@ -120,11 +120,12 @@ def _clear_ticket_tables():
         SessionDrawEvent,
         SessionRecord,
         SessionTicketEvent,
+        TicketLedgerQueueItem,
         db_session,
     )
 
     # Delete in dependency order to avoid FK constraint issues.
-    for model in (SessionTicketEvent, SessionDrawEvent, SessionRecord, DraftPool):
+    for model in (TicketLedgerQueueItem, SessionTicketEvent, SessionDrawEvent, SessionRecord, DraftPool):
         db_session.query(model).delete()
 
     db_session.query(Session).update({
@@ -153,6 +154,18 @@ def _reset_ticket_state():
         _clear_ticket_tables()
 
 
+@pytest.fixture(autouse=True)
+def _isolated_blob_store(tmp_path):
+    """Keep map blobs and derivatives out of the repository's data directory."""
+    from src.routes.golden_plate_recorder_db.blob_store import LocalBlobStore, configure_blob_store
+
+    configure_blob_store(LocalBlobStore(str(tmp_path / 'map_blobs')))
+    try:
+        yield
+    finally:
+        configure_blob_store(None)
+
+
 @pytest.fixture(scope='session', autouse=True)
 def _restore_database_after_tests():
     """Ensure the production database is restored after the pytest session."""
@@ -153,6 +153,34 @@ class TestTicketEarning:
         assert alice is None
 
 
+    def test_draw_summary_ignores_other_schools_pool_rows(self, client, login):
+        """Only the session's school pool counts towards eligibility."""
+        import uuid
+
+        from src.routes.golden_plate_recorder_db.db import DraftPool, School, Student, db_session
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'school_scope_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+
+        student = db_session.query(Student).filter_by(student_identifier='101').first()
+        other_school_id = f"test-school-{uuid.uuid4().hex[:8]}"
+        db_session.add(School(id=other_school_id, name='Other School', slug=other_school_id, status='active'))
+        db_session.flush()
+        db_session.add(DraftPool(school_id=other_school_id, student_id=student.id, ticket_number=5))
+        db_session.commit()
+
+        try:
+            summary = client.get(f'/api/session/{session_id}/draw/summary').get_json()
+            assert [(c['student_identifier'], c['tickets']) for c in summary['candidates']] == [('101', 1.0)]
+        finally:
+            db_session.query(DraftPool).filter_by(school_id=other_school_id).delete()
+            db_session.query(School).filter_by(id=other_school_id).delete()
+            db_session.commit()
+
+
 class TestDrawOperations:
     """Test draw, override, finalize, and restore operations."""
 
@@ -261,6 +289,51 @@ class TestDrawOperations:
         assert final_summary['draw_info']['finalized'] is True
         assert [event['event_type'] for event in final_summary['history']] == ['draw', 'finalize']
 
+        # Session views read the same draw state from the sessions row
+        status_draw = client.get('/api/session/status').get_json()['draw_info']
+        assert status_draw['finalized'] is True
+        assert status_draw['winner']['student_id'] == '101'
+
+    def test_override_resolves_student_by_name(self, client, login):
+        """Override by name picks the roster student recorded by ID."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'override_name_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+
+        client.post('/api/record/clean', json={'input_value': '101'})
+        client.post('/api/record/clean', json={'input_value': '102'})
+
+        override_response = client.post(
+            f'/api/session/{session_id}/draw/override',
+            json={'preferred_name': 'bob', 'last_name': 'JONES'}
+        )
+        assert override_response.status_code == 200
+        assert override_response.get_json()['winner']['student_identifier'] == '102'
+
+    def test_override_candidates_are_cached_until_session_changes(self, client, login):
+        """Override lookups reuse one candidate set until a scan changes the session."""
+        from src.routes.golden_plate_recorder_db.draw_db import get_candidate_profiles
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'override_cache_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+
+        first = get_candidate_profiles(session_id)
+        assert get_candidate_profiles(session_id) is first
+        assert first.by_identifier['101'] in first
+
+        client.post('/api/record/clean', json={'input_value': '102'})
+        override = client.post(f'/api/session/{session_id}/draw/override', json={'student_identifier': '102'})
+        assert override.status_code == 200
+        assert override.get_json()['winner']['tickets'] == 1.0
+
+        rebuilt = get_candidate_profiles(session_id)
+        assert rebuilt is not first
+        assert sorted(rebuilt.by_identifier) == ['101', '102']
+
     def test_finalize_resets_winner_tickets(self, client, login):
         """Finalizing a draw resets winner's tickets to 0."""
         login()
@@ -320,6 +393,33 @@ class TestDrawOperations:
         assert data['draw_info']['has_winner'] is False
 
 
+    def test_racing_draw_transitions_lose_with_conflict(self, client, login):
+        """A transition from a stale draw version gets 409 and the current winner."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'draw_race_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+
+        version = client.get(f'/api/session/{session_id}/draw/summary').get_json()['draw_info']['draw_version']
+        first = client.post(f'/api/session/{session_id}/draw/start', json={'expected_version': version})
+        assert first.status_code == 200
+        assert first.get_json()['draw_version'] == version + 1
+
+        second = client.post(f'/api/session/{session_id}/draw/start', json={'expected_version': version})
+        assert second.status_code == 409
+        conflict = second.get_json()
+        assert conflict['draw_version'] == version + 1
+        assert conflict['winner']['student_identifier'] == '101'
+
+        stale_reset = client.post(f'/api/session/{session_id}/draw/reset', json={'expected_version': version})
+        assert stale_reset.status_code == 409
+        finalize = client.post(f'/api/session/{session_id}/draw/finalize', json={'expected_version': version + 1})
+        assert finalize.status_code == 200
+
+        history = client.get(f'/api/session/{session_id}/draw/summary').get_json()['history']
+        assert [event['event_type'] for event in history].count('draw') == 1
+
 class TestSessionDrawTracking:
     """Test that each session maintains unique draw records."""
 
@@ -381,6 +481,95 @@ class TestSessionDrawTracking:
         assert 'draw' in event_types
         assert 'finalize' in event_types
 
+    def test_draw_history_pages_newest_first_with_usernames(self, client, login):
+        """History is resolved in one pass and pages backwards by cursor."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'history_page_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+        client.post('/api/record/clean', json={'input_value': '102'})
+
+        for _ in range(3):
+            assert client.post(f'/api/session/{session_id}/draw/start').status_code == 200
+
+        summary = client.get(f'/api/session/{session_id}/draw/summary').get_json()
+        assert len(summary['history']) == 3
+        assert all(event['created_by_username'] == 'antineutrino' for event in summary['history'])
+        assert all(event['student_name'] for event in summary['history'])
+
+        first = client.get(f'/api/session/{session_id}/draw/history?limit=2').get_json()
+        assert first['has_more'] is True
+        assert [e['id'] for e in first['history']] == [e['id'] for e in reversed(summary['history'])][:2]
+        rest = client.get(
+            f"/api/session/{session_id}/draw/history?limit=2&before={first['next_cursor']}"
+        ).get_json()
+        assert rest['has_more'] is False and rest['next_cursor'] is None
+        assert [e['id'] for e in rest['history']] == [summary['history'][0]['id']]
+
+    def test_draw_history_is_scoped_to_the_callers_school(self, client, login):
+        """Another school's session is reported as missing, to staff and guests alike."""
+        import uuid
+
+        from src.routes.golden_plate_recorder_db.db import (
+            DEFAULT_SCHOOL_SLUG,
+            School,
+            Session as SessionModel,
+            db_session,
+        )
+
+        login()
+        client.post('/api/session/create', json={'session_name': 'history_other_school'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        assert client.get(f'/api/session/{session_id}/draw/history').status_code == 200
+        home_school_id = db_session.get(SessionModel, session_id).school_id
+        other_school_id = f"test-school-{uuid.uuid4().hex[:8]}"
+        db_session.add(School(id=other_school_id, name='Other School', slug=other_school_id, status='active'))
+        db_session.flush()
+        db_session.query(SessionModel).filter_by(id=session_id).update(
+            {'school_id': other_school_id, 'is_public': True}
+        )
+        db_session.commit()
+
+        try:
+            assert client.get(f'/api/session/{session_id}/draw/history').status_code == 404
+            assert client.post('/api/auth/guest', json={'school_slug': DEFAULT_SCHOOL_SLUG}).status_code == 200
+            assert client.get(f'/api/session/{session_id}/draw/history').status_code == 404
+        finally:
+            db_session.query(SessionModel).filter_by(id=session_id).update({'school_id': home_school_id})
+            db_session.query(School).filter_by(id=other_school_id).delete()
+            db_session.commit()
+
+
+    def test_draw_overview_groups_sessions_and_honours_etag(self, client, login):
+        """One overview covers every main session; extras pool into their main draw."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'overview_main'})
+        main_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+        client.post('/api/record/clean', json={'input_value': '102'})
+        client.post('/api/session/create', json={'session_name': 'overview_extra'})
+        extra_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '103'})
+        client.post('/api/record/clean', json={'input_value': '102'})
+        assert client.post(f'/api/session/{extra_id}/merge', json={'main_session_id': main_id}).status_code == 200
+        client.post(f'/api/session/{main_id}/draw/start')
+
+        response = client.get('/api/draw/overview?top=2')
+        assert response.status_code == 200
+        sessions = {entry['session_id']: entry for entry in response.get_json()['sessions']}
+        assert main_id in sessions and extra_id not in sessions
+        main = sessions[main_id]
+        assert main['pool_size'] == 3
+        assert main['total_tickets'] == 4.0  # 102 earned in both sessions
+        assert [c['student_identifier'] for c in main['top_candidates']] == ['102', '101']
+        assert main['winner'] is not None and main['finalized'] is False
+
+        etag = response.headers['ETag']
+        assert client.get('/api/draw/overview?top=2', headers={'If-None-Match': etag}).status_code == 304
+        client.post(f'/api/session/{main_id}/draw/finalize')
+        assert client.get('/api/draw/overview?top=2', headers={'If-None-Match': etag}).status_code == 200
 
 class TestDraftPoolTracking:
     """Test that draft_pool maintains accurate ticket counts."""
@@ -429,6 +618,137 @@ class TestDraftPoolTracking:
         assert len(summary['candidates']) == 0
 
 
+    def test_simulation_reports_rates_with_confidence_intervals(self, client, login):
+        """Monte Carlo draws track the ticket shares per student and group."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'simulate_test'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        for identifier in ('101', '102', '103'):
+            client.post('/api/record/clean', json={'input_value': identifier})
+
+        response = client.get(f'/api/session/{session_id}/draw/simulate?n=30000&seed=11')
+        assert response.status_code == 200
+        report = response.get_json()
+        assert report['simulations'] == 30000
+        assert report['pool_size'] == 3
+        assert sum(row['wins'] for row in report['students']) == 30000
+        for row in report['students']:
+            assert row['theoretical_rate'] == pytest.approx(1 / 3)
+            assert row['ci_low'] <= row['empirical_rate'] <= row['ci_high']
+            assert row['empirical_rate'] == pytest.approx(1 / 3, abs=0.02)
+
+        houses = {row['house']: row for row in report['groups']['house']}
+        assert houses['Barn']['candidates'] == 2
+        assert houses['Barn']['theoretical_rate'] == pytest.approx(2 / 3)
+        assert {row['grade'] for row in report['groups']['grade']} == {'9', '10'}
+
+        assert client.get(f'/api/session/{session_id}/draw/simulate?n=0').status_code == 400
+
+    def test_simulation_is_scoped_to_the_callers_school(self, client, login):
+        """Another school's session is reported as missing."""
+        import uuid
+
+        from src.routes.golden_plate_recorder_db.db import School, Session as SessionModel, db_session
+
+        login()
+        client.post('/api/session/create', json={'session_name': 'simulate_other_school'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        home_school_id = db_session.get(SessionModel, session_id).school_id
+        other_school_id = f"test-school-{uuid.uuid4().hex[:8]}"
+        db_session.add(School(id=other_school_id, name='Other School', slug=other_school_id, status='active'))
+        db_session.flush()
+        db_session.query(SessionModel).filter_by(id=session_id).update({'school_id': other_school_id})
+        db_session.commit()
+
+        try:
+            assert client.get(f'/api/session/{session_id}/draw/simulate?n=10').status_code == 404
+        finally:
+            db_session.query(SessionModel).filter_by(id=session_id).update({'school_id': home_school_id})
+            db_session.query(School).filter_by(id=other_school_id).delete()
+            db_session.commit()
+
+
+    def test_summary_snapshot_is_reused_until_eligibility_changes(self, client, login):
+        """Polls reuse the cached pool; scans and merges invalidate it."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'snapshot_main'})
+        main_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+
+        first = client.get(f'/api/session/{main_id}/draw/summary').get_json()
+        second = client.get(f'/api/session/{main_id}/draw/summary').get_json()
+        assert first['eligibility_version'] == second['eligibility_version']
+        assert [c['student_identifier'] for c in second['candidates']] == ['101']
+
+        client.post('/api/session/create', json={'session_name': 'snapshot_extra'})
+        extra_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '102'})
+        after_scan = client.get(f'/api/session/{main_id}/draw/summary').get_json()
+        assert after_scan['eligibility_version'] != second['eligibility_version']
+        assert [c['student_identifier'] for c in after_scan['candidates']] == ['101']
+
+        merge = client.post(f'/api/session/{extra_id}/merge', json={'main_session_id': main_id})
+        assert merge.status_code == 200
+        merged = client.get(f'/api/session/{main_id}/draw/summary').get_json()
+        assert sorted(c['student_identifier'] for c in merged['candidates']) == ['101', '102']
+
+    def test_only_eligibility_writes_bump_the_shared_version(self, client, login):
+        """Scan counters leave the DB-stored version alone; draw transitions bump it."""
+        from src.routes.golden_plate_recorder_db.db import EligibilityVersion, Session as SessionModel, db_session
+        from src.routes.golden_plate_recorder_db.draw_db import compare_and_set_draw
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'shared_version'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/clean', json={'input_value': '101'})
+
+        def version():
+            return client.get(f'/api/session/{session_id}/draw/summary').get_json()['eligibility_version']
+
+        before = version()
+        assert client.post('/api/record/dirty', json={}).status_code == 200
+        assert version() == before
+
+        assert client.post('/api/record/clean', json={'input_value': '102'}).status_code == 200
+        after_clean = version()
+        assert after_clean != before
+
+        sess = db_session.get(SessionModel, session_id)
+        school_id = sess.school_id
+        assert compare_and_set_draw(sess, sess.draw_version or 0, method='random')
+        db_session.commit()
+        assert version() != after_clean
+        stored = db_session.get(EligibilityVersion, school_id)
+        db_session.refresh(stored)
+        assert stored.version >= 2
+
+    def test_rebuild_restores_balances_after_session_deleted(self, client, login):
+        """Deleting a session leaves draft_pool stale until it is rebuilt from events."""
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'rebuild_earn'})
+        client.post('/api/record/clean', json={'input_value': '101'})
+        client.post('/api/record/clean', json={'input_value': '102'})
+        client.post('/api/session/create', json={'session_name': 'rebuild_red'})
+        red_session_id = client.get('/api/session/status').get_json()['session_id']
+        client.post('/api/record/red', json={'input_value': '101'})
+
+        assert client.delete(f'/api/admin/sessions/{red_session_id}').status_code == 200
+
+        dry_run = client.post('/api/admin/draft-pool/rebuild', json={})
+        assert dry_run.status_code == 200
+        report = dry_run.get_json()
+        assert report['dry_run'] is True
+        assert [(c['display_name'], c['current'], c['rebuilt']) for c in report['changes']] == [('Alice Smith', 0, 1)]
+
+        applied = client.post('/api/admin/draft-pool/rebuild', json={'apply': True}).get_json()
+        assert applied['changed_count'] == 1
+        again = client.post('/api/admin/draft-pool/rebuild', json={}).get_json()
+        assert again['changed_count'] == 0
+
 class TestTicketEvents:
     """Test that session_ticket_events properly tracks all ticket changes."""
 
@@ -473,5 +793,127 @@ class TestTicketEvents:
         assert response.status_code == 200
 
 
+class TestWriteBehindLedger:
+    """Ticket updates queued by scans and applied behind the request."""
+
+    @pytest.fixture
+    def write_behind(self):
+        from src.routes.golden_plate_recorder_db.ticket_ledger import configure_ticket_ledger
+
+        configure_ticket_ledger(write_behind=True)
+        yield
+        configure_ticket_ledger(write_behind=False)
+
+    def test_draw_start_flushes_queued_ticket_updates(self, client, login, write_behind):
+        from src.routes.golden_plate_recorder_db.db import SessionTicketEvent, TicketLedgerQueueItem, db_session
+        from src.routes.golden_plate_recorder_db.ticket_ledger import pending_ticket_update_count
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'write_behind_draw'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+
+        for identifier in ('101', '102', '103'):
+            response = client.post('/api/record/clean', json={'input_value': identifier})
+            assert response.status_code == 200
+        assert db_session.query(TicketLedgerQueueItem).filter_by(session_id=session_id).count() == 3
+
+        draw_response = client.post(f'/api/session/{session_id}/draw/start')
+        assert draw_response.status_code == 200
+        assert draw_response.get_json()['pool_size'] == 3
+        assert pending_ticket_update_count() == 0
+        earned = db_session.query(SessionTicketEvent).filter_by(session_id=session_id, event_type='earn').count()
+        assert earned == 3
+
+    def test_guest_summary_reports_pending_updates_without_flushing(self, client, login, write_behind, monkeypatch):
+        from src.routes.golden_plate_recorder_db.db import (
+            DEFAULT_SCHOOL_SLUG,
+            Session as SessionModel,
+            TicketLedgerQueueItem,
+            db_session,
+        )
+        from src.routes.golden_plate_recorder_db import ticket_ledger
+
+        # Only requests may drain the queue here
+        ticket_ledger.stop_ticket_ledger_worker()
+        monkeypatch.setattr(ticket_ledger, 'start_ticket_ledger_worker', lambda: None)
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'write_behind_guest'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        assert client.post('/api/record/clean', json={'input_value': '101'}).status_code == 200
+        db_session.query(SessionModel).filter_by(id=session_id).update({'is_public': True})
+        db_session.commit()
+
+        assert client.post('/api/auth/guest', json={'school_slug': DEFAULT_SCHOOL_SLUG}).status_code == 200
+        summary = client.get(f'/api/session/{session_id}/draw/summary').get_json()
+        assert summary['pending_ticket_updates'] == 1
+        item = db_session.query(TicketLedgerQueueItem).filter_by(session_id=session_id).one()
+        db_session.refresh(item)
+        assert item.applied_at is None
+
+        login()
+        summary = client.get(f'/api/session/{session_id}/draw/summary').get_json()
+        assert summary['pending_ticket_updates'] == 0
+
+    def test_enqueue_is_idempotent_per_session_record(self, client, login, write_behind):
+        from src.routes.golden_plate_recorder_db.db import SessionRecord, TicketLedgerQueueItem, db_session
+        from src.routes.golden_plate_recorder_db.ticket_ledger import enqueue_ticket_update, flush_ticket_ledger
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'write_behind_idempotent'})
+        assert client.post('/api/record/clean', json={'input_value': '101'}).status_code == 200
+
+        record = db_session.query(SessionRecord).filter_by(category='clean').first()
+        enqueue_ticket_update(
+            school_id=record.school_id,
+            session_id=record.session_id,
+            session_record_id=record.id,
+            student_id=record.student_id,
+            category='clean',
+            recorded_by=record.recorded_by,
+        )
+        db_session.commit()
+
+        assert db_session.query(TicketLedgerQueueItem).filter_by(session_record_id=record.id).count() == 1
+        assert flush_ticket_ledger(record.school_id)
+        summary = client.get(f'/api/session/{record.session_id}/draw/summary').get_json()
+        assert [candidate['tickets'] for candidate in summary['candidates']] == [1.0]
+
+    def test_failing_update_is_set_aside_without_blocking_others(self, client, login, write_behind, monkeypatch):
+        from src.routes.golden_plate_recorder_db import ticket_ledger
+        from src.routes.golden_plate_recorder_db.db import Student, TicketLedgerQueueItem, db_session
+
+        login()
+        upload_csv(client)
+        client.post('/api/session/create', json={'session_name': 'write_behind_poison'})
+        session_id = client.get('/api/session/status').get_json()['session_id']
+        poison = db_session.query(Student).filter_by(student_identifier='101').first()
+
+        apply_update = ticket_ledger.update_tickets_for_record
+
+        def failing_update(**kwargs):
+            if kwargs['student_id'] == poison.id:
+                raise RuntimeError('poison update')
+            return apply_update(**kwargs)
+
+        monkeypatch.setattr(ticket_ledger, 'update_tickets_for_record', failing_update)
+        for identifier in ('101', '102'):
+            assert client.post('/api/record/clean', json={'input_value': identifier}).status_code == 200
+
+        summary = client.get(f'/api/session/{session_id}/draw/summary').get_json()
+        assert summary['pending_ticket_updates'] == 0
+        assert [candidate['student_identifier'] for candidate in summary['candidates']] == ['102']
+        assert ticket_ledger.failed_ticket_update_count(poison.school_id) == 1
+
+        item = db_session.query(TicketLedgerQueueItem).filter_by(student_id=poison.id).one()
+        db_session.refresh(item)
+        assert item.applied_at is None
+        assert item.attempts == ticket_ledger.MAX_ATTEMPTS
+        assert 'poison update' in item.last_error
+        assert client.post(f'/api/session/{session_id}/draw/start').status_code == 200
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -1,20 +1,29 @@
+import hashlib
 import io
+import time
 from datetime import timedelta
 
-from sqlalchemy import inspect
+from PIL import Image
+from sqlalchemy import event, inspect
 
+from src.routes.golden_plate_recorder_db.blob_store import get_blob_store
 from src.routes.golden_plate_recorder_db.db import engine
+from src.routes.golden_plate_recorder_db.map_blobs import collect_map_blobs, migrate_inline_images, read_map_image
 from src.routes.golden_plate_recorder_db.map_db import (
+    MapBlob,
     MapEmailVerification,
     MapSubmission,
+    MapSubmissionImage,
     MapSubmitterAccount,
     _map_now_utc,
     map_db_session,
     map_engine,
 )
+from src.routes.golden_plate_recorder_db.map_thumbnails import THUMBNAIL_MIME
 
 
 def _reset_map_tables():
+    map_db_session.query(MapSubmissionImage).delete()
     map_db_session.query(MapSubmission).delete()
     map_db_session.query(MapEmailVerification).delete()
     map_db_session.query(MapSubmitterAccount).delete()
@@ -129,3 +138,439 @@ def test_map_submission_password_shortcut(client, login):
     })
     assert second.status_code == 201
     assert second.get_json()['password_used'] is True
+
+
+def test_map_images_are_content_addressed_and_collected(client, login):
+    _reset_map_tables()
+    login()
+
+    verification = MapEmailVerification(
+        email='photos@sac.on.ca',
+        code='123456',
+        purpose='map_submission',
+        expires_at=_map_now_utc() + timedelta(minutes=5),
+        verified_at=_map_now_utc(),
+        attempts=0,
+    )
+    map_db_session.add(verification)
+    map_db_session.commit()
+
+    response = client.post('/api/map/submissions', data={
+        'email': 'photos@sac.on.ca',
+        'title': 'Same photo twice',
+        'text': 'Duplicate uploads share one blob.',
+        'auth_method': 'email',
+        'image': (io.BytesIO(b'shared-bytes'), 'a.png', 'image/png'),
+        'images': [(io.BytesIO(b'shared-bytes'), 'b.png', 'image/png')],
+    }, content_type='multipart/form-data')
+    assert response.status_code == 201
+    submission_id = response.get_json()['submission']['id']
+
+    submission = map_db_session.get(MapSubmission, submission_id)
+    assert submission.image_data is None
+    blob = map_db_session.get(MapBlob, submission.image_sha256)
+    assert blob.refcount == 2
+    assert get_blob_store().read(blob.sha256) == b'shared-bytes'
+
+    rejected = client.post(f'/api/map/submissions/{submission_id}/reject', json={})
+    assert rejected.status_code == 200
+    collect_map_blobs(grace=timedelta(0))
+    map_db_session.expire_all()
+    assert map_db_session.get(MapBlob, blob.sha256) is None
+    assert not get_blob_store().exists(blob.sha256)
+
+
+def test_inline_images_migrate_to_blob_store():
+    _reset_map_tables()
+    submission = MapSubmission(
+        school_id='default',
+        email='legacy@sac.on.ca',
+        text_content='Legacy row',
+        image_mime='image/png',
+        image_data=b'x' * 2500,
+        image_size=2500,
+        status='approved',
+    )
+    map_db_session.add(submission)
+    map_db_session.commit()
+
+    moved = migrate_inline_images(chunk_size=1000)
+    assert moved['map_submissions'] == 1
+
+    map_db_session.expire_all()
+    submission = map_db_session.get(MapSubmission, submission.id)
+    assert submission.image_data is None
+    assert submission.image_size == 2500
+    assert read_map_image(submission) == b'x' * 2500
+    assert map_db_session.get(MapBlob, submission.image_sha256).refcount == 1
+
+
+def test_map_listing_reads_metadata_only(client, login):
+    _reset_map_tables()
+    login()
+    for index in range(3):
+        submission = MapSubmission(
+            school_id='default',
+            email=f'list{index}@sac.on.ca',
+            text_content=f'Listed {index}',
+            image_mime='image/png',
+            image_data=b'inline-bytes',
+            image_size=12,
+            status='approved',
+        )
+        map_db_session.add(submission)
+        map_db_session.flush()
+        map_db_session.add(MapSubmissionImage(
+            submission_id=submission.id,
+            position=1,
+            image_mime='image/png',
+            image_data=b'extra-bytes',
+            image_size=11,
+        ))
+    map_db_session.commit()
+    map_db_session.remove()
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(map_engine, 'before_cursor_execute', _capture)
+    try:
+        response = client.get('/api/map/submissions')
+    finally:
+        event.remove(map_engine, 'before_cursor_execute', _capture)
+
+    assert response.status_code == 200
+    submissions = response.get_json()['submissions']
+    assert len(submissions) == 3
+    assert all(len(item['images']) == 2 for item in submissions)
+    selects = [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+    assert not any('image_data,' in statement or 'image_data AS' in statement for statement in selects)
+    assert sum('FROM map_submission_images' in statement for statement in selects) == 1
+
+
+def test_map_image_serving_is_cache_validated(client, login):
+    _reset_map_tables()
+    login()
+    payload = bytes(range(256)) * 4
+    submission = MapSubmission(
+        school_id='default',
+        email='cache@sac.on.ca',
+        text_content='Cached',
+        image_filename='photo.png',
+        image_mime='image/png',
+        image_sha256=get_blob_store().put(payload)[0],
+        image_size=len(payload),
+        status='approved',
+        submitted_at=_map_now_utc(),
+    )
+    map_db_session.add(submission)
+    map_db_session.commit()
+    submission_id, sha256 = submission.id, submission.image_sha256
+
+    listed = client.get('/api/map/submissions').get_json()['submissions'][0]
+    url = listed['image_url']
+    assert url.endswith(f'?v={sha256[:16]}')
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.data == payload
+    assert full.headers['ETag'] == f'"{sha256}"'
+    assert full.headers['Last-Modified']
+    assert 'immutable' in full.headers['Cache-Control']
+
+    unversioned = client.get(f'/api/map/submissions/{submission_id}/image')
+    assert 'no-cache' in unversioned.headers['Cache-Control']
+
+    cached = client.get(url, headers={'If-None-Match': full.headers['ETag']})
+    assert cached.status_code == 304
+
+    partial = client.get(url, headers={'Range': 'bytes=10-19'})
+    assert partial.status_code == 206
+    assert partial.data == payload[10:20]
+    assert partial.headers['Content-Range'] == f'bytes 10-19/{len(payload)}'
+
+
+def test_map_image_thumbnails(client, login):
+    _reset_map_tables()
+    login()
+    source = io.BytesIO()
+    Image.new('RGB', (2000, 1000), (200, 40, 40)).save(source, format='PNG')
+    submission = MapSubmission(
+        school_id='default',
+        email='thumbs@sac.on.ca',
+        text_content='Large photo',
+        image_filename='large.png',
+        image_mime='image/png',
+        image_sha256=get_blob_store().put(source.getvalue())[0],
+        image_size=len(source.getvalue()),
+        status='approved',
+    )
+    map_db_session.add(submission)
+    map_db_session.commit()
+
+    image = client.get('/api/map/submissions').get_json()['submissions'][0]['images'][0]
+    assert image['srcset'].count('w,') == 2
+    assert image['thumbnail_url'].endswith('&w=256')
+
+    thumbnail = client.get(image['thumbnail_url'])
+    assert thumbnail.status_code == 200
+    assert thumbnail.mimetype == THUMBNAIL_MIME
+    assert Image.open(io.BytesIO(thumbnail.data)).size == (256, 128)
+    assert thumbnail.headers['ETag'].endswith('-w256"')
+    assert 'immutable' in thumbnail.headers['Cache-Control']
+
+    # Requests snap to the next width up, capped at the largest derivative
+    assert Image.open(io.BytesIO(client.get(f"{image['url']}&w=500").data)).width == 768
+    assert Image.open(io.BytesIO(client.get(f"{image['url']}&w=3000").data)).width == 1600
+
+
+def test_thumbnails_use_displayed_width_of_rotated_photos():
+    from src.routes.golden_plate_recorder_db.map_thumbnails import ensure_derivative
+
+    # Stored landscape, shown as a 300px wide portrait photo (orientation 6)
+    source = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new('RGB', (1000, 300), (10, 120, 200)).save(source, format='JPEG', exif=exif.tobytes())
+    sha256 = get_blob_store().put(source.getvalue())[0]
+
+    assert ensure_derivative(sha256, 768) is None
+    path, _ = ensure_derivative(sha256, 256)
+    assert Image.open(path).size == (256, 853)
+
+
+def test_concurrent_thumbnail_requests_render_once(monkeypatch):
+    import threading
+
+    from src.routes.golden_plate_recorder_db import map_thumbnails
+
+    source = io.BytesIO()
+    Image.new('RGB', (900, 300), (30, 30, 30)).save(source, format='PNG')
+    sha256 = get_blob_store().put(source.getvalue())[0]
+    calls = []
+    render = map_thumbnails._render
+
+    def slow_render(*args):
+        calls.append(args)
+        time.sleep(0.1)
+        return render(*args)
+
+    monkeypatch.setattr(map_thumbnails, '_render', slow_render)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(map_thumbnails.ensure_derivative(sha256, 256)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({result[0] for result in results}) == 1
+    assert not map_thumbnails._render_locks
+
+def test_map_submission_converts_images_in_background(client, login):
+    _reset_map_tables()
+    login()
+    map_db_session.add(MapEmailVerification(
+        email='tiff@sac.on.ca',
+        code='123456',
+        purpose='map_submission',
+        expires_at=_map_now_utc() + timedelta(minutes=5),
+        verified_at=_map_now_utc(),
+        attempts=0,
+    ))
+    map_db_session.commit()
+    tiff = io.BytesIO()
+    Image.new('RGB', (40, 20), (10, 120, 30)).save(tiff, format='TIFF')
+
+    response = client.post('/api/map/submissions', data={
+        'email': 'tiff@sac.on.ca',
+        'title': 'Scanned map',
+        'text': 'A TIFF that needs converting.',
+        'auth_method': 'email',
+        'image': (io.BytesIO(tiff.getvalue()), 'scan.tiff', 'image/tiff'),
+        'images': [
+            (io.BytesIO(b'native-bytes'), 'native.png', 'image/png'),
+            (io.BytesIO(b'not really a tiff'), 'broken.tif', 'image/tiff'),
+        ],
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['image_job']['total'] == 2
+    assert client.get('/api/map/submissions/pending').get_json()['submissions'] == []
+
+    deadline = time.monotonic() + 60
+    job = body['image_job']
+    while job['status'] in ('queued', 'processing') and time.monotonic() < deadline:
+        time.sleep(0.1)
+        job = client.get(body['status_url']).get_json()['job']
+    assert job['status'] == 'failed'
+    assert job['completed'] == 2
+    assert 'broken.tif' in job['error']
+    map_db_session.expire_all()
+    assert map_db_session.get(MapSubmission, body['submission']['id']) is None
+
+    response = client.post('/api/map/submissions', data={
+        'email': 'tiff@sac.on.ca',
+        'title': 'Scanned map',
+        'text': 'Only the good TIFF this time.',
+        'auth_method': 'email',
+        'image': (io.BytesIO(tiff.getvalue()), 'scan.tiff', 'image/tiff'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+    deadline = time.monotonic() + 60
+    status = client.get(status_url).get_json()
+    while status['job']['status'] in ('queued', 'processing') and time.monotonic() < deadline:
+        time.sleep(0.1)
+        status = client.get(status_url).get_json()
+    assert status['job']['status'] == 'done'
+    image = status['submission']['images'][0]
+    assert image['filename'] == 'scan.png'
+    assert image['mime'] == 'image/png'
+    assert Image.open(io.BytesIO(client.get(image['url']).data)).size == (40, 20)
+    pending = client.get('/api/map/submissions/pending').get_json()['submissions']
+    assert [item['id'] for item in pending] == [status['submission']['id']]
+
+
+def test_failed_image_job_releases_uploads_and_drops_submission(client, login, monkeypatch):
+    from src.routes.golden_plate_recorder_db import map_jobs
+    from src.routes.golden_plate_recorder_db.map_db import MapImageJobItem
+
+    _reset_map_tables()
+    login()
+    map_db_session.add(MapEmailVerification(
+        email='jobfail@sac.on.ca',
+        code='123456',
+        purpose='map_submission',
+        expires_at=_map_now_utc() + timedelta(minutes=5),
+        verified_at=_map_now_utc(),
+        attempts=0,
+    ))
+    map_db_session.commit()
+
+    def unavailable(*args):
+        raise RuntimeError('conversion pool unavailable')
+
+    monkeypatch.setattr(map_jobs, '_submit_conversion', unavailable)
+    tiff = io.BytesIO()
+    Image.new('RGB', (30, 10), (90, 10, 10)).save(tiff, format='TIFF')
+    response = client.post('/api/map/submissions', data={
+        'email': 'jobfail@sac.on.ca',
+        'title': 'Never converted',
+        'text': 'The pool is down.',
+        'auth_method': 'email',
+        'image': (io.BytesIO(tiff.getvalue()), 'down.tiff', 'image/tiff'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = response.get_json()
+
+    deadline = time.monotonic() + 30
+    job = body['image_job']
+    while job['status'] in ('queued', 'processing') and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(body['status_url']).get_json()['job']
+    assert job['status'] == 'failed'
+    assert 'conversion pool unavailable' in job['error']
+
+    map_db_session.expire_all()
+    assert map_db_session.get(MapSubmission, body['submission']['id']) is None
+    items = map_db_session.query(MapImageJobItem).filter_by(job_id=job['id']).all()
+    assert items and all(item.source_sha256 is None for item in items)
+    raw_hash = hashlib.sha256(tiff.getvalue()).hexdigest()
+    assert map_db_session.get(MapBlob, raw_hash).refcount == 0
+    assert client.get('/api/map/submissions/pending').get_json()['submissions'] == []
+
+
+def test_image_job_heartbeats_and_skips_items_claimed_elsewhere(client, login, monkeypatch):
+    import threading
+    from concurrent.futures import Future
+
+    from sqlalchemy import update
+
+    from src.routes.golden_plate_recorder_db import map_jobs
+    from src.routes.golden_plate_recorder_db.map_db import MapImageJobItem
+
+    _reset_map_tables()
+    login()
+    map_db_session.add(MapEmailVerification(
+        email='jobrace@sac.on.ca',
+        code='123456',
+        purpose='map_submission',
+        expires_at=_map_now_utc() + timedelta(minutes=5),
+        verified_at=_map_now_utc(),
+        attempts=0,
+    ))
+    map_db_session.commit()
+
+    converted_sha, converted_size = get_blob_store().put(b'converted by a resumed runner')
+    heartbeats = []
+    touch_job = map_jobs._touch_job
+
+    def counting_touch(session, job_id):
+        heartbeats.append(job_id)
+        touch_job(session, job_id)
+
+    def converted_elsewhere(convert, root, source_path, filename, mime):
+        # A resumed runner finishes the same file while this one is still waiting
+        with map_engine.begin() as conn:
+            conn.execute(
+                update(MapImageJobItem)
+                .where(MapImageJobItem.original_filename == filename, MapImageJobItem.status == 'queued')
+                .values(status='done')
+            )
+        future = Future()
+        threading.Timer(0.3, future.set_result, [(converted_sha, converted_size, 'image/png', '.png')]).start()
+        return None, future
+
+    monkeypatch.setattr(map_jobs, 'HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(map_jobs, '_touch_job', counting_touch)
+    monkeypatch.setattr(map_jobs, '_submit_conversion', converted_elsewhere)
+    tiff = io.BytesIO()
+    Image.new('RGB', (30, 10), (10, 10, 90)).save(tiff, format='TIFF')
+    response = client.post('/api/map/submissions', data={
+        'email': 'jobrace@sac.on.ca',
+        'title': 'Converted twice',
+        'text': 'Two runners, one image.',
+        'auth_method': 'email',
+        'image': (io.BytesIO(tiff.getvalue()), 'race.tiff', 'image/tiff'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 202
+    body = response.get_json()
+
+    deadline = time.monotonic() + 30
+    job = body['image_job']
+    while job['status'] in ('queued', 'processing') and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(body['status_url']).get_json()['job']
+    assert job['status'] == 'done'
+    assert heartbeats and set(heartbeats) == {job['id']}
+    # The late result lost the item claim, so it was neither counted nor attached
+    assert job['completed'] == 0
+    map_db_session.expire_all()
+    assert map_db_session.get(MapBlob, converted_sha) is None
+    assert map_db_session.get(MapSubmission, body['submission']['id']).image_sha256 != converted_sha
+
+
+def test_broken_conversion_pool_is_replaced():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+
+    import pytest
+
+    from src.routes.golden_plate_recorder_db import map_jobs
+
+    pool, _ = map_jobs._get_pools()
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result(timeout=60)
+
+    store = get_blob_store()
+    new_pool, future = map_jobs._submit_conversion(
+        map_jobs._converter, store.root, os.path.join(store.root, 'missing'), 'missing.tif', 'image/tiff',
+    )
+    assert new_pool is not pool
+    assert isinstance(future.exception(timeout=60), FileNotFoundError)
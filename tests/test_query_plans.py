@@ -0,0 +1,60 @@
+"""Query-plan regression checks for hot lookups."""
+import pytest
+from sqlalchemy import func
+
+from src.routes.golden_plate_recorder_db.db import DraftPool, EmailVerification, School, Student, db_session, engine
+from src.routes.golden_plate_recorder_db.map_db import (
+    MapEmailVerification,
+    MapSubmission,
+    MapSubmitterAccount,
+    map_db_session,
+    map_engine,
+)
+
+
+def _query_plan(bind, query):
+    compiled = query.statement.compile(dialect=bind.dialect, compile_kwargs={'literal_binds': True})
+    with bind.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}').fetchall()
+    return ' | '.join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize('query_factory, index_name', [
+    (
+        lambda: db_session.query(School).filter(func.lower(School.slug) == 'default'),
+        'idx_schools_slug_lower',
+    ),
+    (
+        lambda: (
+            db_session.query(Student)
+            .filter(Student.school_id == 'default-school')
+            .filter(func.lower(Student.preferred_name) == 'jane')
+            .filter(func.lower(Student.last_name) == 'roe')
+        ),
+        'idx_students_school_name_lower',
+    ),
+    (
+        lambda: db_session.query(EmailVerification).filter(func.lower(EmailVerification.email) == 'a@b.test'),
+        'idx_email_verifications_email_lower',
+    ),
+    (
+        lambda: db_session.query(DraftPool).filter(DraftPool.student_id == 'student-1'),
+        'idx_draft_pool_student',
+    ),
+])
+def test_main_database_lookups_use_indexes(query_factory, index_name):
+    if engine.dialect.name != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN checks are SQLite specific')
+    assert index_name in _query_plan(engine, query_factory())
+
+
+@pytest.mark.parametrize('model, index_name', [
+    (MapEmailVerification, 'idx_map_email_verifications_email_lower'),
+    (MapSubmission, 'idx_map_submissions_email_lower'),
+    (MapSubmitterAccount, 'idx_map_submitter_accounts_email_lower'),
+])
+def test_map_email_lookups_use_expression_indexes(model, index_name):
+    if map_engine.dialect.name != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN checks are SQLite specific')
+    query = map_db_session.query(model).filter(func.lower(model.email) == 'a@b.test')
+    assert index_name in _query_plan(map_engine, query)
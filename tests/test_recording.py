@@ -28,3 +28,201 @@ def test_recording_categories_and_stats(client, login):
     assert data['faculty_clean_count'] == 1
     assert data['combined_dirty_count'] == 2
 
+
+
+def test_duplicate_scan_reports_existing_category(client, login):
+    login()
+    assert upload_csv(client).status_code == 200
+    client.post('/api/session/create', json={'session_name': 'dedupe_test'})
+
+    assert client.post('/api/record/red', json={'input_value': '456'}).status_code == 200
+    duplicate = client.post('/api/record/clean', json={'student_key': 'id:456'})
+    assert duplicate.status_code == 409
+    assert 'RED' in duplicate.get_json()['message']
+
+    assert client.post('/api/record/faculty', json={'input_value': 'Dr Smith'}).status_code == 200
+    assert client.post('/api/record/faculty', json={'input_value': 'dr smith'}).status_code == 409
+
+    status = client.get('/api/session/status').get_json()
+    assert status['clean_count'] == 0
+    assert status['red_count'] == 1
+    assert status['faculty_clean_count'] == 1
+
+
+def test_duplicate_scan_backed_by_database_constraint(client, login):
+    from src.routes.golden_plate_recorder_db.db import SessionRecord, User, db_session
+    from src.routes.golden_plate_recorder_db.dedupe import get_session_dedupe_index
+
+    login()
+    assert upload_csv(client).status_code == 200
+    create = client.post('/api/session/create', json={'session_name': 'dedupe_race_test'})
+    session_id = create.get_json()['session_id']
+
+    # Warm the index, then let a "concurrent scanner" insert behind its back.
+    assert get_session_dedupe_index(session_id).lookup(student_id='123') is None
+    user = db_session.query(User).filter_by(username='antineutrino').first()
+    db_session.add(SessionRecord(
+        school_id=user.school_id,
+        session_id=session_id,
+        category='clean',
+        recorded_by=user.id,
+        dedupe_key='id:123',
+    ))
+    db_session.commit()
+
+    response = client.post('/api/record/clean', json={'input_value': '123'})
+    assert response.status_code == 409
+    assert 'CLEAN' in response.get_json()['message']
+    assert db_session.query(SessionRecord).filter_by(session_id=session_id).count() == 1
+
+
+def test_scans_update_session_counters_in_place(client, login):
+    from src.routes.golden_plate_recorder_db.db import DraftPool, Session, Student, db_session
+
+    login()
+    assert upload_csv(client).status_code == 200
+    create = client.post('/api/session/create', json={'session_name': 'counter_test'})
+    session_id = create.get_json()['session_id']
+
+    assert client.post('/api/record/clean', json={'input_value': '123'}).status_code == 200
+    assert client.post('/api/record/red', json={'input_value': '456'}).status_code == 200
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+    assert client.post('/api/record/faculty', json={'input_value': 'Dr Smith'}).status_code == 200
+
+    db_session.expire_all()
+    session_row = db_session.get(Session, session_id)
+    assert (session_row.clean_number, session_row.red_number, session_row.dirty_number) == (1, 1, 2)
+    assert session_row.faculty_number == 1
+    assert session_row.total_clean == 2
+    assert session_row.total_dirty == 3
+    assert session_row.total_records == 5
+
+    student = db_session.query(Student).filter_by(student_identifier='123').first()
+    pool_row = db_session.query(DraftPool).filter_by(student_id=student.id).one()
+    assert pool_row.ticket_number == 1
+
+
+def test_batch_scans_dedupe_within_batch_and_session(client, login):
+    from src.routes.golden_plate_recorder_db.db import Session, db_session
+
+    login()
+    assert upload_csv(client).status_code == 200
+    create = client.post('/api/session/create', json={'session_name': 'batch_test'})
+    session_id = create.get_json()['session_id']
+    assert client.post('/api/record/red', json={'input_value': '456'}).status_code == 200
+
+    response = client.post('/api/record/batch', json={'items': [
+        {'category': 'clean', 'input_value': '123', 'client_timestamp': '2024-01-01T12:00:00Z'},
+        {'category': 'clean', 'student_key': 'id:123'},
+        {'category': 'clean', 'student_id': '456'},
+        {'category': 'dirty'},
+        {'category': 'faculty', 'input_value': 'Dr Smith'},
+        {'category': 'faculty', 'input_value': 'dr smith'},
+        {'category': 'bogus', 'input_value': '123'},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    statuses = [result['status'] for result in body['results']]
+    assert statuses == ['success', 'duplicate', 'duplicate', 'success', 'success', 'duplicate', 'error']
+    assert 'RED' in body['results'][2]['message']
+    assert body['results'][0]['tickets'] == 1
+    assert body['results'][0]['is_manual_entry'] is False
+    assert body['summary'] == {'recorded': 3, 'duplicates': 3, 'errors': 1}
+
+    status = client.get('/api/session/status').get_json()
+    assert status['clean_count'] == 1
+    assert status['red_count'] == 1
+    assert status['dirty_count'] == 1
+    assert status['faculty_clean_count'] == 1
+
+    db_session.expire_all()
+    session_row = db_session.get(Session, session_id)
+    assert session_row.total_records == 4
+
+    repeat = client.post('/api/record/clean', json={'input_value': '123'})
+    assert repeat.status_code == 409
+
+
+def test_batch_scans_keep_client_time_out_of_recorded_at(client, login):
+    from src.routes.golden_plate_recorder_db.db import SessionRecord, db_session
+
+    login()
+    assert upload_csv(client).status_code == 200
+    client.post('/api/session/create', json={'session_name': 'batch_backdated'})
+    assert client.post('/api/record/red', json={'input_value': '456'}).status_code == 200
+    cursor = client.get('/api/session/scan-history').get_json()['cursor']
+
+    response = client.post('/api/record/batch', json={'items': [
+        {'category': 'clean', 'input_value': '123', 'client_timestamp': '2024-01-01T12:00:00Z'},
+    ]})
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    record = db_session.query(SessionRecord).filter_by(category='clean').order_by(SessionRecord.recorded_at.desc()).first()
+    assert record.client_recorded_at.year == 2024
+    assert record.recorded_at.year > 2024
+
+    newer = client.get(f'/api/session/scan-history?since={cursor}').get_json()
+    fresh = [entry for entry in newer['scan_history'] if entry['id'] == record.id]
+    assert [entry['category'] for entry in newer['scan_history']] == ['CLEAN', 'RED']
+    assert fresh[0]['timestamp'].startswith('2024-01-01T12:00:00')
+
+
+def test_batch_scans_validate_payload(client, login):
+    login()
+    client.post('/api/session/create', json={'session_name': 'batch_validation'})
+    assert client.post('/api/record/batch', json={'items': []}).status_code == 400
+    assert client.post('/api/record/batch', json={}).status_code == 400
+
+
+def test_name_entry_matches_roster_student(client, login):
+    login()
+    assert upload_csv(client).status_code == 200
+    client.post('/api/session/create', json={'session_name': 'name_match_test'})
+
+    response = client.post('/api/record/clean', json={'input_value': 'jane ROE'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['student_id'] == '456'
+    assert body['is_manual_entry'] is False
+
+
+def test_student_names_prefix_search(client, login):
+    login()
+    assert upload_csv(client).status_code == 200
+
+    def ids(response):
+        # Other tests share the roster table, so only look at this test's students.
+        return [entry['student_id'] for entry in response.get_json()['names'] if entry['student_id'] in {'123', '456'}]
+
+    assert ids(client.get('/api/csv/student-names')) == ['456', '123']
+    assert ids(client.get('/api/csv/student-names?q=JA')) == ['456']
+    assert ids(client.get('/api/csv/student-names?q=do')) == ['123']
+    assert ids(client.get('/api/csv/student-names?q=12')) == ['123']
+
+    none = client.get('/api/csv/student-names?q=zzz-no-match').get_json()
+    assert none == {'status': 'success', 'names': []}
+
+
+
+def test_dedupe_indexes_are_bounded_and_rebuilt(client, login):
+    from src.routes.golden_plate_recorder_db.dedupe import SessionDedupeIndex, session_dedupe_indexes
+    from src.routes.golden_plate_recorder_db.session_cache import DEFAULT_MAX_ENTRIES
+
+    login()
+    assert upload_csv(client).status_code == 200
+    client.post('/api/session/create', json={'session_name': 'bounded_dedupe'})
+    assert client.post('/api/record/red', json={'input_value': '456'}).status_code == 200
+
+    session_dedupe_indexes.configure(max_entries=1)
+    try:
+        # Another session's index pushes this one out
+        session_dedupe_indexes['other-session'] = SessionDedupeIndex()
+        assert list(session_dedupe_indexes) == ['other-session']
+
+        duplicate = client.post('/api/record/clean', json={'student_key': 'id:456'})
+        assert duplicate.status_code == 409
+        assert 'RED' in duplicate.get_json()['message']
+    finally:
+        session_dedupe_indexes.configure(max_entries=DEFAULT_MAX_ENTRIES)
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from src.routes.golden_plate_recorder_db import sampler as sampler_module
+from src.routes.golden_plate_recorder_db.sampler import WeightedSampler
+
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+def test_draw_picks_item_by_cumulative_weight():
+    sampler = WeightedSampler(['a', 'b', 'c'], [1, 2, 1])
+
+    assert sampler.draw(FixedRandom(0.0)) == ('a', 1.0)
+    assert sampler.draw(FixedRandom(0.25)) == ('b', 2.0)
+    assert sampler.draw(FixedRandom(0.74)) == ('b', 2.0)
+    assert sampler.draw(FixedRandom(0.999)) == ('c', 1.0)
+    assert sampler.probability(1) == 0.5
+
+
+def test_zero_weights_are_dropped_and_empty_pool_raises():
+    sampler = WeightedSampler(['a', 'b'], [0, 3])
+    assert sampler.items == ['b']
+    assert sampler.draw(FixedRandom(0.0)) == ('b', 3.0)
+
+    with pytest.raises(ValueError):
+        WeightedSampler([], []).draw()
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_batch_draws_follow_weights(monkeypatch, use_numpy):
+    if use_numpy:
+        np = pytest.importorskip('numpy')
+        rng = np.random.default_rng(7)
+    else:
+        monkeypatch.setattr(sampler_module, '_np', None)
+        rng = random.Random(7)
+
+    sampler = WeightedSampler(['a', 'b', 'c'], [1, 2, 7])
+    indices = sampler.draw_indices(20000, rng)
+
+    assert len(indices) == 20000
+    shares = [indices.count(position) / len(indices) for position in range(3)]
+    assert shares == pytest.approx([0.1, 0.2, 0.7], abs=0.02)
+
+
+def test_simulation_shares_one_deadline_and_cancels_queued_batches():
+    import time
+    from concurrent.futures import TimeoutError as FutureTimeoutError
+
+    from src.routes.golden_plate_recorder_db import simulation
+
+    class SlowSampler(WeightedSampler):
+        started = 0
+
+        def draw_counts(self, count, rng=None):
+            SlowSampler.started += 1
+            time.sleep(0.2)
+            return [0] * len(self.items)
+
+    sampler = SlowSampler([{'display_name': 'a'}], [1])
+    started_at = time.monotonic()
+    with pytest.raises(FutureTimeoutError):
+        simulation.simulate_draws(sampler, simulation.CHUNK_SIZE * 20, profile=dict, timeout=0.1)
+    assert time.monotonic() - started_at < 1.0
+    time.sleep(0.5)
+    assert SlowSampler.started < 20
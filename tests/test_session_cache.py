@@ -0,0 +1,101 @@
+from src.routes.golden_plate_recorder_db.session_cache import (
+    ENTRY_OVERHEAD_BYTES,
+    RECORD_BYTES,
+    SessionCache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SessionCache(max_entries=2, max_bytes=0, ttl_seconds=0)
+    cache['a'] = {}
+    cache['b'] = {}
+    assert cache.get('a') == {}
+    cache['c'] = {}
+
+    assert 'b' not in cache
+    assert set(cache) == {'a', 'c'}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 0, 1)
+
+
+def test_byte_budget_tracks_records_appended_in_place():
+    budget = 2 * ENTRY_OVERHEAD_BYTES + 3 * RECORD_BYTES
+    cache = SessionCache(max_entries=0, max_bytes=budget, ttl_seconds=0)
+    cache['a'] = {'scan_history': []}
+    cache['b'] = {'scan_history': []}
+
+    cache['b']['scan_history'].extend([{}] * 4)
+    cache['b']  # re-measured on access
+    assert 'a' not in cache
+    assert 'b' in cache
+    assert cache.stats()['estimated_bytes'] == ENTRY_OVERHEAD_BYTES + 4 * RECORD_BYTES
+
+
+def test_idle_entries_expire():
+    clock = FakeClock()
+    cache = SessionCache(max_entries=0, max_bytes=0, ttl_seconds=60, clock=clock)
+    cache['a'] = {}
+    clock.now = 61
+
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['misses'], stats['expirations'], stats['entries']) == (1, 1, 0)
+
+
+def test_membership_and_pop_apply_the_ttl():
+    clock = FakeClock()
+    cache = SessionCache(max_entries=0, max_bytes=0, ttl_seconds=60, clock=clock)
+    cache['a'] = {'live': True}
+    cache['b'] = {}
+    clock.now = 61
+
+    assert 'a' not in cache
+    assert cache.pop('b', None) is None
+    stats = cache.stats()
+    assert (stats['expirations'], stats['entries'], stats['estimated_bytes']) == (2, 0, 0)
+
+    cache['c'] = {'live': True}
+    assert cache.pop('c') == {'live': True}
+    assert 'c' not in cache
+
+
+def test_evicted_session_is_rehydrated_from_database(client, login):
+    from src.routes.golden_plate_recorder_db.storage import session_data
+
+    login()
+    create = client.post('/api/session/create', json={'session_name': 'evicted_session'})
+    session_id = create.get_json()['session_id']
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+
+    session_data.clear()
+    history = client.get('/api/session/history')
+    assert history.status_code == 200
+    assert len(history.get_json()['scan_history']) == 1
+    assert session_id in session_data
+
+
+def test_session_views_do_not_depend_on_cached_entry(client, login):
+    from src.routes.golden_plate_recorder_db.storage import session_data
+
+    login()
+    create = client.post('/api/session/create', json={'session_name': 'evicted_views'})
+    session_id = create.get_json()['session_id']
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+
+    session_data.clear()
+    status = client.get('/api/session/status').get_json()
+    assert status['scan_history_count'] == 2
+    assert status['draw_info']['winner'] is None
+
+    sessions = client.get('/api/session/list').get_json()['sessions']
+    assert [entry['owner'] for entry in sessions if entry['session_id'] == session_id]
+    assert session_id not in session_data
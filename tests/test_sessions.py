@@ -1,4 +1,5 @@
 import uuid
+from datetime import timedelta
 
 from src.routes.golden_plate_recorder_db.db import (
     DEFAULT_SCHOOL_SLUG,
@@ -8,6 +9,7 @@ from src.routes.golden_plate_recorder_db.db import (
     User,
     db_session,
 )
+from src.routes.golden_plate_recorder_db.utils import decode_keyset_cursor
 
 
 def test_create_and_list_session(client, login):
@@ -104,3 +106,118 @@ def test_admin_delete_request_removes_related_rows(client, login):
     assert db_session.query(SessionRecord).filter_by(session_id=session_id).count() == 0
     assert db_session.query(SessionDrawEvent).filter_by(session_id=session_id).count() == 0
 
+
+
+def test_switch_session_hydrates_incrementally(client, login):
+    from datetime import datetime, timedelta, timezone
+
+    from src.routes.golden_plate_recorder_db.storage import HYDRATION_MARK_KEY, session_data
+
+    login()
+    create = client.post('/api/session/create', json={'session_name': 'incremental_hydration'})
+    session_id = create.get_json()['session_id']
+    assert client.post(f'/api/session/switch/{session_id}').status_code == 200
+    assert session_data[session_id][HYDRATION_MARK_KEY]['count'] == 0
+
+    # A scan cached by this process is not appended a second time.
+    assert client.post('/api/record/faculty', json={'input_value': 'Dr Local'}).status_code == 200
+
+    # A scan written by another worker shows up on the next switch.
+    user = db_session.query(User).filter_by(username='antineutrino').first()
+    remote = SessionRecord(
+        school_id=user.school_id,
+        session_id=session_id,
+        category='dirty',
+        recorded_by=user.id,
+        recorded_at=datetime.now(timezone.utc) + timedelta(seconds=5),
+        # Queued offline: the device clock predates the local scan
+        client_recorded_at=datetime.now(timezone.utc) - timedelta(hours=1),
+        dedupe_key=f'dirty_remote_{uuid.uuid4().hex}',
+    )
+    db_session.add(remote)
+    db_session.commit()
+
+    assert client.post(f'/api/session/switch/{session_id}').status_code == 200
+    cached = session_data[session_id]
+    assert [entry['category'] for entry in cached['scan_history']] == ['dirty', 'faculty']
+    assert cached['scan_history'][0]['display_name'] == 'Dirty Plate #1'
+    assert len(cached['faculty_clean_records']) == 1
+    assert cached[HYDRATION_MARK_KEY]['count'] == 2
+
+    # A full rebuild orders the history the same way
+    session_data.pop(session_id)
+    assert client.post(f'/api/session/switch/{session_id}').status_code == 200
+    assert [entry['category'] for entry in session_data[session_id]['scan_history']] == ['dirty', 'faculty']
+
+    # Deleting a record behind the cache's back forces a full rebuild.
+    db_session.delete(remote)
+    db_session.commit()
+    assert client.post(f'/api/session/switch/{session_id}').status_code == 200
+    cached = session_data[session_id]
+    assert [entry['category'] for entry in cached['scan_history']] == ['faculty']
+    assert cached['dirty_count'] == 0
+
+
+def test_scan_history_pages_by_cursor_with_stable_dirty_numbers(client, login):
+    login()
+    client.post('/api/session/create', json={'session_name': 'history_cursor'})
+    for _ in range(3):
+        assert client.post('/api/record/dirty', json={}).status_code == 200
+
+    first = client.get('/api/session/scan-history').get_json()
+    assert first['reset'] is True
+    assert [row['name'] for row in first['scan_history']] == [
+        'Dirty Plate #3', 'Dirty Plate #2', 'Dirty Plate #1'
+    ]
+
+    # Nothing new yet; the overlap window re-sends rows the client already holds
+    seen = {row['id'] for row in first['scan_history']}
+    idle = client.get(f"/api/session/scan-history?since={first['cursor']}").get_json()
+    assert {row['id'] for row in idle['scan_history']} == seen
+    assert idle['cursor'] == first['cursor'] and idle['reset'] is False
+
+    assert client.post('/api/record/dirty', json={}).status_code == 200
+    update = client.get(f"/api/session/scan-history?since={first['cursor']}").get_json()
+    assert [row['name'] for row in update['scan_history'] if row['id'] not in seen] == ['Dirty Plate #4']
+    seen |= {row['id'] for row in update['scan_history']}
+
+    page = client.get('/api/session/scan-history?limit=2').get_json()
+    assert [row['name'] for row in page['scan_history']] == ['Dirty Plate #4', 'Dirty Plate #3']
+    assert page['has_more'] is True
+    older = client.get(f"/api/session/scan-history?before={page['before_cursor']}&limit=2").get_json()
+    assert [row['name'] for row in older['scan_history']] == ['Dirty Plate #2', 'Dirty Plate #1']
+    assert older['has_more'] is False
+
+    batch = client.post('/api/record/batch', json={'items': [{'category': 'dirty'}, {'category': 'dirty'}]})
+    assert batch.status_code == 200
+    latest = client.get(f"/api/session/scan-history?since={update['cursor']}").get_json()
+    assert [row['name'] for row in latest['scan_history'] if row['id'] not in seen] == [
+        'Dirty Plate #6', 'Dirty Plate #5'
+    ]
+
+    # A row stamped before the cursor but committed after it still arrives
+    _, cursor_at, _ = decode_keyset_cursor(latest['cursor'])
+    user = db_session.query(User).filter_by(username='antineutrino').first()
+    straggler = SessionRecord(
+        school_id=user.school_id,
+        session_id=latest['session_id'],
+        category='faculty',
+        preferred_name='Late',
+        last_name='Writer',
+        recorded_by=user.id,
+        recorded_at=cursor_at - timedelta(seconds=1),
+        dedupe_key=f'faculty_late_{uuid.uuid4().hex}',
+    )
+    db_session.add(straggler)
+    db_session.commit()
+    straggler_id = straggler.id
+    caught_up = client.get(f"/api/session/scan-history?since={latest['cursor']}").get_json()
+    assert straggler_id in {row['id'] for row in caught_up['scan_history']}
+    assert caught_up['cursor'] == latest['cursor']
+
+    assert client.get('/api/session/scan-history?since=not-a-cursor').status_code == 400
+
+    # A cursor from another session restarts the list for the new one
+    client.post('/api/session/create', json={'session_name': 'history_cursor_other'})
+    switched = client.get(f"/api/session/scan-history?since={first['cursor']}").get_json()
+    assert switched['reset'] is True and switched['scan_history'] == []
@@ -80,3 +80,101 @@ def test_student_identifier_allowed_for_different_schools():
         assert count == 2
     finally:
         db_session.rollback()
+
+
+def test_student_cache_tracks_commits_per_school():
+    from src.routes.golden_plate_recorder_db.student_cache import (
+        get_school_student_version,
+        get_student_lookup_for_school,
+        school_student_caches,
+    )
+
+    identifier = f"9{uuid.uuid4().int % 10**8:08d}"
+    other_school_id = f"cache-school-{uuid.uuid4().hex[:8]}"
+    lookup = get_student_lookup_for_school(DEFAULT_SCHOOL_ID)
+    assert other_school_id not in school_student_caches
+
+    student = Student(
+        id=str(uuid.uuid4()),
+        school_id=DEFAULT_SCHOOL_ID,
+        student_identifier=identifier,
+        preferred_name='Cache',
+        last_name='Tester',
+    )
+    db_session.add(student)
+    db_session.flush()
+    version = get_school_student_version(DEFAULT_SCHOOL_ID)
+    assert f"id:{identifier}" not in lookup
+
+    try:
+        db_session.commit()
+        assert get_school_student_version(DEFAULT_SCHOOL_ID) == version + 1
+        assert lookup[f"id:{identifier}"]['preferred_name'] == 'Cache'
+
+        student.preferred_name = 'Renamed'
+        db_session.commit()
+        assert lookup[f"id:{identifier}"]['preferred_name'] == 'Renamed'
+    finally:
+        db_session.delete(student)
+        db_session.commit()
+
+    assert f"id:{identifier}" not in lookup
+    # Untouched schools are never loaded.
+    assert other_school_id not in school_student_caches
+
+
+def test_student_cache_discards_rolled_back_changes():
+    from src.routes.golden_plate_recorder_db.student_cache import get_student_lookup_for_school
+
+    identifier = f"8{uuid.uuid4().int % 10**8:08d}"
+    lookup = get_student_lookup_for_school(DEFAULT_SCHOOL_ID)
+    db_session.add(Student(
+        id=str(uuid.uuid4()),
+        school_id=DEFAULT_SCHOOL_ID,
+        student_identifier=identifier,
+        preferred_name='Never',
+        last_name='Committed',
+    ))
+    db_session.flush()
+    db_session.rollback()
+    db_session.commit()
+
+    assert f"id:{identifier}" not in lookup
+
+
+def test_student_cache_reloads_after_another_process_commits():
+    from sqlalchemy.orm import Session as OrmSession
+
+    from src.routes.golden_plate_recorder_db.db import StudentVersion, dialect_insert, engine
+    from src.routes.golden_plate_recorder_db.student_cache import get_student_resolver
+
+    identifier = f"8{uuid.uuid4().int % 10**8:08d}"
+    assert get_student_resolver(DEFAULT_SCHOOL_ID).find_by_identifier([identifier]) is None
+
+    # A plain session has none of db_session's hooks, like another worker's commit
+    versions = StudentVersion.__table__
+    bump = (
+        dialect_insert(versions)
+        .values(school_id=DEFAULT_SCHOOL_ID, version=1)
+        .on_conflict_do_update(index_elements=[versions.c.school_id], set_={'version': versions.c.version + 1})
+    )
+    other = OrmSession(bind=engine)
+    student_id = str(uuid.uuid4())
+    try:
+        other.add(Student(
+            id=student_id,
+            school_id=DEFAULT_SCHOOL_ID,
+            student_identifier=identifier,
+            preferred_name='Other',
+            last_name='Worker',
+        ))
+        other.execute(bump)
+        other.commit()
+
+        match = get_student_resolver(DEFAULT_SCHOOL_ID).find_by_identifier([identifier])
+        assert match is not None and match.id == student_id
+    finally:
+        other.query(Student).filter(Student.id == student_id).delete()
+        other.execute(bump)
+        other.commit()
+        other.close()
@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from src.routes.golden_plate_recorder_db.db import Session, Student, db_session
+from src.routes.golden_plate_recorder_db.domain import TicketLedgerReplay
+from src.routes.golden_plate_recorder_db.scan_service import record_scan
+from src.routes.golden_plate_recorder_db.storage import session_data
+
+
+def _scan(school_id, session_id, student, category):
+    record_scan(
+        school_id=school_id,
+        session_id=session_id,
+        category=category,
+        recorded_by='replay-test',
+        dedupe_key=f'{category}-{student.id}-{uuid.uuid4().hex}',
+        student_id=student.id,
+    )
+
+
+@pytest.fixture
+def sessions():
+    school_id = f'replay-{uuid.uuid4().hex}'
+    students = {
+        key: Student(school_id=school_id, student_identifier=f'{key}-{uuid.uuid4().hex[:6]}',
+                     preferred_name=key, last_name='Student')
+        for key in 'abcd'
+    }
+    db_session.add_all(students.values())
+    rows = {}
+    for day in range(1, 5):
+        rows[f's{day}'] = Session(
+            school_id=school_id,
+            created_by='replay-test',
+            session_name=f'replay day {day}',
+            created_at=datetime(2024, 1, day, 12, tzinfo=timezone.utc),
+        )
+    db_session.add_all(rows.values())
+    db_session.flush()
+
+    for session_key, clean, red in [('s1', 'abc', ''), ('s2', 'ab', ''), ('s3', 'b', 'c'), ('s4', 'ac', '')]:
+        for key in clean:
+            _scan(school_id, rows[session_key].id, students[key], 'clean')
+        for key in red:
+            _scan(school_id, rows[session_key].id, students[key], 'red')
+    rows['s2'].winner_student_id = students['a'].id
+    rows['s2'].finalized = 1
+    rows['s2'].draw_version = 1
+    db_session.commit()
+
+    keys = {key: f'id:{student.student_identifier.lower()}' for key, student in students.items()}
+    yield school_id, rows, students, keys
+
+    db_session.query(Session).filter(Session.school_id == school_id).delete()
+    db_session.query(Student).filter(Student.school_id == school_id).delete()
+    db_session.commit()
+
+
+def test_checkpointed_replay_matches_full_replay(sessions):
+    _, rows, _, keys = sessions
+    replay = TicketLedgerReplay(checkpoint_interval=100)
+    full = TicketLedgerReplay().replay(rows['s4'].id)
+    replay.replay(rows['s4'].id)
+    assert len(replay) == 1  # s2 is finalized
+
+    partial = replay.replay(rows['s4'].id)
+    assert set(partial) == {rows['s3'].id, rows['s4'].id}
+    assert partial[rows['s4'].id]['tickets_snapshot'] == full[rows['s4'].id]['tickets_snapshot']
+    assert partial[rows['s4'].id]['tickets_snapshot'] == {keys['a']: 1.0, keys['b']: 1.5, keys['c']: 1.0}
+
+
+def test_replay_reads_records_from_database_not_session_cache(sessions):
+    _, rows, _, keys = sessions
+    session_data.clear()
+    summary = TicketLedgerReplay().replay(rows['s1'].id)[rows['s1'].id]
+    assert summary['tickets_snapshot'] == {keys['a']: 1.0, keys['b']: 1.0, keys['c']: 1.0}
+
+
+def test_editing_earlier_session_invalidates_checkpoint(sessions):
+    school_id, rows, students, keys = sessions
+    replay = TicketLedgerReplay(checkpoint_interval=100)
+    replay.replay(rows['s4'].id)
+    _scan(school_id, rows['s1'].id, students['d'], 'clean')
+    db_session.commit()
+
+    partial = replay.replay(rows['s4'].id)
+    assert set(partial) == {row.id for row in rows.values()}
+    assert partial[rows['s4'].id]['tickets_snapshot'][keys['d']] == 0.125
+
+    rows['s1'].status = 'discarded'
+    db_session.commit()
+    assert keys['d'] not in replay.replay(rows['s4'].id)[rows['s4'].id]['tickets_snapshot']